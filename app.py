@@ -1,64 +1,207 @@
 # app.py - Flask API Server (Flask 3 compatible)
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context, g
 from flask_cors import CORS
-from flask.json.provider import DefaultJSONProvider
-from datetime import datetime
-import json
-from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from datetime import datetime, timedelta
+import json, os, time
+from bson import ObjectId, Decimal128
+from bson.raw_bson import RawBSONDocument
 
 # Import your existing modules
 from customers import (
-    ensure_customers_indexes, create_customer, get_all_customers,
-    update_customer, delete_customer, get_customer_by_id
+    ensure_customers_indexes, create_customer, get_customers_page, iter_customers,
+    update_customer, delete_customer, get_customer_by_id, search_customers, customers_projection
 )
 from products import (
-    ensure_products_indexes, create_product, get_all_products,
-    update_product, delete_product, get_product_by_id
+    ensure_products_indexes, create_product, get_products_page, iter_products,
+    update_product, delete_product, get_product_by_id, product_cache_stats,
+    search_products, products_projection, bulk_update_products, get_products_by_ids
 )
 from orders import (
-    ensure_orders_indexes, create_order, get_order_by_id, list_orders,
-    update_order, delete_order, total_revenue, top_customers, top_products
+    ensure_orders_indexes, create_order, create_orders_bulk, get_order_by_id, list_orders,
+    list_orders_page, iter_orders, update_order, delete_order,
+    total_revenue, top_customers, top_products, sales_report, orders_projection,
+    parse_expand, expand_orders
 )
+from rollups import rollups_missing, rebuild_rollups
+from counters import get_counts, get_version
+from catalog_io import import_stream, iter_text_lines, iter_export, detect_format
+from http_cache import make_etag, doc_etag, response_cache
+from snapshot import snapshot, snapshot_info, REPORTS, report_kwargs, report_product_ids, name_products
+from db import warmup, health
+from json_provider import bson_default, use_orjson, OrjsonMixin
+import metrics
+
+metrics.install()  # before the (lazy) MongoClient is created
 
 # ---------------- JSON Provider (replaces app.json_encoder) ----------------
 class CustomJSONProvider(DefaultJSONProvider):
     def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        if isinstance(obj, ObjectId):
-            return str(obj)
+        if isinstance(obj, (datetime, ObjectId, Decimal128, RawBSONDocument)):
+            return bson_default(obj)
         return super().default(obj)
 
+class OrjsonJSONProvider(OrjsonMixin, JSONProvider):
+    """JSON_PROVIDER=orjson - see json_provider.py"""
+
 app = Flask(__name__)
-app.json = CustomJSONProvider(app)  # Flask 3 way to customize JSON
+app.json = OrjsonJSONProvider(app) if use_orjson() else CustomJSONProvider(app)  # Flask 3 way to customize JSON
 CORS(app)  # Enable CORS for frontend communication
 
-# ---------------- Initialize DB Indexes on startup (no before_first_request) ----------------
+# ---------------- Initialize DB (explicit - importing app.py never touches the network) ----------------
 def initialize_db():
     ensure_customers_indexes()
     ensure_products_indexes()
     ensure_orders_indexes()
+    if rollups_missing():
+        # a full rebuild is a deploy step, not something every worker runs at startup
+        print("[init warning] orders but no rollups - run once: python rollups.py rebuild")
 
-# Try to initialize once at startup; don't crash app if DB is down
-try:
+def startup():
+    """Warm up the connection and create indexes; don't crash app if DB is down"""
+    try:
+        warmup()
+        initialize_db()
+    except Exception as e:
+        print(f"[init warning] Failed to initialize DB: {e}")
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create indexes, and the rollups of a database that has none (flask --app app init-db)"""
     initialize_db()
-except Exception as e:
-    # Avoid hard crash at import time; still report via logs
-    print(f"[init warning] Failed to initialize DB indexes: {e}")
+    print("Indexes created")
+    if rollups_missing():
+        rebuild_rollups()
+        print("Rollups built from the existing orders")
+
+# WSGI servers import the module instead of running __main__
+if os.getenv("DB_INIT_ON_IMPORT") == "1":
+    startup()
+
+# ---------------- Request metrics ----------------
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+    return response
 
 # ---------------- Error handler ----------------
 @app.errorhandler(Exception)
 def handle_error(e):
     return jsonify({"error": str(e)}), 500
 
+# ---------------- NDJSON streaming ----------------
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+def wants_ndjson():
+    """Opt-in via `Accept: application/x-ndjson` (or ?format=ndjson)"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+def stream_batch_size():
+    return max(1, min(request.args.get('batch_size', 1000, type=int), 10000))
+
+def ndjson_response(cursor, batch_size):
+    """Streams a pymongo cursor one line per document, one chunk per cursor batch"""
+    def generate():
+        try:
+            lines = []
+            for doc in cursor:
+                lines.append(app.json.dumps(doc))
+                if len(lines) >= batch_size:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            cursor.close()
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+# ---------------- Sparse fieldsets ----------------
+def projection_args():
+    """?fields=a,b / ?exclude=a,b / ?view=summary - see projection.py"""
+    return {k: request.args.get(k) for k in ("fields", "exclude", "view")}
+
+# ---------------- Conditional GET (ETag / 304) ----------------
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def json_with_etag(body, etag):
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True   # clients revalidate with If-None-Match
+    return response
+
+def conditional_list(collection, build):
+    """JSON list with an ETag from the collection version; build() -> payload"""
+    etag = make_etag(collection, get_version(collection), request.full_path)
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    cached = response_cache.get(etag)
+    if cached:
+        return json_with_etag(cached[1], etag)
+    body = app.json.dumps(build())
+    response_cache.put(etag, etag, body)
+    return json_with_etag(body, etag)
+
+def conditional_doc(collection, load, not_found):
+    """One document with an ETag from its updatedAt; load() -> doc or None"""
+    key = None
+    if response_cache.enabled:
+        key = make_etag(collection, get_version(collection), request.full_path)
+        cached = response_cache.get(key)
+        if cached:
+            etag, body = cached
+            return not_modified(etag) if request.if_none_match.contains_weak(etag) else json_with_etag(body, etag)
+    doc = load()
+    if not doc:
+        return jsonify({"success": False, "error": not_found}), 404
+    etag = make_etag(doc_etag(doc), request.query_string.decode()) if request.query_string else doc_etag(doc)
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    body = app.json.dumps({"success": True, "data": doc})
+    if key:
+        response_cache.put(key, etag, body)
+    return json_with_etag(body, etag)
+
 # ================= CUSTOMERS API =================
 
 @app.route('/api/customers', methods=['GET'])
 def api_get_all_customers():
-    """Get all customers"""
+    """Get customers, one page at a time (?limit=&cursor=&fields=|exclude=|view=)"""
+    try:
+        projection = customers_projection(**projection_args())
+        if wants_ndjson():
+            batch_size = stream_batch_size()
+            return ndjson_response(iter_customers(batch_size=batch_size, projection=projection), batch_size)
+
+        customers, next_cursor = get_customers_page(
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            projection=projection
+        )
+        return jsonify({"success": True, "data": customers, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/customers/search', methods=['GET'])
+def api_search_customers():
+    """Autocomplete by name or phone prefix (?q=&limit=)"""
     try:
-        customers = get_all_customers()
-        return jsonify({"success": True, "data": customers})
+        results = search_customers(request.args.get('q', ''), limit=request.args.get('limit', 10, type=int))
+        return jsonify({"success": True, "data": results})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -66,11 +209,7 @@ def api_get_all_customers():
 def api_get_customer(customer_id):
     """Get customer by ID"""
     try:
-        customer = get_customer_by_id(customer_id)
-        if customer:
-            return jsonify({"success": True, "data": customer})
-        else:
-            return jsonify({"success": False, "error": "לקוח לא נמצא"}), 404
+        return conditional_doc("customers", lambda: get_customer_by_id(customer_id), "לקוח לא נמצא")
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -125,10 +264,37 @@ def api_delete_customer(customer_id):
 
 @app.route('/api/products', methods=['GET'])
 def api_get_all_products():
-    """Get all products"""
+    """Get products, one page at a time (?limit=&cursor=&fields=|exclude=|view=)"""
     try:
-        products = get_all_products()
-        return jsonify({"success": True, "data": products})
+        projection = products_projection(**projection_args())
+        if wants_ndjson():
+            batch_size = stream_batch_size()
+            return ndjson_response(iter_products(batch_size=batch_size, projection=projection), batch_size)
+
+        def build():
+            products, next_cursor = get_products_page(
+                limit=request.args.get('limit', type=int),
+                cursor=request.args.get('cursor'),
+                projection=projection
+            )
+            return {"success": True, "data": products, "next_cursor": next_cursor}
+        return conditional_list("products", build)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/cache/stats', methods=['GET'])
+def api_product_cache_stats():
+    """Product cache hit/miss/eviction counters"""
+    return jsonify({"success": True, "data": product_cache_stats()})
+
+@app.route('/api/products/search', methods=['GET'])
+def api_search_products():
+    """Autocomplete by name prefix/words, ranked (?q=&limit=)"""
+    try:
+        results = search_products(request.args.get('q', ''), limit=request.args.get('limit', 10, type=int))
+        return jsonify({"success": True, "data": results})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -136,11 +302,7 @@ def api_get_all_products():
 def api_get_product(product_id):
     """Get product by ID"""
     try:
-        product = get_product_by_id(product_id)
-        if product:
-            return jsonify({"success": True, "data": product})
-        else:
-            return jsonify({"success": False, "error": "מוצר לא נמצא"}), 404
+        return conditional_doc("products", lambda: get_product_by_id(product_id), "מוצר לא נמצא")
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -180,6 +342,22 @@ def api_update_product(product_id):
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/products/bulk', methods=['PATCH'])
+def api_bulk_update_products():
+    """
+    Set-based update: {"filter": {"category"|"ids"|"min_price"|"max_price"},
+    "update": {"field": "price", "op": "set"|"multiply"|"add", "value": ...} or "updates": [...]}
+    """
+    try:
+        data = request.json or {}
+        operations = data.get('updates') or ([data['update']] if data.get('update') else [])
+        result = bulk_update_products(data.get('filter') or {}, operations)
+        return jsonify({"success": True, "data": result})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/products/<product_id>', methods=['DELETE'])
 def api_delete_product(product_id):
     """Delete product"""
@@ -192,18 +370,77 @@ def api_delete_product(product_id):
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+# ================= BULK IMPORT / EXPORT =================
+
+def upload_format(filename=None):
+    fmt = request.args.get('format')
+    if not fmt and request.mimetype in (NDJSON_MIMETYPE, "application/jsonl"):
+        fmt = "jsonl"
+    return detect_format(fmt, filename)
+
+@app.route('/api/products/import', methods=['POST'], defaults={'resource': 'products'})
+@app.route('/api/customers/import', methods=['POST'], defaults={'resource': 'customers'})
+def api_import(resource):
+    """Bulk upsert from CSV/JSONL - raw body or multipart `file` (?format=csv|jsonl&mode=upsert|replace)"""
+    try:
+        upload = request.files.get('file')
+        raw = upload.stream if upload else request.stream
+        fmt = upload_format(upload.filename if upload else None)
+        # decoded line by line - the upload is never held in memory as a whole
+        report = import_stream(resource, iter_text_lines(raw), fmt,
+                               mode=request.args.get('mode', 'upsert'))
+        return jsonify({"success": report["error_count"] == 0, "data": report})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/export', methods=['GET'], defaults={'resource': 'products'})
+@app.route('/api/customers/export', methods=['GET'], defaults={'resource': 'customers'})
+def api_export(resource):
+    """Streams the whole collection as CSV/JSONL (?format=csv|jsonl)"""
+    try:
+        fmt = detect_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return Response(stream_with_context(iter_export(resource, fmt)),
+                    mimetype="text/csv" if fmt == "csv" else NDJSON_MIMETYPE,
+                    headers={"Content-Disposition": f'attachment; filename="{resource}.{fmt}"'})
+
 # ================= ORDERS API =================
 
 @app.route('/api/orders', methods=['GET'])
 def api_get_orders():
-    """Get orders, optionally filtered by customer"""
+    """
+    Get orders, optionally filtered by customer (?fields=|exclude=|view=summary for list views).
+    ?expand=customer,products joins customer/product details into the page in one request.
+    """
     try:
         customer_id = request.args.get('customer_id')
+        projection = orders_projection(**projection_args())
+        expand = parse_expand(request.args.get('expand'))
+        if wants_ndjson():
+            batch_size = stream_batch_size()
+            return ndjson_response(
+                iter_orders(customer_id=customer_id, batch_size=batch_size, projection=projection), batch_size)
+
         limit = int(request.args.get('limit', 100))
         skip = int(request.args.get('skip', 0))
 
-        orders = list_orders(customer_id=customer_id, limit=limit, skip=skip)
-        return jsonify({"success": True, "data": orders})
+        if skip:
+            # legacy offset paging, kept for old clients
+            orders = list_orders(customer_id=customer_id, limit=limit, skip=skip, projection=projection)
+            return jsonify({"success": True, "data": expand_orders(orders, expand)})
+
+        orders, next_cursor = list_orders_page(
+            customer_id=customer_id,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            projection=projection
+        )
+        return jsonify({"success": True, "data": expand_orders(orders, expand), "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -211,11 +448,17 @@ def api_get_orders():
 def api_get_order(order_id):
     """Get order by ID"""
     try:
-        order = get_order_by_id(order_id)
-        if order:
-            return jsonify({"success": True, "data": order})
-        else:
-            return jsonify({"success": False, "error": "הזמנה לא נמצאה"}), 404
+        projection = orders_projection(**projection_args())
+        expand = parse_expand(request.args.get('expand'))
+        if expand:
+            # joined data changes without the order's updatedAt changing - no ETag
+            order = get_order_by_id(order_id, projection)
+            if not order:
+                return jsonify({"success": False, "error": "הזמנה לא נמצאה"}), 404
+            return jsonify({"success": True, "data": (expand_orders([order], expand))[0]})
+        return conditional_doc("orders", lambda: get_order_by_id(order_id, projection), "הזמנה לא נמצאה")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -235,6 +478,30 @@ def api_create_order():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+MAX_BULK_ORDERS = 50000
+
+@app.route('/api/orders/bulk', methods=['POST'])
+def api_create_orders_bulk():
+    """Create many orders in one request ({"orders": [...]} or a plain list)"""
+    try:
+        data = request.json
+        orders_data = data.get('orders') if isinstance(data, dict) else data
+        if not isinstance(orders_data, list):
+            raise ValueError("Expected a list of orders")
+        if len(orders_data) > MAX_BULK_ORDERS:
+            raise ValueError(f"At most {MAX_BULK_ORDERS} orders per request")
+
+        results = create_orders_bulk(orders_data)
+        inserted = sum(1 for r in results if r["success"])
+        return jsonify({
+            "success": True,
+            "data": {"inserted": inserted, "failed": len(results) - inserted, "results": results}
+        })
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/orders/<order_id>', methods=['PUT'])
 def api_update_order(order_id):
     """Update order"""
@@ -249,6 +516,8 @@ def api_update_order(order_id):
             return jsonify({"success": True, "data": updated_order})
         else:
             return jsonify({"success": False, "error": "הזמנה לא נמצאה"}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -266,12 +535,47 @@ def api_delete_order(order_id):
 
 # ================= ANALYTICS API =================
 
+def parse_date_arg(name, end=False):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date for '{name}': {value}")
+    if end and len(value) == 10:
+        dt += timedelta(days=1)  # ?to=YYYY-MM-DD includes that whole day
+    return dt
+
+def analytics_window():
+    """?from=&to=&status=&granularity= -> sales_report() kwargs, or None for all-time"""
+    window = {
+        "start": parse_date_arg('from'),
+        "end": parse_date_arg('to', end=True),
+        "status": request.args.get('status'),
+    }
+    if not any(window.values()):
+        return None
+    window["granularity"] = request.args.get('granularity', 'day')
+    return window
+
 @app.route('/api/analytics/revenue', methods=['GET'])
 def api_total_revenue():
-    """Get total revenue"""
+    """Get total revenue (all-time, or per day/week/month inside a window)"""
     try:
-        revenue = total_revenue()
-        return jsonify({"success": True, "data": {"total_revenue": revenue}})
+        window = analytics_window()
+        if window is None:
+            revenue = total_revenue()
+            return jsonify({"success": True, "data": {"total_revenue": revenue}})
+
+        report = sales_report(**window)
+        return jsonify({"success": True, "data": {
+            "total_revenue": report["totals"]["revenue"],
+            "orders": report["totals"]["orders"],
+            "by_period": report["revenueByPeriod"],
+        }})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -280,8 +584,14 @@ def api_top_customers():
     """Get top customers by order count"""
     try:
         limit = int(request.args.get('limit', 5))
-        top_customer_list = top_customers(limit=limit)
+        window = analytics_window()
+        if window is None:
+            top_customer_list = top_customers(limit=limit)
+        else:
+            top_customer_list = sales_report(limit=limit, **window)["topCustomers"]
         return jsonify({"success": True, "data": top_customer_list})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -289,8 +599,27 @@ def api_top_customers():
 def api_top_products():
     """Get top selling product"""
     try:
-        top_product = top_products()
+        window = analytics_window()
+        if window is None:
+            top_product = top_products()
+        else:
+            top = sales_report(limit=1, **window)["topProducts"]
+            top_product = top[0] if top else None
         return jsonify({"success": True, "data": top_product})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/dashboard', methods=['GET'])
+def api_dashboard():
+    """Revenue by period and category plus top-N products/customers, in one $facet query"""
+    try:
+        window = analytics_window() or {"granularity": request.args.get('granularity', 'day')}
+        limit = int(request.args.get('limit', 5))
+        return jsonify({"success": True, "data": sales_report(limit=limit, **window)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -298,26 +627,62 @@ def api_top_products():
 def api_get_counts():
     """Get counts of customers, products, and orders"""
     try:
-        customers_count = len(get_all_customers())
-        products_count = len(get_all_products())
-        orders_count = len(list_orders())
+        counts = get_counts(["customers", "products", "orders"])
+        return jsonify({"success": True, "data": counts})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        return jsonify({
-            "success": True,
-            "data": {
-                "customers": customers_count,
-                "products": products_count,
-                "orders": orders_count
-            }
-        })
+# ---------------- Snapshot analytics (snapshot.py) ----------------
+@app.route('/api/analytics/snapshot', methods=['GET'])
+def api_snapshot_info():
+    """Size and freshness of the columnar analytics snapshot"""
+    try:
+        return jsonify({"success": True, "data": snapshot_info(snapshot.data())})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/analytics/snapshot/refresh', methods=['POST'])
+def api_snapshot_refresh():
+    """Appends the orders created since the last refresh (building/rebuilding: python snapshot.py)"""
+    try:
+        snapshot.refresh()
+        return jsonify({"success": True, "data": snapshot_info(snapshot.data())})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/<any(rfm, basket, hourly):report>', methods=['GET'])
+def api_snapshot_report(report):
+    """RFM segments, products bought together, hourly sales - computed from the snapshot"""
+    try:
+        data = snapshot.data()
+        result = REPORTS[report](data, **report_kwargs(report, request.args))
+        if report == "basket":
+            name_products(result, get_products_by_ids(report_product_ids(result)))
+        return jsonify({"success": True, "data": result, "snapshot": snapshot_info(data)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Prometheus metrics: per-route latency/errors, Mongo command timings, pool wait"""
+    for stat, value in product_cache_stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics.product_cache.set(stat, value=value)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "healthy", "message": "Flask API is running"})
+    """Health check endpoint - pings MongoDB"""
+    db_health = health()
+    code = 200 if db_health["status"] == "healthy" else 503
+    return jsonify({"status": db_health["status"], "message": "Flask API is running", "database": db_health}), code
 
 if __name__ == '__main__':
     print("🚀 Starting Flask API Server...")
@@ -328,9 +693,14 @@ if __name__ == '__main__':
     print("   - POST /api/products")
     print("   - GET  /api/orders")
     print("   - POST /api/orders")
+    print("   - POST /api/orders/bulk")
     print("   - GET  /api/analytics/revenue")
     print("   - GET  /api/analytics/top-customers")
     print("   - GET  /api/analytics/top-products")
+    print("   - GET  /api/analytics/dashboard")
+    print("   - GET  /api/analytics/rfm|basket|hourly (snapshot)")
     print("   - GET  /api/health")
+    print("   - GET  /api/metrics")
 
+    startup()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,708 @@
+# app_async.py - asyncio API server (Quart + PyMongo async driver)
+# Same /api/* routes and JSON contract as app.py, so index.fixed.html works unchanged.
+# Run with an ASGI server, e.g.:  hypercorn app_async:app --bind 0.0.0.0:5000
+from quart import Quart, jsonify, request, Response, g
+from quart.json.provider import DefaultJSONProvider
+from flask.json.provider import JSONProvider   # Quart builds on Flask's provider classes
+from quart_cors import cors
+from datetime import datetime, timedelta
+import asyncio, tempfile, time
+from bson import ObjectId, Decimal128
+from bson.raw_bson import RawBSONDocument
+
+from customers_async import (
+    create_customer, get_customers_page, iter_customers,
+    update_customer, delete_customer, get_customer_by_id, search_customers
+)
+from products_async import (
+    create_product, get_products_page, iter_products,
+    update_product, delete_product, get_product_by_id, product_cache_stats,
+    search_products, bulk_update_products, get_products_by_ids
+)
+from orders_async import (
+    create_order, create_orders_bulk, get_order_by_id, list_orders,
+    list_orders_page, iter_orders, update_order, delete_order,
+    total_revenue, top_customers, top_products, sales_report, expand_orders
+)
+from customers import ensure_customers_indexes, customers_projection
+from products import ensure_products_indexes, products_projection
+from orders import ensure_orders_indexes, orders_projection, parse_expand
+from rollups import rollups_missing
+from counters import get_counts_async, get_version_async
+from http_cache import make_etag, doc_etag, response_cache
+from snapshot import snapshot, snapshot_info, REPORTS, report_kwargs, report_product_ids, name_products
+from db import get_async_client, async_coll
+from catalog_io import import_stream, iter_text_lines, detect_format, encode_batch, export_projection, EXPORT_BATCH_SIZE
+from json_provider import bson_default, use_orjson, OrjsonMixin
+import metrics
+
+metrics.install()  # before the (lazy) AsyncMongoClient is created
+
+# ---------------- JSON Provider ----------------
+class CustomJSONProvider(DefaultJSONProvider):
+    def default(self, obj):
+        if isinstance(obj, (datetime, ObjectId, Decimal128, RawBSONDocument)):
+            return bson_default(obj)
+        return super().default(obj)
+
+class OrjsonJSONProvider(OrjsonMixin, JSONProvider):
+    """JSON_PROVIDER=orjson - see json_provider.py"""
+
+app = Quart(__name__)
+app.json = OrjsonJSONProvider(app) if use_orjson() else CustomJSONProvider(app)
+app = cors(app)  # Enable CORS for frontend communication
+
+# ---------------- Startup ----------------
+def initialize_db():
+    ensure_customers_indexes()
+    ensure_products_indexes()
+    ensure_orders_indexes()
+    if rollups_missing():
+        # a full rebuild is a deploy step, not something every worker runs at startup
+        print("[init warning] orders but no rollups - run once: python rollups.py rebuild")
+
+@app.before_serving
+async def startup():
+    """Warm up the async pool; indexes are created with the sync helpers off the event loop"""
+    try:
+        await get_async_client().admin.command("ping")
+        await asyncio.to_thread(initialize_db)
+    except Exception as e:
+        print(f"[init warning] Failed to initialize DB: {e}")
+
+# ---------------- Request metrics ----------------
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+    return response
+
+# ---------------- Error handler ----------------
+@app.errorhandler(Exception)
+async def handle_error(e):
+    return jsonify({"error": str(e)}), 500
+
+# ---------------- NDJSON streaming ----------------
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+def wants_ndjson():
+    """Opt-in via `Accept: application/x-ndjson` (or ?format=ndjson)"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+def stream_batch_size():
+    return max(1, min(request.args.get('batch_size', 1000, type=int), 10000))
+
+def ndjson_response(cursor, batch_size):
+    """Streams an async cursor one line per document, one chunk per cursor batch"""
+    async def generate():
+        try:
+            lines = []
+            async for doc in cursor:
+                lines.append(app.json.dumps(doc))
+                if len(lines) >= batch_size:
+                    yield ("\n".join(lines) + "\n").encode()
+                    lines = []
+            if lines:
+                yield ("\n".join(lines) + "\n").encode()
+        finally:
+            await cursor.close()
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+# ---------------- Sparse fieldsets ----------------
+def projection_args():
+    """?fields=a,b / ?exclude=a,b / ?view=summary - see projection.py"""
+    return {k: request.args.get(k) for k in ("fields", "exclude", "view")}
+
+# ---------------- Conditional GET (ETag / 304) ----------------
+def not_modified(etag):
+    response = Response(None, status=304)
+    response.set_etag(etag)
+    return response
+
+def json_with_etag(body, etag):
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+async def conditional_list(collection, build):
+    """JSON list with an ETag from the collection version; build() -> awaitable payload"""
+    etag = make_etag(collection, await get_version_async(collection), request.full_path)
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    cached = response_cache.get(etag)
+    if cached:
+        return json_with_etag(cached[1], etag)
+    body = app.json.dumps(await build())
+    response_cache.put(etag, etag, body)
+    return json_with_etag(body, etag)
+
+async def conditional_doc(collection, load, not_found):
+    """One document with an ETag from its updatedAt; load() -> awaitable doc or None"""
+    key = None
+    if response_cache.enabled:
+        key = make_etag(collection, await get_version_async(collection), request.full_path)
+        cached = response_cache.get(key)
+        if cached:
+            etag, body = cached
+            return not_modified(etag) if request.if_none_match.contains_weak(etag) else json_with_etag(body, etag)
+    doc = await load()
+    if not doc:
+        return jsonify({"success": False, "error": not_found}), 404
+    etag = make_etag(doc_etag(doc), request.query_string.decode()) if request.query_string else doc_etag(doc)
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    body = app.json.dumps({"success": True, "data": doc})
+    if key:
+        response_cache.put(key, etag, body)
+    return json_with_etag(body, etag)
+
+# ================= CUSTOMERS API =================
+
+@app.route('/api/customers', methods=['GET'])
+async def api_get_all_customers():
+    """Get customers, one page at a time (?limit=&cursor=&fields=|exclude=|view=)"""
+    try:
+        projection = customers_projection(**projection_args())
+        if wants_ndjson():
+            batch_size = stream_batch_size()
+            return ndjson_response(iter_customers(batch_size=batch_size, projection=projection), batch_size)
+
+        customers, next_cursor = await get_customers_page(
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            projection=projection
+        )
+        return jsonify({"success": True, "data": customers, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/customers/search', methods=['GET'])
+async def api_search_customers():
+    """Autocomplete by name or phone prefix (?q=&limit=)"""
+    try:
+        results = await search_customers(request.args.get('q', ''), limit=request.args.get('limit', 10, type=int))
+        return jsonify({"success": True, "data": results})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/customers/<customer_id>', methods=['GET'])
+async def api_get_customer(customer_id):
+    """Get customer by ID"""
+    try:
+        return await conditional_doc("customers", lambda: get_customer_by_id(customer_id), "לקוח לא נמצא")
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/customers', methods=['POST'])
+async def api_create_customer():
+    """Create new customer"""
+    try:
+        data = (await request.get_json()) or {}
+        customer_id = await create_customer(
+            customer_id=data['customer_id'],
+            name=data['name'],
+            phone=data['phone'],
+            email=data['email']
+        )
+        return jsonify({"success": True, "data": {"_id": customer_id}})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/customers/<customer_id>', methods=['PUT'])
+async def api_update_customer(customer_id):
+    """Update customer"""
+    try:
+        data = (await request.get_json()) or {}
+        updated_customer = await update_customer(
+            customer_id=customer_id,
+            name=data.get('name'),
+            phone=data.get('phone'),
+            email=data.get('email')
+        )
+        if updated_customer:
+            return jsonify({"success": True, "data": updated_customer})
+        else:
+            return jsonify({"success": False, "error": "לקוח לא נמצא"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/customers/<customer_id>', methods=['DELETE'])
+async def api_delete_customer(customer_id):
+    """Delete customer"""
+    try:
+        deleted_count = await delete_customer(customer_id)
+        if deleted_count > 0:
+            return jsonify({"success": True, "message": "לקוח נמחק בהצלחה"})
+        else:
+            return jsonify({"success": False, "error": "לקוח לא נמצא"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ================= PRODUCTS API =================
+
+@app.route('/api/products', methods=['GET'])
+async def api_get_all_products():
+    """Get products, one page at a time (?limit=&cursor=&fields=|exclude=|view=)"""
+    try:
+        projection = products_projection(**projection_args())
+        if wants_ndjson():
+            batch_size = stream_batch_size()
+            return ndjson_response(iter_products(batch_size=batch_size, projection=projection), batch_size)
+
+        async def build():
+            products, next_cursor = await get_products_page(
+                limit=request.args.get('limit', type=int),
+                cursor=request.args.get('cursor'),
+                projection=projection
+            )
+            return {"success": True, "data": products, "next_cursor": next_cursor}
+        return await conditional_list("products", build)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/cache/stats', methods=['GET'])
+async def api_product_cache_stats():
+    """Product cache hit/miss/eviction counters"""
+    return jsonify({"success": True, "data": product_cache_stats()})
+
+@app.route('/api/products/search', methods=['GET'])
+async def api_search_products():
+    """Autocomplete by name prefix/words, ranked (?q=&limit=)"""
+    try:
+        results = await search_products(request.args.get('q', ''), limit=request.args.get('limit', 10, type=int))
+        return jsonify({"success": True, "data": results})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/<product_id>', methods=['GET'])
+async def api_get_product(product_id):
+    """Get product by ID"""
+    try:
+        return await conditional_doc("products", lambda: get_product_by_id(product_id), "מוצר לא נמצא")
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products', methods=['POST'])
+async def api_create_product():
+    """Create new product"""
+    try:
+        data = (await request.get_json()) or {}
+        product_id = await create_product(
+            product_id=data['product_id'],
+            name=data['name'],
+            category=data['category'],
+            price=float(data['price'])
+        )
+        return jsonify({"success": True, "data": {"_id": product_id}})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/<product_id>', methods=['PUT'])
+async def api_update_product(product_id):
+    """Update product"""
+    try:
+        data = (await request.get_json()) or {}
+        price = data.get('price')  # handle 0 correctly
+        updated_product = await update_product(
+            product_id=product_id,
+            name=data.get('name'),
+            category=data.get('category'),
+            price=float(price) if price is not None else None
+        )
+        if updated_product:
+            return jsonify({"success": True, "data": updated_product})
+        else:
+            return jsonify({"success": False, "error": "מוצר לא נמצא"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/bulk', methods=['PATCH'])
+async def api_bulk_update_products():
+    """
+    Set-based update: {"filter": {"category"|"ids"|"min_price"|"max_price"},
+    "update": {"field": "price", "op": "set"|"multiply"|"add", "value": ...} or "updates": [...]}
+    """
+    try:
+        data = (await request.get_json()) or {}
+        operations = data.get('updates') or ([data['update']] if data.get('update') else [])
+        result = await bulk_update_products(data.get('filter') or {}, operations)
+        return jsonify({"success": True, "data": result})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/<product_id>', methods=['DELETE'])
+async def api_delete_product(product_id):
+    """Delete product"""
+    try:
+        deleted_count = await delete_product(product_id)
+        if deleted_count > 0:
+            return jsonify({"success": True, "message": "מוצר נמחק בהצלחה"})
+        else:
+            return jsonify({"success": False, "error": "מוצר לא נמצא"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ================= BULK IMPORT / EXPORT =================
+
+def upload_format(filename=None):
+    fmt = request.args.get('format')
+    if not fmt and request.mimetype in (NDJSON_MIMETYPE, "application/jsonl"):
+        fmt = "jsonl"
+    return detect_format(fmt, filename)
+
+@app.route('/api/products/import', methods=['POST'], defaults={'resource': 'products'})
+@app.route('/api/customers/import', methods=['POST'], defaults={'resource': 'customers'})
+async def api_import(resource):
+    """Bulk upsert from CSV/JSONL - raw body or multipart `file` (?format=csv|jsonl&mode=upsert|replace)"""
+    try:
+        if request.mimetype == "multipart/form-data":
+            upload = (await request.files).get('file')
+            if upload is None:
+                raise ValueError("Missing file")
+            raw, fmt = upload.stream, upload_format(upload.filename)
+        else:
+            # spooled to disk past 8 MB, then parsed in a worker thread by the sync importer
+            raw, fmt = tempfile.SpooledTemporaryFile(max_size=8 << 20), upload_format()
+            async for chunk in request.body:
+                raw.write(chunk)
+        raw.seek(0)
+        report = await asyncio.to_thread(import_stream, resource, iter_text_lines(raw), fmt,
+                                         mode=request.args.get('mode', 'upsert'))
+        return jsonify({"success": report["error_count"] == 0, "data": report})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/products/export', methods=['GET'], defaults={'resource': 'products'})
+@app.route('/api/customers/export', methods=['GET'], defaults={'resource': 'customers'})
+async def api_export(resource):
+    """Streams the whole collection as CSV/JSONL (?format=csv|jsonl)"""
+    try:
+        fmt = detect_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    async def generate():
+        cursor = async_coll(resource).find({}, export_projection(resource), batch_size=EXPORT_BATCH_SIZE).sort("_id", 1)
+        try:
+            batch, first = [], True
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    yield encode_batch(resource, batch, fmt, header=first).encode()
+                    batch, first = [], False
+            if batch or first:
+                yield encode_batch(resource, batch, fmt, header=first).encode()
+        finally:
+            await cursor.close()
+    return Response(generate(), mimetype="text/csv" if fmt == "csv" else NDJSON_MIMETYPE,
+                    headers={"Content-Disposition": f'attachment; filename="{resource}.{fmt}"'})
+
+# ================= ORDERS API =================
+
+@app.route('/api/orders', methods=['GET'])
+async def api_get_orders():
+    """
+    Get orders, optionally filtered by customer (?fields=|exclude=|view=summary for list views).
+    ?expand=customer,products joins customer/product details into the page in one request.
+    """
+    try:
+        customer_id = request.args.get('customer_id')
+        projection = orders_projection(**projection_args())
+        expand = parse_expand(request.args.get('expand'))
+        if wants_ndjson():
+            batch_size = stream_batch_size()
+            return ndjson_response(
+                iter_orders(customer_id=customer_id, batch_size=batch_size, projection=projection), batch_size)
+
+        limit = int(request.args.get('limit', 100))
+        skip = int(request.args.get('skip', 0))
+
+        if skip:
+            # legacy offset paging, kept for old clients
+            orders = await list_orders(customer_id=customer_id, limit=limit, skip=skip, projection=projection)
+            return jsonify({"success": True, "data": await expand_orders(orders, expand)})
+
+        orders, next_cursor = await list_orders_page(
+            customer_id=customer_id,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            projection=projection
+        )
+        return jsonify({"success": True, "data": await expand_orders(orders, expand), "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/orders/<order_id>', methods=['GET'])
+async def api_get_order(order_id):
+    """Get order by ID"""
+    try:
+        projection = orders_projection(**projection_args())
+        expand = parse_expand(request.args.get('expand'))
+        if expand:
+            # joined data changes without the order's updatedAt changing - no ETag
+            order = await get_order_by_id(order_id, projection)
+            if not order:
+                return jsonify({"success": False, "error": "הזמנה לא נמצאה"}), 404
+            return jsonify({"success": True, "data": (await expand_orders([order], expand))[0]})
+        return await conditional_doc("orders", lambda: get_order_by_id(order_id, projection), "הזמנה לא נמצאה")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/orders', methods=['POST'])
+async def api_create_order():
+    """Create new order"""
+    try:
+        data = (await request.get_json()) or {}
+        order_id = await create_order(
+            order_id=data['order_id'],
+            customer_id=data['customer_id'],
+            items=data['items']
+        )
+        return jsonify({"success": True, "data": {"_id": order_id}})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+MAX_BULK_ORDERS = 50000
+
+@app.route('/api/orders/bulk', methods=['POST'])
+async def api_create_orders_bulk():
+    """Create many orders in one request ({"orders": [...]} or a plain list)"""
+    try:
+        data = (await request.get_json())
+        orders_data = data.get('orders') if isinstance(data, dict) else data
+        if not isinstance(orders_data, list):
+            raise ValueError("Expected a list of orders")
+        if len(orders_data) > MAX_BULK_ORDERS:
+            raise ValueError(f"At most {MAX_BULK_ORDERS} orders per request")
+
+        results = await create_orders_bulk(orders_data)
+        inserted = sum(1 for r in results if r["success"])
+        return jsonify({
+            "success": True,
+            "data": {"inserted": inserted, "failed": len(results) - inserted, "results": results}
+        })
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/orders/<order_id>', methods=['PUT'])
+async def api_update_order(order_id):
+    """Update order"""
+    try:
+        data = (await request.get_json()) or {}
+        updated_order = await update_order(
+            order_id=order_id,
+            status=data.get('status'),
+            items=data.get('items')
+        )
+        if updated_order:
+            return jsonify({"success": True, "data": updated_order})
+        else:
+            return jsonify({"success": False, "error": "הזמנה לא נמצאה"}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/orders/<order_id>', methods=['DELETE'])
+async def api_delete_order(order_id):
+    """Delete order"""
+    try:
+        deleted_count = await delete_order(order_id)
+        if deleted_count > 0:
+            return jsonify({"success": True, "message": "הזמנה נמחקה בהצלחה"})
+        else:
+            return jsonify({"success": False, "error": "הזמנה לא נמצאה"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ================= ANALYTICS API =================
+
+def parse_date_arg(name, end=False):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date for '{name}': {value}")
+    if end and len(value) == 10:
+        dt += timedelta(days=1)  # ?to=YYYY-MM-DD includes that whole day
+    return dt
+
+def analytics_window():
+    """?from=&to=&status=&granularity= -> sales_report() kwargs, or None for all-time"""
+    window = {
+        "start": parse_date_arg('from'),
+        "end": parse_date_arg('to', end=True),
+        "status": request.args.get('status'),
+    }
+    if not any(window.values()):
+        return None
+    window["granularity"] = request.args.get('granularity', 'day')
+    return window
+
+@app.route('/api/analytics/revenue', methods=['GET'])
+async def api_total_revenue():
+    """Get total revenue (all-time, or per day/week/month inside a window)"""
+    try:
+        window = analytics_window()
+        if window is None:
+            revenue = await total_revenue()
+            return jsonify({"success": True, "data": {"total_revenue": revenue}})
+
+        report = await sales_report(**window)
+        return jsonify({"success": True, "data": {
+            "total_revenue": report["totals"]["revenue"],
+            "orders": report["totals"]["orders"],
+            "by_period": report["revenueByPeriod"],
+        }})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/top-customers', methods=['GET'])
+async def api_top_customers():
+    """Get top customers by order count"""
+    try:
+        limit = int(request.args.get('limit', 5))
+        window = analytics_window()
+        if window is None:
+            top_customer_list = await top_customers(limit=limit)
+        else:
+            top_customer_list = (await sales_report(limit=limit, **window))["topCustomers"]
+        return jsonify({"success": True, "data": top_customer_list})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/top-products', methods=['GET'])
+async def api_top_products():
+    """Get top selling product"""
+    try:
+        window = analytics_window()
+        if window is None:
+            top_product = await top_products()
+        else:
+            top = (await sales_report(limit=1, **window))["topProducts"]
+            top_product = top[0] if top else None
+        return jsonify({"success": True, "data": top_product})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/dashboard', methods=['GET'])
+async def api_dashboard():
+    """Revenue by period and category plus top-N products/customers, in one $facet query"""
+    try:
+        window = analytics_window() or {"granularity": request.args.get('granularity', 'day')}
+        limit = int(request.args.get('limit', 5))
+        return jsonify({"success": True, "data": await sales_report(limit=limit, **window)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/counts', methods=['GET'])
+async def api_get_counts():
+    """Get counts of customers, products, and orders"""
+    try:
+        counts = await get_counts_async(["customers", "products", "orders"])
+        return jsonify({"success": True, "data": counts})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ---------------- Snapshot analytics (snapshot.py) ----------------
+@app.route('/api/analytics/snapshot', methods=['GET'])
+async def api_snapshot_info():
+    """Size and freshness of the columnar analytics snapshot"""
+    try:
+        return jsonify({"success": True, "data": snapshot_info(await asyncio.to_thread(snapshot.data))})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/snapshot/refresh', methods=['POST'])
+async def api_snapshot_refresh():
+    """Appends the orders created since the last refresh (building/rebuilding: python snapshot.py)"""
+    try:
+        await asyncio.to_thread(snapshot.refresh)
+        return jsonify({"success": True, "data": snapshot_info(await asyncio.to_thread(snapshot.data))})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/analytics/<any(rfm, basket, hourly):report>', methods=['GET'])
+async def api_snapshot_report(report):
+    """RFM segments, products bought together, hourly sales - computed from the snapshot"""
+    try:
+        data = await asyncio.to_thread(snapshot.data)
+        # NumPy work runs in a thread, off the event loop
+        result = await asyncio.to_thread(REPORTS[report], data, **report_kwargs(report, request.args))
+        if report == "basket":
+            name_products(result, await get_products_by_ids(report_product_ids(result)))
+        return jsonify({"success": True, "data": result, "snapshot": snapshot_info(data)})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+async def api_metrics():
+    """Prometheus metrics: per-route latency/errors, Mongo command timings, pool wait"""
+    for stat, value in product_cache_stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics.product_cache.set(stat, value=value)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# Health check endpoint
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint - pings MongoDB"""
+    start = asyncio.get_running_loop().time()
+    try:
+        await get_async_client().admin.command("ping")
+    except Exception as e:
+        return jsonify({"status": "unhealthy", "message": "Async API is running",
+                        "database": {"status": "unhealthy", "error": str(e)}}), 503
+    ping_ms = round((asyncio.get_running_loop().time() - start) * 1000, 2)
+    return jsonify({"status": "healthy", "message": "Async API is running",
+                    "database": {"status": "healthy", "ping_ms": ping_ms}})
+
+if __name__ == '__main__':
+    print("🚀 Starting async API Server...")
+    app.run(host='0.0.0.0', port=5000)
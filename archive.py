@@ -0,0 +1,218 @@
+"""
+Hot/cold tiering of orders.
+
+    python archive.py run [--days 365] [--batch 1000] [--export-dir archive/]
+    python archive.py stats
+
+Orders older than ORDERS_ARCHIVE_AFTER_DAYS (default 365) move from `orders` to
+`orders_archive`, so the hot collection and its indexes stay small enough to be
+kept in RAM. Reads in orders.py / orders_async.py go to the hot collection first
+and continue in the archive (get by id, list pages, streams, the sales report);
+counters and rollups keep counting archived orders. Archived orders are read-only
+but can still be deleted.
+
+--export-dir also appends each moved order to a gzipped per-month JSON Lines file
+(orders-YYYY-MM.jsonl.gz, MongoDB extended JSON) for storage outside the database.
+"""
+import argparse, gzip, os, sys, time
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from pathlib import Path
+
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pymongo import ReplaceOne, DeleteOne, ReadPreference, ASCENDING, DESCENDING
+
+from db import orders_coll, orders_archive_coll, get_client, get_db, TRANSACTIONAL
+from pagination import fetch_page, fetch_page_async, keyset_query, encode_cursor
+
+ARCHIVE_COLLECTION = "orders_archive"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ORDERS_ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = 1000
+MOVE_SORT = [("createdAt", ASCENDING), ("_id", ASCENDING)]
+
+def ensure_archive_indexes():
+    # the archive serves the same reads as the hot collection, only less often
+    archive = orders_archive_coll()
+    archive.create_index([("createdAt", DESCENDING), ("_id", DESCENDING)], name="createdAt_id_desc")
+    archive.create_index([("customerId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+                         name="customerId_createdAt_id")
+    archive.create_index([("status", ASCENDING), ("createdAt", DESCENDING)], name="status_createdAt")
+
+def with_archive(match: dict) -> list:
+    """Pipeline stages that add the archived orders matching `match` (put them right after $match)"""
+    return [{"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": match}]}}]
+
+# ---------------- Tiered reads ----------------
+def fetch_tiered_page(hot, cold, query: dict, sort: list, limit: int, cursor: str = None, projection=None):
+    """
+    fetch_page() over hot then cold. Assumes every archived order is older than every
+    hot one, so a (createdAt desc) page that runs out of hot orders continues in the
+    archive with the same cursor. archive_orders keeps that true on a replica set
+    (oldest first, one transaction per batch); on a standalone mongod an order updated
+    mid-move stays hot until the next run and is listed out of order until then.
+    """
+    docs, next_cursor = fetch_page(hot, query, sort, limit, cursor, projection)
+    if next_cursor or len(docs) == limit:   # a full last hot page: the archive may have more
+        return docs, next_cursor or encode_cursor(docs[-1], sort)
+    if docs:
+        cursor = encode_cursor(docs[-1], sort)
+    more, next_cursor = fetch_page(cold, query, sort, limit - len(docs), cursor, projection)
+    return docs + more, next_cursor
+
+async def fetch_tiered_page_async(hot, cold, query: dict, sort: list, limit: int, cursor: str = None,
+                                  projection=None):
+    docs, next_cursor = await fetch_page_async(hot, query, sort, limit, cursor, projection)
+    if next_cursor or len(docs) == limit:
+        return docs, next_cursor or encode_cursor(docs[-1], sort)
+    if docs:
+        cursor = encode_cursor(docs[-1], sort)
+    more, next_cursor = await fetch_page_async(cold, query, sort, limit - len(docs), cursor, projection)
+    return docs + more, next_cursor
+
+def archive_skip(hot, query: dict, skip: int, hot_found: int) -> int:
+    """Offset into the archive for a skip/limit page that ran past the hot orders"""
+    if not skip or hot_found:
+        return 0
+    return max(0, skip - hot.count_documents(query))
+
+class TieredCursor:
+    """Iterates a hot cursor, then an archive cursor; close() closes both"""
+
+    def __init__(self, *cursors):
+        self._cursors = cursors
+
+    def __iter__(self):
+        return chain.from_iterable(self._cursors)
+
+    def close(self):
+        for cursor in self._cursors:
+            cursor.close()
+
+class AsyncTieredCursor:
+    def __init__(self, *cursors):
+        self._cursors = cursors
+
+    async def __aiter__(self):
+        for cursor in self._cursors:
+            async for doc in cursor:
+                yield doc
+
+    async def close(self):
+        for cursor in self._cursors:
+            await cursor.close()
+
+# ---------------- Moving orders ----------------
+def month_file(export_dir: Path, created: datetime) -> Path:
+    return export_dir / f"orders-{created:%Y-%m}.jsonl.gz"
+
+def export_batch(docs: list, export_dir: Path):
+    by_month = {}
+    for doc in docs:
+        by_month.setdefault(month_file(export_dir, doc["createdAt"]), []).append(doc)
+    for path, month_docs in by_month.items():
+        # "a" adds a gzip member; gzip readers read the concatenation as one file
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            f.writelines(json_util.dumps(d, json_options=RELAXED_JSON_OPTIONS) + "\n" for d in month_docs)
+
+def supports_transactions(db) -> bool:
+    hello = db.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+def move_batch(hot, archive, ids: list, session) -> list:
+    """
+    One transaction: the current version of each order is copied and deleted. An order
+    updated or deleted meanwhile is either moved as it now is or not at all (a write
+    conflict makes with_transaction retry), so it never ends up in both tiers.
+    """
+    docs = list(hot.find({"_id": {"$in": ids}}, session=session))
+    if docs:
+        archive.bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs],
+                           ordered=False, session=session)
+        hot.delete_many({"_id": {"$in": [d["_id"] for d in docs]}}, session=session)
+    return docs
+
+def move_batch_unsafe(hot, archive, docs: list) -> list:
+    """
+    Standalone mongod (no transactions): copy, then delete only what wasn't updated in
+    between. The copies of the orders still hot are removed again, so none stays in both
+    tiers (only while a batch is moving); those stay hot until the next run. An order
+    deleted by delete_order between the read and the copy can still be left in the archive.
+    """
+    archive.bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False)
+    hot.bulk_write([DeleteOne({"_id": d["_id"], "updatedAt": d.get("updatedAt")}) for d in docs], ordered=False)
+    still_hot = [d["_id"] for d in hot.find({"_id": {"$in": [d["_id"] for d in docs]}}, {"_id": 1})]
+    if still_hot:
+        archive.delete_many({"_id": {"$in": still_hot}})
+    kept = set(still_hot)
+    return [d for d in docs if d["_id"] not in kept]
+
+def archive_orders(days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                   export_dir: str = None, log=print) -> dict:
+    """
+    Moves orders created more than `days` ago, oldest first, one batch at a time.
+    On a replica set each batch is one transaction (move_batch); on a standalone
+    mongod orders updated mid-move are skipped (move_batch_unsafe).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    hot, archive = orders_coll(TRANSACTIONAL), orders_archive_coll()
+    ensure_archive_indexes()
+    if export_dir:
+        export_dir = Path(export_dir)
+        export_dir.mkdir(parents=True, exist_ok=True)
+    transactions = supports_transactions(get_db())
+    if not transactions:
+        log("no transactions (standalone mongod): orders updated mid-move stay hot until the next run")
+
+    query = {"createdAt": {"$lt": cutoff}}
+    moved = skipped = 0
+    last = None
+    while True:
+        found = hot.find(keyset_query(query, MOVE_SORT, last), {"_id": 1, "createdAt": 1} if transactions else None,
+                         sort=MOVE_SORT, limit=batch_size)
+        docs = list(found)
+        if not docs:
+            break
+        if transactions:
+            ids = [d["_id"] for d in docs]
+            with get_client().start_session() as session:
+                done = session.with_transaction(lambda s: move_batch(hot, archive, ids, s),
+                                                read_preference=ReadPreference.PRIMARY)
+        else:
+            done = move_batch_unsafe(hot, archive, docs)
+        if export_dir and done:
+            export_batch(done, export_dir)   # after the commit - with_transaction may run the batch twice
+        moved += len(done)
+        skipped += len(docs) - len(done)
+        last = encode_cursor(docs[-1], MOVE_SORT)
+        log(f"archived {moved} orders (up to {docs[-1]['createdAt']:%Y-%m-%d})")
+    return {"archived": moved, "skipped": skipped, "cutoff": cutoff.isoformat()}
+
+def tier_stats() -> dict:
+    """Documents, data and index size (MiB) of both tiers - the hot indexes should fit in RAM"""
+    db = get_db()
+    stats = {}
+    for name in ("orders", ARCHIVE_COLLECTION):
+        s = db.command("collStats", name, scale=1024 * 1024)
+        stats[name] = {"count": s.get("count", 0), "data_mib": s.get("size", 0),
+                       "storage_mib": s.get("storageSize", 0), "indexes_mib": s.get("totalIndexSize", 0)}
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("run", "stats"))
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive orders older than this")
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH_SIZE, help="orders moved per round trip")
+    parser.add_argument("--export-dir", help="also append moved orders to per-month .jsonl.gz files")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        for name, s in tier_stats().items():
+            print(f"{name:<16} {s}")
+        return
+    t0 = time.perf_counter()
+    result = archive_orders(args.days, args.batch, args.export_dir, log=lambda m: print(m, file=sys.stderr))
+    print(result, f"in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Compares two benchmark result files (from benchmarks.run --out).
+
+    python -m benchmarks.compare results/before.json results/after.json [--metric p95_ms]
+"""
+import argparse, json, sys
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", default="p50_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{'case':<46}{'before':>12}{'after':>12}{'change':>10}")
+    for name in sorted(set(before["results"]) | set(after["results"])):
+        b = before["results"].get(name, {}).get(args.metric)
+        a = after["results"].get(name, {}).get(args.metric)
+        change = f"{(a - b) / b * 100:+.1f}%" if a is not None and b else "-"
+        print(f"{name:<46}{b if b is not None else '-':>12}{a if a is not None else '-':>12}{change:>10}")
+
+if __name__ == "__main__":
+    sys.exit(main())
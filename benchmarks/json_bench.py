@@ -0,0 +1,83 @@
+"""
+JSON provider micro-benchmark: the stdlib provider (CustomJSONProvider) against
+JSON_PROVIDER=orjson, encoding the response bodies of the list endpoints.
+
+    python -m benchmarks.json_bench --iterations 200 [--out results/json.json]
+    python -m benchmarks.compare results/json-before.json results/json-after.json
+
+Payloads are generated (seed_data.py), so no MongoDB is needed. The raw_bson cases
+encode the same orders as RawBSONDocument, which is what a collection opened with
+document_class=RawBSONDocument returns.
+"""
+import argparse, json, platform, sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bson import encode
+from bson.raw_bson import RawBSONDocument
+
+from benchmarks.run import measure, git_commit
+from seed_data import make_orders, make_catalog, scale_sizes
+
+def payloads(seed: int) -> dict:
+    cfg = {"seed": seed, "sizes": scale_sizes(100_000), "days": 30,
+           "now": datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0).isoformat()}
+    orders = make_orders(0, 1000, cfg)
+    catalog, _, _ = make_catalog(1000, seed)
+    raw_orders = [RawBSONDocument(encode(o)) for o in orders]
+    return {
+        "GET /api/orders?limit=100": {"success": True, "data": orders[:100], "next_cursor": "x" * 40},
+        "GET /api/orders?limit=1000": {"success": True, "data": orders, "next_cursor": "x" * 40},
+        "GET /api/orders?limit=1000 raw_bson": {"success": True, "data": raw_orders, "next_cursor": "x" * 40},
+        "GET /api/products?limit=1000": {"success": True, "data": catalog, "next_cursor": "x" * 40},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    from app import app, CustomJSONProvider, OrjsonJSONProvider
+    providers = {"json": CustomJSONProvider(app)}
+    try:
+        providers["orjson"] = OrjsonJSONProvider(app)
+        providers["orjson"].dumps({})
+    except Exception as e:   # orjson not installed
+        del providers["orjson"]
+        print(f"skipping orjson: {e!r}", file=sys.stderr)
+
+    results = {}
+    sizes = {}
+    with app.app_context():
+        for case, payload in payloads(args.seed).items():
+            for name, provider in providers.items():
+                key = f"{name}:{case}"
+                results[key] = measure(lambda i: provider.response(payload).get_data(), args.iterations)
+                sizes[key] = len(provider.response(payload).get_data())
+                r = results[key]
+                print(f"{key:<48} p50={r['p50_ms']:>9}ms p99={r['p99_ms']:>9}ms "
+                      f"{sizes[key] / 1024:>8.0f}KiB errors={r['errors']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "body_bytes": sizes,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
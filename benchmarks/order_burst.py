@@ -0,0 +1,81 @@
+"""
+POS burst benchmark: many threads creating orders at once, with one insert_one per
+order and with group commit (order_writer.py).
+
+    python -m benchmarks.order_burst --threads 64 --orders 5000 [--db Market_bench] [--out results/burst.json]
+
+Runs against MONGO_URI (mongod only - group commit saves round trips and journal
+flushes, which an in-process stand-in doesn't have). Run benchmarks.run first to seed
+products and customers; the orders written here are left in the database.
+The write concern is the one orders.py uses (ORDER_WRITE_CONCERN / ORDER_WRITE_JOURNAL).
+"""
+import argparse, json, os, platform, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.run import percentile, git_commit
+
+def burst(create, threads: int, count: int, prefix: str, product_ids: list, customer_ids: list) -> dict:
+    def one(i):
+        t0 = time.perf_counter()
+        create(f"{prefix}-{i}", customer_ids[i % len(customer_ids)],
+               [{"productId": product_ids[(i + k) % len(product_ids)], "quantity": 1} for k in range(3)])
+        return (time.perf_counter() - t0) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+    return {"orders": count, "threads": threads, "orders_per_s": round(count / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 3), "p99_ms": round(percentile(latencies, 99), 3)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--db", default="Market_bench")
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    os.environ["DB_NAME"] = args.db   # before db.py is imported
+    import orders
+    from db import products_coll, customers_coll
+    from order_writer import GroupCommitWriter, group_commit_settings
+    product_ids = [p["_id"] for p in products_coll().find({}, {"_id": 1}).limit(1000)]
+    customer_ids = [c["_id"] for c in customers_coll().find({}, {"_id": 1}).limit(1000)]
+    if not product_ids or not customer_ids:
+        sys.exit("no products/customers - seed with python -m benchmarks.run first")
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    writer = GroupCommitWriter(orders.insert_order_docs, orders.record_written_orders,
+                               name="orders-bench", **group_commit_settings())
+    results = {}
+    for mode, order_writer in (("insert_one", None), ("group_commit", writer)):
+        orders.order_writer = order_writer
+        results[mode] = burst(orders.create_order, args.threads, args.orders, f"burst-{run_id}-{mode}",
+                              product_ids, customer_ids)
+        r = results[mode]
+        print(f"{mode:<14} {r['orders_per_s']:>9}/s p50={r['p50_ms']:>9}ms p99={r['p99_ms']:>9}ms", file=sys.stderr)
+    writer.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "write_concern": repr(orders.ORDER_WRITE_CONCERN),
+            **group_commit_settings(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmarks for the data layer and the HTTP API.
+
+    python -m benchmarks.run --scale 10k --db Market_bench --out results/10k.json
+    python -m benchmarks.run --scale 1m --backend mongomock --only data
+    python -m benchmarks.compare results/before.json results/after.json
+
+--backend mongod uses MONGO_URI from .env with the database named by --db
+(never point it at production data: seeding wipes the collections).
+--backend mongomock runs against an in-process stand-in (pip install mongomock);
+its numbers are only useful for comparing Python-side costs.
+"""
+import argparse, json, os, platform, random, statistics, subprocess, sys, time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+def measure(fn, iterations: int, warmup: int = 5) -> dict:
+    """
+    Runs fn(i) `iterations` times; latencies in ms, throughput in ops/s.
+    A case the backend can't run at all (mongomock raises NotImplementedError for
+    e.g. $unionWith or $dateTrunc) is reported as skipped instead of as errors.
+    """
+    errors = 0
+    last_error = None
+    for i in range(warmup):
+        try:
+            fn(-1 - i)
+        except NotImplementedError as e:
+            return {"iterations": 0, "skipped": f"not supported by the backend: {str(e).split('. See')[0]}"}
+        except Exception:
+            pass
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            errors += 1
+            last_error = repr(e)
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "iterations": iterations,
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else None,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+    if last_error:
+        result["last_error"] = last_error
+    return result
+
+def data_cases(sizes: dict, rnd: random.Random, run_id: str) -> dict:
+    import orders, products
+    product_ids = [f"P{rnd.randrange(sizes['products']):06d}" for _ in range(1000)]
+    customer_ids = [f"C{rnd.randrange(sizes['customers']):07d}" for _ in range(1000)]
+    deep_cursor = {}
+
+    def deep_page(i):
+        # walk the keyset cursor: page N costs what page 1 costs
+        docs, deep_cursor["next"] = orders.list_orders_page(limit=50, cursor=deep_cursor.get("next"))
+
+    return {
+        "create_order": lambda i: orders.create_order(
+            f"bench-{run_id}-{i}", customer_ids[i % 1000],
+            [{"productId": product_ids[(i + k) % 1000], "quantity": 1 + k} for k in range(3)]),
+        "list_orders_page": lambda i: orders.list_orders_page(limit=50),
+        "list_orders_page_deep": deep_page,
+        "list_orders_by_customer": lambda i: orders.list_orders_page(customer_id=customer_ids[i % 1000], limit=50),
+        "get_product_by_id": lambda i: products.get_product_by_id(product_ids[i % 1000]),
+        "total_revenue": lambda i: orders.total_revenue(),
+        "top_customers": lambda i: orders.top_customers(limit=5),
+        "top_products": lambda i: orders.top_products(),
+        "sales_report_7d": lambda i: orders.sales_report(start=datetime.now(timezone.utc) - timedelta(days=7)),
+    }
+
+def http_cases(sizes: dict, rnd: random.Random, run_id: str) -> dict:
+    from app import app
+    client = app.test_client()
+    product_ids = [f"P{rnd.randrange(sizes['products']):06d}" for _ in range(1000)]
+    customer_ids = [f"C{rnd.randrange(sizes['customers']):07d}" for _ in range(1000)]
+
+    def get(path):
+        def call(i):
+            res = client.get(path(i) if callable(path) else path)
+            if res.status_code >= 500:
+                raise RuntimeError(f"{res.status_code}: {res.get_data(as_text=True)[:200]}")
+        return call
+
+    def post_order(i):
+        res = client.post("/api/orders", json={
+            "order_id": f"http-{run_id}-{i}", "customer_id": customer_ids[i % 1000],
+            "items": [{"productId": product_ids[(i + k) % 1000], "quantity": 1} for k in range(3)]})
+        if res.status_code >= 400:
+            raise RuntimeError(f"{res.status_code}: {res.get_data(as_text=True)[:200]}")
+
+    return {
+        "POST /api/orders": post_order,
+        "GET /api/orders": get("/api/orders?limit=50"),
+        "GET /api/products/<id>": get(lambda i: f"/api/products/{product_ids[i % 1000]}"),
+        "GET /api/analytics/revenue": get("/api/analytics/revenue"),
+        "GET /api/analytics/top-customers": get("/api/analytics/top-customers?limit=5"),
+        "GET /api/analytics/top-products": get("/api/analytics/top-products"),
+        "GET /api/analytics/counts": get("/api/analytics/counts"),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent.parent).stdout.strip()
+    except OSError:
+        return ""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k", help="orders to seed: 10k, 100k, 1m, 10m or a number")
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongod")
+    parser.add_argument("--db", default="Market_bench", help="database name (mongod backend)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", choices=("data", "http"), help="run one group only")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse data from a previous run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="seeding processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="allow seeding the app's own database (mongod backend)")
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    from seed_data import seed, scale_sizes, parse_scale, check_target   # before DB_NAME is changed
+    if args.backend == "mongod" and not args.skip_seed:
+        try:
+            check_target(args.db, args.force)
+        except ValueError as e:
+            sys.exit(str(e))
+    os.environ["DB_NAME"] = args.db   # before db.py is imported
+    import db
+    if args.backend == "mongomock":
+        import mongomock
+        db.use_client(mongomock.MongoClient())
+        args.skip_seed = False   # in-memory: nothing to reuse
+        args.workers = 0         # worker processes would not see the in-memory data
+        args.force = True        # nothing real to replace
+
+    orders_count = parse_scale(args.scale)
+    if args.skip_seed:
+        sizes = scale_sizes(orders_count)
+        seed_seconds = None
+    else:
+        t0 = time.perf_counter()
+        sizes = seed(orders_count, seed=args.seed, workers=args.workers,
+                     log=lambda m: print(m, file=sys.stderr), force=args.force)
+        seed_seconds = round(time.perf_counter() - t0, 2)
+        print(f"seeded {sizes} in {seed_seconds}s", file=sys.stderr)
+
+    rnd = random.Random(args.seed)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    groups = {"data": data_cases, "http": http_cases}
+    results = {}
+    for group, make_cases in groups.items():
+        if args.only and args.only != group:
+            continue
+        for name, fn in make_cases(sizes, rnd, run_id).items():
+            results[f"{group}:{name}"] = measure(fn, args.iterations)
+            r = results[f"{group}:{name}"]
+            if "skipped" in r:
+                print(f"{group}:{name:<36} skipped - {r['skipped']}", file=sys.stderr)
+                continue
+            print(f"{group}:{name:<36} p50={r['p50_ms']:>9}ms p99={r['p99_ms']:>9}ms "
+                  f"{r['throughput_per_s']:>9}/s errors={r['errors']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "scale": orders_count,
+            "sizes": sizes,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "seed_seconds": seed_seconds,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Startup cost: how long a fresh interpreter takes to import the data modules
+(and, with --warmup, to reach a live MongoDB).
+
+    python -m benchmarks.startup --runs 10 [--warmup] [--out startup.json]
+
+Run it on the commit before and after a change to compare.
+"""
+import argparse, json, statistics, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import customers, products, orders
+t1 = time.perf_counter()
+if {warmup}:
+    import db
+    db.warmup()
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000)
+"""
+
+def measure(runs: int, warmup: bool) -> dict:
+    imports, connects = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(warmup=warmup)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        import_ms, connect_ms = map(float, out.split())
+        imports.append(import_ms)
+        connects.append(connect_ms)
+
+    result = {
+        "runs": runs,
+        "import_ms": {"median": statistics.median(imports), "min": min(imports), "max": max(imports)},
+    }
+    if warmup:
+        result["warmup_ms"] = {"median": statistics.median(connects), "min": min(connects), "max": max(connects)}
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", action="store_true", help="also time db.warmup() (needs a live MongoDB)")
+    parser.add_argument("--out", help="write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs, args.warmup)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Streaming bulk import/export of products and customers (CSV or JSON Lines).
+
+    python catalog_io.py import products prices.csv [--mode upsert|replace] [--chunk 5000] [--workers 4]
+    python catalog_io.py export customers customers.jsonl
+
+Import reads the file one row at a time and writes unordered bulk_write chunks from
+a few threads, with a bounded number of chunks in flight, so memory stays flat
+whatever the file size. Rows are matched on their id (product_id / customer_id / _id):
+- upsert (default): UpdateOne($set, upsert=True). Rows with only some of the fields
+  (e.g. a price list: product_id,price) update existing documents and are never inserted.
+- replace: the whole document is replaced (upsert, as a $replaceRoot pipeline update that
+  keeps an existing createdAt); every row must be complete.
+Bad rows are reported with their line number and skipped; the rest of the file is imported.
+"""
+import argparse, codecs, csv, io, json, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db import products_coll, customers_coll
+from counters import incr_count, bump_version
+from json_provider import bson_default
+
+FORMATS = ("csv", "jsonl")
+MODES = ("upsert", "replace")
+CHUNK_SIZE = 5000
+WORKERS = 4
+EXPORT_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+
+def _price(value):
+    price = float(value)
+    if price < 0:
+        raise ValueError("price must be >= 0")
+    return price
+
+# resource -> id column, {field: parser}, collection
+RESOURCES = {
+    "products": {"id": "product_id", "fields": {"name": str, "category": str, "price": _price},
+                 "coll": products_coll},
+    "customers": {"id": "customer_id", "fields": {"name": str, "phone": str, "email": str},
+                  "coll": customers_coll},
+}
+
+def resource_spec(resource: str) -> dict:
+    if resource not in RESOURCES:
+        raise ValueError(f"Unknown resource: {resource}")
+    return RESOURCES[resource]
+
+def detect_format(fmt: str = None, filename: str = None) -> str:
+    if not fmt and filename:
+        fmt = "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+    fmt = (fmt or "csv").lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (csv or jsonl)")
+    return fmt
+
+def iter_text_lines(raw, block_size: int = 1 << 16):
+    """Text lines from a binary stream (request body, upload), read in blocks"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        block = raw.read(block_size)
+        pending += decoder.decode(block, final=not block)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if not block:
+            if pending:
+                yield pending
+            return
+
+def iter_rows(stream, fmt: str):
+    """(line number, raw dict or parse error) for each row of a text stream"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+            continue
+        yield line_no, row if isinstance(row, dict) else ValueError("Each line must be a JSON object")
+
+def parse_row(spec: dict, raw: dict) -> tuple:
+    """Returns (_id, fields); only the non-empty columns become fields"""
+    doc_id = raw.get(spec["id"]) or raw.get("_id")
+    if doc_id in (None, ""):
+        raise ValueError(f"Missing {spec['id']}")
+    fields = {}
+    for name, parse in spec["fields"].items():
+        value = raw.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            fields[name] = parse(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {name}: {value!r}")
+    if not fields:
+        raise ValueError("No fields to write")
+    return str(doc_id), fields
+
+def row_op(spec: dict, doc_id: str, fields: dict, mode: str, now: datetime):
+    complete = len(fields) == len(spec["fields"])
+    if mode == "replace":
+        if not complete:
+            missing = sorted(set(spec["fields"]) - set(fields))
+            raise ValueError(f"Missing fields for replace: {', '.join(missing)}")
+        # a full replacement that keeps the original createdAt ($literal: values are data, not expressions)
+        doc = {"_id": {"$literal": doc_id}, **{k: {"$literal": v} for k, v in fields.items()},
+               "createdAt": {"$ifNull": ["$createdAt", now]}, "updatedAt": now}
+        return UpdateOne({"_id": doc_id}, [{"$replaceRoot": {"newRoot": doc}}], upsert=True)
+    update = {"$set": {**fields, "updatedAt": now}}
+    if complete:
+        update["$setOnInsert"] = {"createdAt": now}
+    # partial rows only touch documents that already exist
+    return UpdateOne({"_id": doc_id}, update, upsert=complete)
+
+class ImportReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = self.inserted = self.modified = self.matched = self.unmatched = 0
+        self.error_count = 0
+        self.errors = []   # first MAX_REPORTED_ERRORS as {"line", "error"}
+
+    def error(self, line_no, message: str):
+        with self._lock:
+            self.error_count += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"line": line_no, "error": message})
+
+    def to_dict(self) -> dict:
+        return {"rows": self.rows, "inserted": self.inserted, "modified": self.modified,
+                "matched": self.matched, "unmatched": self.unmatched,
+                "error_count": self.error_count, "errors": sorted(self.errors, key=lambda e: e["line"])}
+
+def _write_chunk(coll, ops: list, lines: list, report: ImportReport):
+    try:
+        result = coll.bulk_write(ops, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        for err in result.get("writeErrors", []):
+            report.error(lines[err["index"]], err.get("errmsg", "write error"))
+    upserted = result.get("nUpserted", 0)
+    matched = result.get("nMatched", 0)
+    with report._lock:
+        report.inserted += upserted
+        report.matched += matched
+        report.modified += result.get("nModified", 0)
+        report.unmatched += len(ops) - upserted - matched - len(result.get("writeErrors", []))
+
+def import_stream(resource: str, stream, fmt: str = "csv", mode: str = "upsert",
+                  chunk_size: int = CHUNK_SIZE, workers: int = WORKERS) -> dict:
+    """Imports a text stream; returns the report (counts + per-row errors)"""
+    spec = resource_spec(resource)
+    fmt = detect_format(fmt)
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode} (upsert or replace)")
+    coll = spec["coll"]()
+    report = ImportReport()
+    now = datetime.utcnow()
+    in_flight = threading.BoundedSemaphore(max(1, workers) * 2)   # bounds memory to a few chunks
+    futures = []
+
+    def submit(ops, lines):
+        in_flight.acquire()
+        future = pool.submit(_write_chunk, coll, ops, lines, report)
+        future.add_done_callback(lambda f: in_flight.release())
+        futures.append(future)
+
+    failed = True
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            ops, lines = [], []
+            for line_no, raw in iter_rows(stream, fmt):
+                report.rows += 1
+                try:
+                    if isinstance(raw, Exception):
+                        raise raw
+                    ops.append(row_op(spec, *parse_row(spec, raw), mode, now))
+                    lines.append(line_no)
+                except ValueError as e:
+                    report.error(line_no, str(e))
+                    continue
+                if len(ops) >= chunk_size:
+                    submit(ops, lines)
+                    ops, lines = [], []
+            if ops:
+                submit(ops, lines)
+        for future in futures:
+            future.result()   # re-raises connection errors etc.
+        failed = False
+    finally:
+        # counted and uncached even when a chunk or the stream failed: the other chunks were written
+        incr_count(resource, report.inserted)
+        if report.modified or failed:   # a failed chunk may have changed documents it couldn't report
+            bump_version(resource)
+        if resource == "products":
+            from products import product_cache, search_index
+            product_cache.invalidate()
+            search_index.invalidate()
+    return report.to_dict()
+
+def import_file(resource: str, path: str, fmt: str = None, **kwargs) -> dict:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return import_stream(resource, f, detect_format(fmt, path), **kwargs)
+
+# ---------------- Export ----------------
+def export_columns(resource: str) -> list:
+    spec = resource_spec(resource)
+    return [spec["id"], *spec["fields"]]
+
+def encode_batch(resource: str, docs: list, fmt: str, header: bool = False) -> str:
+    """One chunk of export output; the id column is named like the import expects"""
+    columns = export_columns(resource)
+    rows = ({columns[0]: d["_id"], **{c: d.get(c) for c in columns[1:]}} for d in docs)
+    if fmt == "jsonl":
+        return "".join(json.dumps(r, default=bson_default, ensure_ascii=False) + "\n" for r in rows)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+def export_projection(resource: str) -> dict:
+    return {c: 1 for c in resource_spec(resource)["fields"]}
+
+def iter_export(resource: str, fmt: str = "csv", batch_size: int = EXPORT_BATCH_SIZE):
+    """Yields the export as text chunks, one per cursor batch"""
+    fmt = detect_format(fmt)
+    coll = resource_spec(resource)["coll"]()
+    cursor = coll.find({}, export_projection(resource), batch_size=batch_size).sort("_id", 1)
+    try:
+        batch, first = [], True
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield encode_batch(resource, batch, fmt, header=first)
+                batch, first = [], False
+        if batch or first:
+            yield encode_batch(resource, batch, fmt, header=first)
+    finally:
+        cursor.close()
+
+def export_file(resource: str, path: str, fmt: str = None, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    fmt = detect_format(fmt, path)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for chunk in iter_export(resource, fmt, batch_size):
+            f.write(chunk)
+            written += 1
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("resource", choices=tuple(RESOURCES))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--mode", choices=MODES, default="upsert")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="operations per bulk_write")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent bulk_write threads")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="export cursor batch size")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.command == "import":
+        report = import_file(args.resource, args.path, args.format, mode=args.mode,
+                             chunk_size=args.chunk, workers=args.workers)
+        errors = report.pop("errors")
+        for err in errors:
+            print(f"line {err['line']}: {err['error']}", file=sys.stderr)
+        print(json.dumps(report), f"in {time.perf_counter() - t0:.1f}s")
+        sys.exit(1 if report["error_count"] else 0)
+    export_file(args.resource, args.path, args.format, args.batch_size)
+    print(f"exported {args.resource} to {args.path} in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from db import counters_coll, customers_coll, products_coll, orders_coll, async_coll, LazyCollection
+
+counters = counters_coll()
+
+# שמות המונים -> האוסף שהם סופרים
+_SOURCES = {
+    "customers": customers_coll,
+    "products": products_coll,
+    "orders": orders_coll,
+}
+# archived documents still count (archive.py)
+_ARCHIVES = {"orders": "orders_archive"}
+
+def incr_count(name: str, delta: int = 1):
+    # no upsert: a missing counter is seeded from the collection on first read
+    if delta:
+        counters.update_one({"_id": name}, {"$inc": {"count": delta, "version": 1}})
+
+def bump_version(name: str):
+    # writes that don't change the count (updates) still change the collection's version
+    counters.update_one({"_id": name}, {"$inc": {"version": 1}})
+
+def _seed_count(name: str) -> int:
+    # metadata based, O(1) - exact recount is done by rebuild_counters()
+    count = _SOURCES[name]().estimated_document_count()
+    if name in _ARCHIVES:
+        count += LazyCollection(_ARCHIVES[name]).estimated_document_count()
+    counters.update_one({"_id": name}, {"$setOnInsert": {"count": count, "version": 0}}, upsert=True)
+    return count
+
+def get_counts(names=None) -> dict:
+    names = list(names or _SOURCES)
+    found = {d["_id"]: d["count"] for d in counters.find({"_id": {"$in": names}})}
+    return {name: found[name] if name in found else _seed_count(name) for name in names}
+
+def get_count(name: str) -> int:
+    return get_counts([name])[name]
+
+def get_version(name: str) -> int:
+    """
+    Changes whenever the collection is written through this code (see http_cache.py).
+    Reading seeds the counter document, so every version handed out can be bumped.
+    """
+    doc = counters.find_one({"_id": name}, {"version": 1})
+    if doc is None:
+        _seed_count(name)
+        return 0
+    return doc.get("version", 0)
+
+# ---------------- asyncio variants (app_async.py) ----------------
+async def incr_count_async(name: str, delta: int = 1):
+    if delta:
+        await async_coll("counters").update_one({"_id": name}, {"$inc": {"count": delta, "version": 1}})
+
+async def bump_version_async(name: str):
+    await async_coll("counters").update_one({"_id": name}, {"$inc": {"version": 1}})
+
+async def get_version_async(name: str) -> int:
+    doc = await async_coll("counters").find_one({"_id": name}, {"version": 1})
+    if doc is None:
+        await get_counts_async([name])
+        return 0
+    return doc.get("version", 0)
+
+async def get_counts_async(names=None) -> dict:
+    names = list(names or _SOURCES)
+    coll = async_coll("counters")
+    found = {d["_id"]: d["count"] async for d in coll.find({"_id": {"$in": names}})}
+    for name in names:
+        if name not in found:
+            found[name] = await async_coll(name).estimated_document_count()
+            if name in _ARCHIVES:
+                found[name] += await async_coll(_ARCHIVES[name]).estimated_document_count()
+            await coll.update_one({"_id": name}, {"$setOnInsert": {"count": found[name], "version": 0}}, upsert=True)
+    return {name: found[name] for name in names}
+
+def rebuild_counters() -> dict:
+    result = {}
+    for name, coll in _SOURCES.items():
+        count = coll().count_documents({})
+        if name in _ARCHIVES:
+            count += LazyCollection(_ARCHIVES[name]).count_documents({})
+        counters.update_one({"_id": name}, {"$set": {"count": count}, "$inc": {"version": 1}}, upsert=True)
+        result[name] = count
+    return result
+
+if __name__ == "__main__":
+    print(rebuild_counters())
@@ -1,10 +1,16 @@
 
-from db import customers_coll
+from db import customers_coll, TRANSACTIONAL, LISTING
+from counters import incr_count, bump_version
+from pagination import fetch_page, clamp_limit, DEFAULT_PAGE_SIZE
+from projection import build_projection
 from pymongo.errors import DuplicateKeyError
-from pymongo import ASCENDING
+from pymongo import ASCENDING, TEXT
 from pymongo import ReturnDocument
+from datetime import datetime
+import re
 
-customers = customers_coll()
+customers = customers_coll(TRANSACTIONAL)
+customers_listing = customers_coll(LISTING)
 
 def ensure_customers_indexes():
     
@@ -12,14 +18,18 @@ def ensure_customers_indexes():
     
     customers.create_index([("phone", ASCENDING)], name="phone_asc")
 
+    customers.create_index([("name", TEXT)], name="name_text")
+
 def create_customer( customer_id: str,name: str, phone: str, email: str):
     
-    doc = {"_id": customer_id,"name": name, "phone": phone, "email": email}
+    now = datetime.utcnow()
+    doc = {"_id": customer_id,"name": name, "phone": phone, "email": email, "createdAt": now, "updatedAt": now}
     try:
         res = customers.insert_one(doc)
-        return res.inserted_id  
     except DuplicateKeyError:
         raise ValueError(f"ID already exists: { customer_id}")
+    incr_count("customers")
+    return res.inserted_id
     
 def update_customer(customer_id: str, name: str = None, phone: str = None, email: str = None):
  
@@ -34,19 +44,97 @@ def update_customer(customer_id: str, name: str = None, phone: str = None, email
     if not update_fields:
         return None 
 
-    return customers.find_one_and_update(
+    update_fields["updatedAt"] = datetime.utcnow()
+    updated = customers.find_one_and_update(
         {"_id": customer_id},              
         {"$set": update_fields},           
         return_document=ReturnDocument.AFTER 
     )
+    if updated is not None:
+        bump_version("customers")
+    return updated
     
 def delete_customer(national_id: str):
     res = customers.delete_one({"_id": national_id})
+    incr_count("customers", -res.deleted_count)
     return res.deleted_count
 
+CUSTOMER_FIELDS = {"_id": 1, "name": 1, "email": 1, "phone": 1}
+CUSTOMERS_SORT = [("_id", ASCENDING)]
+CUSTOMER_VIEWS = {"summary": ["_id", "name"], "full": list(CUSTOMER_FIELDS)}
+
+def customers_projection(fields: str = None, exclude: str = None, view: str = None):
+    """?fields= / ?exclude= / ?view= -> projection, limited to CUSTOMER_FIELDS"""
+    return build_projection(CUSTOMER_FIELDS, CUSTOMER_FIELDS, CUSTOMER_VIEWS, [f for f, _ in CUSTOMERS_SORT],
+                            fields=fields, exclude=exclude, view=view)
+
 def get_all_customers():
-    return list(customers.find({}, {"_id": 1, "name": 1, "email": 1, "phone":1}))
+    return list(customers_listing.find({}, CUSTOMER_FIELDS))
+
+def iter_customers(batch_size: int = 1000, projection=CUSTOMER_FIELDS):
+    # raw cursor - documents are pulled from Mongo one batch at a time
+    return customers_listing.find({}, projection, batch_size=batch_size)
+
+def get_customers_page(limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, projection=CUSTOMER_FIELDS):
+    return fetch_page(customers_listing, {}, CUSTOMERS_SORT, clamp_limit(limit), cursor, projection)
+
+def get_customers_by_ids(customer_ids) -> dict:
+    """One $in round trip for many customers; returns {customer_id: customer}"""
+    ids = [cid for cid in dict.fromkeys(customer_ids) if cid is not None]
+    if not ids:
+        return {}
+    return {c["_id"]: c for c in customers.find({"_id": {"$in": ids}}, CUSTOMER_FIELDS)}
 
 def get_customer_by_id(customer_id: str):
     
     return customers.find_one({"_id": customer_id})
+
+# ---------------- Name / phone search ----------------
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+def is_phone_query(q: str) -> bool:
+    return re.sub(r"[\s-]", "", q).isdigit()
+
+def prefix_query(q: str) -> tuple:
+    """
+    (filter, sort) with anchored, case-sensitive regexes only - those become tight
+    ranges on phone_asc/name_asc. Case-insensitivity comes from trying the usual
+    spellings instead of the /i flag, which would scan the whole index.
+    """
+    if is_phone_query(q):
+        return {"phone": {"$regex": "^" + re.escape(re.sub(r"[\s-]", "", q))}}, [("phone", ASCENDING)]
+    spellings = dict.fromkeys([q, q.capitalize(), q.title(), q.lower()])
+    return {"name": {"$in": [re.compile("^" + re.escape(v)) for v in spellings]}}, [("name", ASCENDING)]
+
+def text_query(q: str) -> tuple:
+    """(filter, projection, sort) for whole-word matches anywhere in the name, best first"""
+    score = {"$meta": "textScore"}
+    return {"$text": {"$search": q}}, {**CUSTOMER_FIELDS, "score": score}, [("score", score)]
+
+def merge_search_results(groups, limit: int) -> list:
+    """Concatenates ranked result groups, dropping repeats; earlier groups rank higher"""
+    seen, out = set(), []
+    for docs in groups:
+        for doc in docs:
+            if doc["_id"] in seen:
+                continue
+            seen.add(doc["_id"])
+            doc.pop("score", None)
+            out.append(doc)
+            if len(out) >= limit:
+                return out
+    return out
+
+def search_customers(q: str, limit: int = SEARCH_LIMIT) -> list:
+    """Prefix matches on name/phone first, then text-index matches on any word of the name"""
+    q = (q or "").strip()
+    if not q:
+        return []
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    query, sort = prefix_query(q)
+    groups = [list(customers.find(query, CUSTOMER_FIELDS).sort(sort).limit(limit))]
+    if len(groups[0]) < limit and not is_phone_query(q):
+        query, projection, sort = text_query(q)
+        groups.append(list(customers.find(query, projection).sort(sort).limit(limit)))
+    return merge_search_results(groups, limit)
@@ -0,0 +1,70 @@
+# asyncio versions of customers.py for app_async.py (same documents, same errors)
+from db import async_coll, TRANSACTIONAL, LISTING
+from datetime import datetime
+from counters import incr_count_async, bump_version_async
+from pagination import fetch_page_async, clamp_limit, DEFAULT_PAGE_SIZE
+from customers import (
+    CUSTOMER_FIELDS, CUSTOMERS_SORT, SEARCH_LIMIT, MAX_SEARCH_LIMIT,
+    is_phone_query, prefix_query, text_query, merge_search_results
+)
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+def _customers(profile: str = TRANSACTIONAL):
+    return async_coll("customers", profile)
+
+async def create_customer(customer_id: str, name: str, phone: str, email: str):
+    now = datetime.utcnow()
+    doc = {"_id": customer_id, "name": name, "phone": phone, "email": email, "createdAt": now, "updatedAt": now}
+    try:
+        res = await _customers().insert_one(doc)
+    except DuplicateKeyError:
+        raise ValueError(f"ID already exists: {customer_id}")
+    await incr_count_async("customers")
+    return res.inserted_id
+
+async def update_customer(customer_id: str, name: str = None, phone: str = None, email: str = None):
+    update_fields = {k: v for k, v in (("name", name), ("phone", phone), ("email", email)) if v}
+    if not update_fields:
+        return None
+    update_fields["updatedAt"] = datetime.utcnow()
+    updated = await _customers().find_one_and_update(
+        {"_id": customer_id},
+        {"$set": update_fields},
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is not None:
+        await bump_version_async("customers")
+    return updated
+
+async def delete_customer(customer_id: str) -> int:
+    res = await _customers().delete_one({"_id": customer_id})
+    await incr_count_async("customers", -res.deleted_count)
+    return res.deleted_count
+
+async def get_customers_by_ids(customer_ids) -> dict:
+    ids = [cid for cid in dict.fromkeys(customer_ids) if cid is not None]
+    if not ids:
+        return {}
+    return {c["_id"]: c async for c in _customers().find({"_id": {"$in": ids}}, CUSTOMER_FIELDS)}
+
+async def get_customer_by_id(customer_id: str):
+    return await _customers().find_one({"_id": customer_id})
+
+async def search_customers(q: str, limit: int = SEARCH_LIMIT) -> list:
+    q = (q or "").strip()
+    if not q:
+        return []
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    query, sort = prefix_query(q)
+    groups = [await _customers().find(query, CUSTOMER_FIELDS).sort(sort).limit(limit).to_list(limit)]
+    if len(groups[0]) < limit and not is_phone_query(q):
+        query, projection, sort = text_query(q)
+        groups.append(await _customers().find(query, projection).sort(sort).limit(limit).to_list(limit))
+    return merge_search_results(groups, limit)
+
+def iter_customers(batch_size: int = 1000, projection=CUSTOMER_FIELDS):
+    return _customers(LISTING).find({}, projection, batch_size=batch_size)
+
+async def get_customers_page(limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, projection=CUSTOMER_FIELDS):
+    return await fetch_page_async(_customers(LISTING), {}, CUSTOMERS_SORT, clamp_limit(limit), cursor, projection)
@@ -57,8 +57,7 @@ def main():
                 for row in results:
                     cid = row["_id"]
                     cnt = row["ordersCount"]
-                    cust = get_customer_by_id(cid)  # כדי להציג גם שם
-                    name = cust["name"] if cust and "name" in cust else "(no name)"
+                    name = row.get("name") or "(no name)"  # השם מגיע כבר מ-top_customers
                     print(f"- {name} [ID: {cid}] — orders: {cnt}")
             except Exception as e:
                 print(" Error:", e)
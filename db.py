@@ -1,7 +1,7 @@
 from pymongo import MongoClient
 from dotenv import load_dotenv
 from pathlib import Path
-import os, sys, re
+import os, sys, re, threading, time
 
 # טען .env מהתיקייה של db.py (לא משנה מאיפה מריצים)
 ENV_PATH = Path(__file__).resolve().parent / ".env"
@@ -10,36 +10,225 @@ load_dotenv(dotenv_path=ENV_PATH)
 MONGODB_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "Market")
 
+# הגדרות pool מה-.env (אם לא הוגדר - ברירת המחדל של הדרייבר)
+POOL_SETTINGS = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+}
+
 def _mask(uri: str) -> str:
     # הסתרת הסיסמה בהדפסה
     return re.sub(r'(?<=://).*?:.*?@', '***:***@', uri) if uri else uri
 
-if not MONGODB_URI:
-    print("❌ MONGODB_URI לא מוגדר בקובץ .env (צריך להיות ליד db.py)", file=sys.stderr)
-    sys.exit(1)
+def client_options() -> dict:
+    timeout = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+    options = {
+        "serverSelectionTimeoutMS": timeout,
+        "connectTimeoutMS": timeout,
+        "socketTimeoutMS": timeout,
+    }
+    for option, env_name in POOL_SETTINGS.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = int(value)
+    compressors = os.getenv("MONGO_COMPRESSORS")  # e.g. "zstd,snappy,zlib"
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+# read routing profiles: every collection handle is opened with one of them.
+# Each is configured in the .env (unset = the client's default: primary, server read concern):
+#   MONGO_<PROFILE>_READ_PREFERENCE  primary | primaryPreferred | secondary | secondaryPreferred | nearest
+#   MONGO_<PROFILE>_READ_CONCERN     local | available | majority | linearizable
+#   MONGO_<PROFILE>_MAX_STALENESS_S  >= 90, secondaries lagging more are not read from
+#   MONGO_<PROFILE>_TAGS             replica set member tags, e.g. "use:reporting,dc:east"
+# e.g. MONGO_ANALYTICS_READ_PREFERENCE=secondaryPreferred moves reporting off the primary.
+TRANSACTIONAL, LISTING, ANALYTICS = "transactional", "listing", "analytics"
+PROFILES = (TRANSACTIONAL, LISTING, ANALYTICS)
+READ_CONCERNS = ("local", "available", "majority", "linearizable")
+
+def _read_preference(profile: str, mode: str):
+    from pymongo import read_preferences
+    modes = {"primary": read_preferences.Primary, "primaryPreferred": read_preferences.PrimaryPreferred,
+             "secondary": read_preferences.Secondary, "secondaryPreferred": read_preferences.SecondaryPreferred,
+             "nearest": read_preferences.Nearest}
+    if mode not in modes:
+        raise RuntimeError(f"MONGO_{profile.upper()}_READ_PREFERENCE: unknown mode {mode!r}")
+    staleness = os.getenv(f"MONGO_{profile.upper()}_MAX_STALENESS_S")
+    tags = os.getenv(f"MONGO_{profile.upper()}_TAGS")
+    if mode == "primary":
+        if staleness or tags:
+            raise RuntimeError(f"MONGO_{profile.upper()}: maxStaleness/tags need a non-primary read preference")
+        return modes[mode]()
+    tag_sets = [dict(t.split(":", 1) for t in tags.split(",")), {}] if tags else None   # {} = any member
+    return modes[mode](tag_sets=tag_sets, max_staleness=int(staleness) if staleness else -1)
+
+_profile_options = {}
+
+def profile_options(profile: str = None) -> dict:
+    """with_options()/get_collection() kwargs for a routing profile ({} = client defaults)"""
+    if profile is None:
+        return {}
+    if profile not in _profile_options:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown routing profile: {profile}")
+        options = {}
+        mode = os.getenv(f"MONGO_{profile.upper()}_READ_PREFERENCE")
+        if mode:
+            options["read_preference"] = _read_preference(profile, mode)
+        level = os.getenv(f"MONGO_{profile.upper()}_READ_CONCERN")
+        if level:
+            if level not in READ_CONCERNS:
+                raise RuntimeError(f"MONGO_{profile.upper()}_READ_CONCERN: unknown level {level!r}")
+            from pymongo.read_concern import ReadConcern
+            options["read_concern"] = ReadConcern(level)
+        _profile_options[profile] = options
+    return _profile_options[profile]
+
+def env_write_concern(w_env: str, j_env: str):
+    """
+    WriteConcern from the .env (w: a number or "majority", j: 1/0); None keeps the client's default.
+    w=0 is refused: an unacknowledged write can't report a duplicate key back to the caller.
+    """
+    w, j = os.getenv(w_env), os.getenv(j_env)
+    if not w and not j:
+        return None
+    from pymongo import WriteConcern
+    options = {}
+    if w:
+        options["w"] = int(w) if w.isdigit() else w
+        if options["w"] == 0:
+            raise RuntimeError(f"{w_env}=0 is not supported (writes must be acknowledged)")
+    if j:
+        options["j"] = j.lower() in ("1", "true", "yes")
+    return WriteConcern(**options)
 
-print("🔗 Using URI:", _mask(MONGODB_URI))
-print("🗄️  DB_NAME :", DB_NAME)
+_client = None
+_client_lock = threading.Lock()
 
-client = MongoClient(
-    MONGODB_URI,
-    serverSelectionTimeoutMS=5000,
-    connectTimeoutMS=5000,
-    socketTimeoutMS=5000,
-)
+def get_client() -> MongoClient:
+    """
+    The shared MongoClient, created on first use. Creating it does not block:
+    the driver connects in the background, so importing modules costs no round trip.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not MONGODB_URI:
+                    raise RuntimeError("MONGO_URI לא מוגדר בקובץ .env (צריך להיות ליד db.py)")
+                print("🔗 Using URI:", _mask(MONGODB_URI))
+                print("🗄️  DB_NAME :", DB_NAME)
+                _client = MongoClient(MONGODB_URI, **client_options())
+    return _client
 
-try:
-    client.admin.command("ping")
+def get_db():
+    return get_client()[DB_NAME]
+
+def reset_client():
+    """Closes the client; the next use creates a new one (after fork, in tools)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+def use_client(client):
+    """Routes every collection handle to `client` (e.g. mongomock in benchmarks)"""
+    global _client
+    with _client_lock:
+        _client = client
+
+def warmup():
+    """Connects and pings now instead of on the first query; raises if MongoDB is unreachable"""
+    get_client().admin.command("ping")
     print("✅ MongoDB connected")
-except Exception as e:
-    print(f"❌ לא ניתן להתחבר ל-MongoDB: {e}", file=sys.stderr)
-    sys.exit(1)
-
-db = client[DB_NAME]
-
-def customers_coll(): 
-    return db["customers"]
-def products_coll():  
-    return db["products"]
-def orders_coll():    
-    return db["orders"]
+
+def health() -> dict:
+    start = time.perf_counter()
+    try:
+        get_client().admin.command("ping")
+    except Exception as e:
+        return {"status": "unhealthy", "error": str(e)}
+    return {"status": "healthy", "ping_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+_async_client = None
+
+def get_async_client():
+    """
+    AsyncMongoClient for the asyncio server (app_async.py), created on first use.
+    Same URI and pool settings as the sync client; needs pymongo >= 4.10.
+    """
+    global _async_client
+    if _async_client is None:
+        from pymongo import AsyncMongoClient
+        if not MONGODB_URI:
+            raise RuntimeError("MONGO_URI לא מוגדר בקובץ .env (צריך להיות ליד db.py)")
+        _async_client = AsyncMongoClient(MONGODB_URI, **client_options())
+    return _async_client
+
+def async_coll(name: str, profile: str = None):
+    return get_async_client()[DB_NAME].get_collection(name, **profile_options(profile))
+
+class LazyCollection:
+    """Collection handle that resolves against the shared client on first use"""
+
+    def __init__(self, name: str, profile: str = None):
+        self._name = name
+        self._profile = profile
+        self._client = None
+        self._coll = None
+
+    def _resolve(self):
+        client = get_client()
+        if self._client is not client:
+            self._coll = client[DB_NAME].get_collection(self._name, **profile_options(self._profile))
+            self._client = client
+        return self._coll
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r}, {self._profile!r})"
+
+def customers_coll(profile: str = None):
+    return LazyCollection("customers", profile)
+def products_coll(profile: str = None):
+    return LazyCollection("products", profile)
+def orders_coll(profile: str = None):
+    return LazyCollection("orders", profile)
+def orders_archive_coll(profile: str = None):
+    return LazyCollection("orders_archive", profile)
+def counters_coll():
+    return LazyCollection("counters")
+def sales_daily_coll(profile: str = None):
+    return LazyCollection("sales_daily", profile)
+def sales_by_product_coll(profile: str = None):
+    return LazyCollection("sales_by_product", profile)
+def sales_by_customer_coll(profile: str = None):
+    return LazyCollection("sales_by_customer", profile)
+
+def describe_profiles() -> dict:
+    """Effective read preference / read concern of each profile (python db.py prints it)"""
+    described = {}
+    for profile in PROFILES:
+        options = profile_options(profile)
+        pref = options.get("read_preference")
+        concern = options.get("read_concern")
+        described[profile] = {
+            "read_preference": pref.document if pref else "client default",
+            "read_concern": concern.level if concern else "client default",
+        }
+    return described
+
+if __name__ == "__main__":
+    try:
+        warmup()
+    except Exception as e:
+        print(f"❌ לא ניתן להתחבר ל-MongoDB: {e}", file=sys.stderr)
+        sys.exit(1)
+    for profile, options in describe_profiles().items():
+        print(f"   {profile:<14} {options}")
@@ -0,0 +1,54 @@
+"""
+ETags and an optional encoded-response cache for conditional GETs.
+
+Single documents: the ETag is derived from _id + updatedAt.
+Lists: the ETag is derived from the collection version (counters.py, bumped on
+every write to that collection) plus the request path and query string.
+
+The response cache (RESPONSE_CACHE_SIZE entries, 0 = off) keeps encoded bodies
+keyed by collection version, so an unchanged resource is served without a Mongo
+read or JSON encoding. Versions are shared through Mongo, so entries from
+before another process's write are never served.
+"""
+import hashlib, os, threading
+from collections import OrderedDict
+from bson import json_util
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+
+def doc_etag(doc: dict) -> str:
+    updated = doc.get("updatedAt")
+    if updated is None:   # documents written before updatedAt existed
+        return make_etag(json_util.dumps(doc, sort_keys=True))
+    return make_etag(doc["_id"], updated.isoformat())
+
+class ResponseCache:
+    """LRU of key -> (etag, encoded body); max_size=0 disables it"""
+
+    def __init__(self, max_size: int = 0):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag: str, body):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_SIZE", "0")))
@@ -0,0 +1,55 @@
+"""
+JSON encoding for app.py / app_async.py.
+
+JSON_PROVIDER=orjson (the default when orjson is installed) encodes datetime natively
+and only calls back into Python for ObjectId, Decimal128 and RawBSONDocument.
+JSON_PROVIDER=json keeps the stdlib encoder (CustomJSONProvider in the apps).
+
+RawBSONDocument is decoded by the bson C extension and the resulting dict is encoded.
+Neither orjson nor pymongo can go straight from BSON bytes to JSON.
+"""
+import os
+from datetime import datetime
+from bson import ObjectId, Decimal128, decode
+from bson.raw_bson import RawBSONDocument
+
+try:
+    import orjson
+except ImportError:   # optional: pip install orjson
+    orjson = None
+
+def bson_default(obj):
+    """The BSON types a JSON encoder doesn't know; raises TypeError for anything else"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())   # a string keeps the exact value
+    if isinstance(obj, RawBSONDocument):
+        return decode(obj.raw)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def use_orjson() -> bool:
+    choice = os.getenv("JSON_PROVIDER", "orjson" if orjson else "json")
+    if choice == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson requires the orjson package")
+    return choice == "orjson"
+
+def dumpb(obj) -> bytes:
+    # naive datetimes come out exactly like datetime.isoformat(); non-str keys like json.dumps
+    return orjson.dumps(obj, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+
+class OrjsonMixin:
+    """dumps/loads/response for a Flask or Quart JSONProvider subclass; keys keep insertion order"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumpb(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # bytes straight into the response - skips the str round trip of dumps()
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumpb(obj), mimetype="application/json")
@@ -1,3 +1,5 @@
+import sys
+from db import warmup
 from customers_cli import main as customers_menu
 from products_cli import main as products_menu
 from orders_cli import main as orders_menu
@@ -13,6 +15,12 @@ def menu():
 
 
 def main():
+    try:
+        warmup()
+    except Exception as e:
+        print(f"❌ לא ניתן להתחבר ל-MongoDB: {e}", file=sys.stderr)
+        sys.exit(1)
+
     while True:
         choice = menu()
 
@@ -0,0 +1,221 @@
+"""
+In-process metrics in Prometheus text format (served at /api/metrics).
+
+- HTTP: request counts, latency histograms and errors per route (Flask hooks in app.py)
+- MongoDB: per collection/command latency via a pymongo CommandListener
+- Pool: time spent waiting to check out a connection, checkout failures
+
+install() must run before the first MongoClient is created (db.py creates it lazily).
+Counters are per process; scrape every worker.
+"""
+import bisect, threading, time
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + _labels(self.labels, k), v) for k, v in sorted(self._values.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                out.append((self.name + "_bucket" + _labels(self.labels, key, f'le="{bound}"'), cumulative))
+            out.append((self.name + "_bucket" + _labels(self.labels, key, 'le="+Inf"'), row[-1]))
+            out.append((self.name + "_sum" + _labels(self.labels, key), row[-2]))
+            out.append((self.name + "_count" + _labels(self.labels, key), row[-1]))
+        return out
+
+_registry = []
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+http_requests = _register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_errors = _register(Counter(
+    "http_request_errors_total", "HTTP responses with status >= 500", ("method", "route")))
+http_latency = _register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+mongo_latency = _register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("collection", "command")))
+mongo_failures = _register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands", ("collection", "command")))
+pool_wait = _register(Histogram(
+    "mongodb_pool_wait_seconds", "Time spent waiting for a pooled connection", ("address",)))
+pool_checkout_failures = _register(Counter(
+    "mongodb_pool_checkout_failures_total", "Connection checkouts that failed (e.g. wait queue timeout)",
+    ("address", "reason")))
+pool_checked_out = _register(Gauge(
+    "mongodb_pool_checked_out_connections", "Connections currently checked out", ("address",)))
+product_cache = _register(Gauge(
+    "product_cache", "Product cache statistics", ("stat",)))
+group_commit_batch = _register(Histogram(
+    "group_commit_batch_size", "Documents per group-commit insert_many (order_writer.py)", ("writer",),
+    buckets=BATCH_BUCKETS))
+group_commit_bookkeeping_failures = _register(Counter(
+    "group_commit_bookkeeping_failures_total",
+    "Written batches whose counters/rollups update failed - run rollups.py rebuild", ("writer",)))
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    http_requests.inc(method, route, status)
+    http_latency.observe(method, route, value=seconds)
+    if status >= 500:
+        http_errors.inc(method, route)
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {value}" for name, value in metric.samples())
+    return "\n".join(lines) + "\n"
+
+# ---------------- pymongo listeners ----------------
+class CommandTimer(monitoring.CommandListener):
+    """Times every command, tagged by collection and command name (find, aggregate, findAndModify...)"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._collections[self._key(event)] = collection
+
+    def _finish(self, event):
+        with self._lock:
+            return self._collections.pop(self._key(event), "-")
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        mongo_latency.observe(collection, event.command_name, value=event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_latency.observe(collection, event.command_name, value=event.duration_micros / 1e6)
+        mongo_failures.inc(collection, event.command_name)
+
+class PoolTimer(monitoring.ConnectionPoolListener):
+    """Connection pool wait time; a growing wait means the pool (maxPoolSize) is exhausted"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._out = {}
+        self._lock = threading.Lock()
+
+    def _address(self, event):
+        return "%s:%s" % event.address
+
+    def _waited(self, event):
+        duration = getattr(event, "duration", None)   # pymongo >= 4.7
+        if duration is not None:
+            return duration
+        started = getattr(self._local, "started", None)
+        return time.perf_counter() - started if started is not None else None
+
+    def _adjust_out(self, address, delta):
+        with self._lock:
+            self._out[address] = self._out.get(address, 0) + delta
+            pool_checked_out.set(address, value=self._out[address])
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        waited = self._waited(event)
+        if waited is not None:
+            pool_wait.observe(address, value=waited)
+        self._adjust_out(address, 1)
+
+    def connection_check_out_failed(self, event):
+        address = self._address(event)
+        waited = self._waited(event)
+        if waited is not None:
+            pool_wait.observe(address, value=waited)
+        pool_checkout_failures.inc(address, event.reason)
+
+    def connection_checked_in(self, event):
+        self._adjust_out(self._address(event), -1)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+
+_installed = False
+
+def install():
+    """Registers the listeners globally; clients created afterwards report to them"""
+    global _installed
+    if not _installed:
+        monitoring.register(CommandTimer())
+        monitoring.register(PoolTimer())
+        _installed = True
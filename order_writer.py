@@ -0,0 +1,164 @@
+"""
+Group commit for order inserts (opt-in: ORDER_GROUP_COMMIT=1).
+
+Concurrent create_order calls hand their document to one writer, which collects
+documents for up to ORDER_GROUP_COMMIT_WAIT_MS (default 2) or ORDER_GROUP_COMMIT_MAX_DOCS
+(default 256) and writes them with a single unordered insert_many. Every caller waits
+for that insert_many to be acknowledged with the orders write concern (db.env_write_concern),
+then gets its own result: None, or the error for its document (e.g. duplicate _id).
+Counters and rollups are updated once per batch, before the callers get their results,
+so a read right after create_order sees them. If that update fails the orders are still
+written: the failure is counted in group_commit_bookkeeping_failures_total and the
+rollups/counters need a rebuild (python rollups.py rebuild, python counters.py).
+
+The sync writer runs in a daemon thread started on first use (so after a fork);
+the asyncio writer runs as a task on the server's event loop.
+"""
+import asyncio, atexit, os, queue, threading, time
+from concurrent.futures import Future
+
+from metrics import group_commit_batch, group_commit_bookkeeping_failures
+
+MAX_DOCS = 256
+WAIT_MS = 2
+
+def group_commit_enabled() -> bool:
+    return os.getenv("ORDER_GROUP_COMMIT", "0").lower() in ("1", "true", "yes")
+
+def group_commit_settings() -> dict:
+    return {"max_docs": int(os.getenv("ORDER_GROUP_COMMIT_MAX_DOCS", MAX_DOCS)),
+            "max_wait": int(os.getenv("ORDER_GROUP_COMMIT_WAIT_MS", WAIT_MS)) / 1000}
+
+class GroupCommitWriter:
+    """
+    flush(docs) -> one error message (or None) per doc; exceptions fail the whole batch.
+    after_flush(written_docs) runs before the callers get their results.
+    """
+
+    def __init__(self, flush, after_flush=None, max_docs: int = MAX_DOCS, max_wait: float = WAIT_MS / 1000,
+                 name: str = "group-commit"):
+        self._flush, self._after_flush = flush, after_flush
+        self.max_docs, self.max_wait, self.name = max(1, max_docs), max_wait, name
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, doc) -> Future:
+        future = Future()
+        self._ensure_started()
+        self._queue.put((doc, future))
+        return future
+
+    def write(self, doc, timeout: float = None):
+        """Blocks until the batch holding doc is written; returns None or doc's error message"""
+        return self.submit(doc).result(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_docs:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is None
+            batch = [item for item in batch if item is not None]
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: list):
+        docs = [doc for doc, _ in batch]
+        group_commit_batch.observe(self.name, value=len(docs))
+        try:
+            errors = self._flush(docs)
+        except Exception as e:   # connection errors, write concern timeouts: nobody was acknowledged
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        if self._after_flush:
+            try:
+                self._after_flush([doc for doc, error in zip(docs, errors) if error is None])
+            except Exception as e:   # the orders are written - only the summaries drift
+                group_commit_bookkeeping_failures.inc(self.name)
+                print(f"[{self.name}] post-write bookkeeping failed, rebuild rollups/counters: {e}")
+        for (_, future), error in zip(batch, errors):
+            future.set_result(error)
+
+    def close(self, timeout: float = 5):
+        """Writes what is queued and stops the thread"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+class AsyncGroupCommitWriter:
+    """The same for app_async.py: flush and after_flush are coroutine functions"""
+
+    def __init__(self, flush, after_flush=None, max_docs: int = MAX_DOCS, max_wait: float = WAIT_MS / 1000,
+                 name: str = "group-commit-async"):
+        self._flush, self._after_flush = flush, after_flush
+        self.max_docs, self.max_wait, self.name = max(1, max_docs), max_wait, name
+        self._pending = []   # (doc, future)
+        self._full = None
+        self._task = None
+
+    async def write(self, doc):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, future))
+        if self._task is None:
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.max_docs:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        try:
+            while self._pending:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+                batch, self._pending = self._pending[:self.max_docs], self._pending[self.max_docs:]
+                if len(self._pending) < self.max_docs:
+                    self._full.clear()
+                await self._write_batch(batch)
+        finally:
+            self._task = None
+
+    async def _write_batch(self, batch: list):
+        docs = [doc for doc, _ in batch]
+        group_commit_batch.observe(self.name, value=len(docs))
+        try:
+            errors = await self._flush(docs)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if self._after_flush:
+            try:
+                await self._after_flush([doc for doc, error in zip(docs, errors) if error is None])
+            except Exception as e:
+                group_commit_bookkeeping_failures.inc(self.name)
+                print(f"[{self.name}] post-write bookkeeping failed, rebuild rollups/counters: {e}")
+        for (_, future), error in zip(batch, errors):
+            if not future.done():   # the caller may have been cancelled
+                future.set_result(error)
@@ -1,15 +1,91 @@
 from datetime import datetime, timezone
-from db import orders_coll
+from db import orders_coll, orders_archive_coll, env_write_concern, TRANSACTIONAL, LISTING, ANALYTICS
+from counters import incr_count, bump_version
+from pagination import clamp_limit, DEFAULT_PAGE_SIZE
+from projection import build_projection
+from products import get_products_by_ids
+from customers import get_customers_by_ids
+from rollups import (
+    ensure_rollups_indexes, record_orders, record_order_change,
+    rollup_total_revenue, rollup_top_customers, rollup_top_products
+)
 from pymongo import ReturnDocument ,ASCENDING,DESCENDING
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from order_writer import GroupCommitWriter, group_commit_enabled, group_commit_settings
+from archive import ensure_archive_indexes, with_archive, fetch_tiered_page, archive_skip, TieredCursor
 
-orders = orders_coll()
+orders = orders_coll(TRANSACTIONAL)
+orders_listing = orders_coll(LISTING)       # list pages (may lag a write on a secondary)
+orders_analytics = orders_coll(ANALYTICS)   # sales_report
+# old orders (archive.py): reads fall back to them, writes don't
+archived = orders_archive_coll(TRANSACTIONAL)
+archived_listing = orders_archive_coll(LISTING)
 def ensure_orders_indexes():
-    orders.create_index([("customerId", ASCENDING)], name="customerId_asc")
-    orders.create_index([("createdAt", DESCENDING)], name="createdAt_desc")
+    # a customer's orders newest first (list_orders_page(customer_id)) without an in-memory sort
+    orders.create_index([("customerId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+                        name="customerId_createdAt_id")
     orders.create_index([("status", ASCENDING), ("createdAt", DESCENDING)], name="status_createdAt")
+    # ORDERS_SORT plus the summary view's fields: view=summary list pages are covered by the index
+    orders.create_index([("createdAt", DESCENDING), ("_id", DESCENDING), ("customerId", ASCENDING),
+                         ("status", ASCENDING), ("totalAmount", ASCENDING)], name="createdAt_id_summary")
+    existing = orders.index_information()
+    for superseded in ("createdAt_desc", "createdAt_id_desc", "customerId_asc"):   # prefixes of the indexes above
+        if superseded in existing:
+            orders.drop_index(superseded)
+    ensure_rollups_indexes()
+    ensure_archive_indexes()
 
-def create_order(order_id: str, customer_id: str, items: list):
+BULK_CHUNK_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+# write concern for order inserts (ORDER_WRITE_CONCERN=majority, ORDER_WRITE_JOURNAL=1)
+ORDER_WRITE_CONCERN = env_write_concern("ORDER_WRITE_CONCERN", "ORDER_WRITE_JOURNAL")
+
+def orders_for_write():
+    return orders.with_options(write_concern=ORDER_WRITE_CONCERN) if ORDER_WRITE_CONCERN else orders
+
+def basket_product_ids(items: list) -> list:
+    if not isinstance(items, list):
+        raise ValueError("items must be a list")
+    ids = []
+    for item in items:
+        if not isinstance(item, dict) or "productId" not in item:
+            raise ValueError("Each item must have productId")
+        if not isinstance(item["productId"], str):
+            raise ValueError("productId must be a string")
+        ids.append(item["productId"])
+    return ids
+
+def resolve_items(items: list, catalog: dict = None) -> list:
+    """
+    Turns a basket of {productId, quantity} into priced order lines.
+    Name and price always come from the catalog (one $in query for the whole
+    basket, or the `catalog` dict passed in) - a client supplied price is ignored.
+    """
+    ids = basket_product_ids(items)
+    if catalog is None:
+        catalog = get_products_by_ids(ids)
+
+    missing = [pid for pid in dict.fromkeys(ids) if pid not in catalog]
+    if missing:
+        raise ValueError(f"Products not found: {', '.join(map(str, missing))}")
+
+    lines = []
+    for item in items:
+        qty = item.get("quantity", 1)
+        if isinstance(qty, bool) or not isinstance(qty, (int, float)) or qty < 0:
+            raise ValueError("Quantity must be a non-negative number")
+        product = catalog[item["productId"]]
+        lines.append({
+            "productId": item["productId"],
+            "name": product.get("name"),
+            "category": product.get("category"),   # נשמר בהזמנה לדוחות לפי קטגוריה
+            "quantity": qty,
+            "price": product["price"],
+        })
+    return lines
+
+def build_order_doc(order_id: str, customer_id: str, items: list, now: datetime = None):
     
     for item in items:
         if "productId" not in item or "price" not in item:
@@ -19,26 +95,128 @@ def create_order(order_id: str, customer_id: str, items: list):
     
     total = sum(item["price"] * item.get("quantity", 1) for item in items)
 
-    doc = {
+    now = now or datetime.now(timezone.utc)
+    return {
         "_id": order_id,
         "customerId": customer_id,
         "items": items,
         "totalAmount": total,
         "status": "paid",   # ברירת מחדל
-        "createdAt": datetime.now(timezone.utc),
-        "updatedAt": datetime.now(timezone.utc)
+        "createdAt": now,
+        "updatedAt": now
     }
-    try:
-        orders.insert_one(doc)
+
+def create_order(order_id: str, customer_id: str, items: list):
+    doc = build_order_doc(order_id, customer_id, resolve_items(items))
+    if order_writer is not None:
+        # group commit: counters and rollups are updated by the writer, once per batch
+        error = order_writer.write(doc)
+        if error:
+            raise ValueError(error)
         return order_id
+    try:
+        orders_for_write().insert_one(doc)
     except DuplicateKeyError:
         raise ValueError(f"Order with id {order_id} already exists")
+    incr_count("orders")
+    record_orders([doc])
+    return order_id
+
+def bulk_insert_errors(docs: list, error: BulkWriteError) -> list:
+    """Maps an unordered insert_many failure to one error message (or None) per doc"""
+    errors = [None] * len(docs)
+    for err in error.details.get("writeErrors", []):
+        i = err["index"]
+        if err.get("code") == DUPLICATE_KEY:
+            errors[i] = f"Order with id {docs[i]['_id']} already exists"
+        else:
+            errors[i] = err.get("errmsg", "Write failed")
+    return errors
+
+def insert_order_docs(docs: list) -> list:
+    """Unordered insert_many; returns one error message (or None) per doc"""
+    if not docs:
+        return []
+    try:
+        orders_for_write().insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return bulk_insert_errors(docs, e)
+    return [None] * len(docs)
+
+def record_written_orders(written: list):
+    incr_count("orders", len(written))
+    record_orders(written)
+
+order_writer = GroupCommitWriter(insert_order_docs, record_written_orders, name="orders",
+                                 **group_commit_settings()) if group_commit_enabled() else None
+
+def bulk_product_ids(orders_data: list) -> list:
+    ids = []
+    for data in orders_data:
+        if isinstance(data, dict) and isinstance(data.get("items"), list):
+            # rows with a bad productId are left out here and get their error from resolve_items
+            ids.extend(i["productId"] for i in data["items"]
+                       if isinstance(i, dict) and isinstance(i.get("productId"), str))
+    return ids
+
+def prepare_bulk_orders(orders_data: list, catalog: dict):
+    """Validates and prices every order; returns (results, [(position, doc), ...])"""
+    results = [None] * len(orders_data)
+    valid = []   # (position, doc)
+    now = datetime.now(timezone.utc)
+
+    for i, data in enumerate(orders_data):
+        order_id = data.get("order_id") if isinstance(data, dict) else None
+        try:
+            if order_id is None:
+                raise KeyError("order_id")
+            if not isinstance(order_id, str):
+                raise ValueError("order_id must be a string")
+            items = resolve_items(data["items"], catalog)
+            valid.append((i, build_order_doc(order_id, data["customer_id"], items, now)))
+        except (KeyError, TypeError, ValueError) as e:
+            error = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
+            results[i] = {"_id": order_id, "success": False, "error": error}
+    return results, valid
+
+def record_chunk_results(results: list, chunk: list, errors: list) -> list:
+    """Fills in results for one written chunk; returns the docs that were inserted"""
+    written = []
+    for (i, doc), error in zip(chunk, errors):
+        if error:
+            results[i] = {"_id": doc["_id"], "success": False, "error": error}
+        else:
+            results[i] = {"_id": doc["_id"], "success": True}
+            written.append(doc)
+    return written
+
+def create_orders_bulk(orders_data: list, chunk_size: int = BULK_CHUNK_SIZE) -> list:
+    """
+    orders_data: [{"order_id", "customer_id", "items"}, ...]
+    Returns one {"_id", "success", "error"?} entry per input order, in input order.
+    A bad or duplicate order never aborts the rest of the batch.
+    """
+    # price every basket in the request from a single catalog query
+    catalog = get_products_by_ids(bulk_product_ids(orders_data))
+    results, valid = prepare_bulk_orders(orders_data, catalog)
+
+    inserted = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        errors = insert_order_docs([doc for _, doc in chunk])
+        written = record_chunk_results(results, chunk, errors)
+        inserted += len(written)
+        record_orders(written)
+
+    incr_count("orders", inserted)
+    return results
 
 def update_order(order_id: str, status: str = None, items: list = None):
     update_fields = {}
     if status is not None:
         update_fields["status"] = status
     if items is not None:
+        items = resolve_items(items)
         total = sum(item["price"] * item.get("quantity", 1) for item in items)
         update_fields["items"] = items
         update_fields["totalAmount"] = total
@@ -48,45 +226,205 @@ def update_order(order_id: str, status: str = None, items: list = None):
 
     update_fields["updatedAt"] = datetime.utcnow()
 
-    return orders.find_one_and_update(
+    # BEFORE image so the rollups can move the old totals to the new ones
+    before = orders.find_one_and_update(
         {"_id": order_id},
         {"$set": update_fields},
-        return_document=ReturnDocument.AFTER
+        return_document=ReturnDocument.BEFORE
     )
+    if before is None:
+        if archived.find_one({"_id": order_id}, {"_id": 1}):
+            raise ValueError(f"Order {order_id} is archived and can't be changed")
+        return None
+    bump_version("orders")
+    after = {**before, **update_fields}
+    if "items" in update_fields:
+        record_order_change(before, after)
+    return after
+
 def delete_order(order_id: str) -> int:
-    res = orders.delete_one({"_id": order_id})
-    return res.deleted_count
+    doc = orders.find_one_and_delete({"_id": order_id}) or archived.find_one_and_delete({"_id": order_id})
+    if doc is None:
+        return 0
+    incr_count("orders", -1)
+    record_orders([doc], sign=-1)
+    return 1
 
+# analytics read the rollup collections (see rollups.py) - cost depends on the
+# number of distinct days/products/customers, not on the number of orders
 def total_revenue():
-    pipeline = [
-        {"$group": {"_id": None, "total": {"$sum": "$totalAmount"}}}
-    ]
-    result = list(orders.aggregate(pipeline))
-    return result[0]["total"] if result else 0
+    return rollup_total_revenue()
 
 def top_customers(limit=1):
-    pipeline = [
-        {"$group": {"_id": "$customerId", "ordersCount": {"$sum": 1}}},
-        {"$sort": {"ordersCount": -1}},
-        {"$limit": limit}
-    ]
-    return list(orders.aggregate(pipeline))
+    rows = rollup_top_customers(limit)
+    return attach_names(rows, get_customers_by_ids(r["_id"] for r in rows))
 
 def top_products():
+    result = rollup_top_products(1)
+    attach_names(result, get_products_by_ids(r["_id"] for r in result), ("name", "category"))
+    return result[0] if result else None
+
+GRANULARITIES = ("day", "week", "month")
+
+def sales_report_pipeline(start: datetime = None, end: datetime = None, status: str = None,
+                          granularity: str = "day", limit: int = 5) -> list:
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    match = {}
+    if start or end:
+        match["createdAt"] = {k: v for k, v in (("$gte", start), ("$lt", end)) if v}
+    if status:
+        match["status"] = status
+
+    line_total = {"$multiply": [{"$ifNull": ["$items.quantity", 1]}, "$items.price"]}
     pipeline = [
-        {"$unwind": "$items"},
-        {"$group": {"_id": "$items.productId", "totalSold": {"$sum": "$items.quantity"}}},
-        {"$sort": {"totalSold": -1}},
-        {"$limit": 1}
+        {"$match": match},
+        *with_archive(match),
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "revenue": {"$sum": "$totalAmount"}, "orders": {"$sum": 1}}},
+            ],
+            "revenueByPeriod": [
+                {"$group": {
+                    "_id": {"$dateTrunc": {"date": "$createdAt", "unit": granularity}},
+                    "revenue": {"$sum": "$totalAmount"},
+                    "orders": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            "revenueByCategory": [
+                {"$unwind": "$items"},
+                {"$group": {
+                    "_id": {"$ifNull": ["$items.category", "unknown"]},
+                    "revenue": {"$sum": line_total},
+                    "unitsSold": {"$sum": {"$ifNull": ["$items.quantity", 1]}},
+                }},
+                {"$sort": {"revenue": -1}},
+            ],
+            "topProducts": [
+                {"$unwind": "$items"},
+                {"$group": {
+                    "_id": "$items.productId",
+                    "totalSold": {"$sum": {"$ifNull": ["$items.quantity", 1]}},
+                    "revenue": {"$sum": line_total},
+                }},
+                {"$sort": {"totalSold": -1}},
+                {"$limit": limit},
+            ],
+            "topCustomers": [
+                {"$group": {"_id": "$customerId", "ordersCount": {"$sum": 1}, "revenue": {"$sum": "$totalAmount"}}},
+                {"$sort": {"ordersCount": -1}},
+                {"$limit": limit},
+            ],
+        }},
     ]
-    result = list(orders.aggregate(pipeline))
-    return result[0] if result else None
+    return pipeline
+
+def shape_sales_report(result: dict) -> dict:
+    result = result or {}
+    totals = (result.get("totals") or [{}])[0]
+    return {
+        "totals": {"revenue": totals.get("revenue", 0), "orders": totals.get("orders", 0)},
+        "revenueByPeriod": result.get("revenueByPeriod", []),
+        "revenueByCategory": result.get("revenueByCategory", []),
+        "topProducts": result.get("topProducts", []),
+        "topCustomers": result.get("topCustomers", []),
+    }
 
+def sales_report(start: datetime = None, end: datetime = None, status: str = None,
+                 granularity: str = "day", limit: int = 5) -> dict:
+    """
+    Time-windowed dashboard in one round trip: an indexed $match on createdAt
+    (status_createdAt when filtering by status) followed by a single $facet.
+    `end` is exclusive.
+    """
+    pipeline = sales_report_pipeline(start, end, status, granularity, limit)
+    report = shape_sales_report(next(orders_analytics.aggregate(pipeline), None))
+    attach_names(report["topCustomers"], get_customers_by_ids(r["_id"] for r in report["topCustomers"]))
+    attach_names(report["topProducts"], get_products_by_ids(r["_id"] for r in report["topProducts"]),
+                 ("name", "category"))
+    return report
 
 
-def get_order_by_id(order_id: str):
-    return orders.find_one({"_id": order_id})
 
-def list_orders(customer_id: str = None, limit: int = 100, skip: int = 0):
+# ---------------- Joined views (?expand=) ----------------
+EXPANSIONS = ("customer", "products")
+
+def parse_expand(value) -> set:
+    expand = {e.strip() for e in (value or "").split(",") if e.strip()}
+    unknown = expand - set(EXPANSIONS)
+    if unknown:
+        raise ValueError(f"Unknown expand: {', '.join(sorted(unknown))} (available: {', '.join(EXPANSIONS)})")
+    return expand
+
+def attach_names(rows: list, found: dict, fields=("name",)) -> list:
+    """Top-N rows keyed by _id get the customer/product name (None if it was deleted)"""
+    for row in rows:
+        doc = found.get(row["_id"]) or {}
+        for field in fields:
+            row[field] = doc.get(field)
+    return rows
+
+def join_orders(docs: list, expand: set, customers: dict = None, catalog: dict = None) -> list:
+    """
+    In-memory join of batched lookups: order["customer"] and, per item, item["product"]
+    (the current catalog entry - the item keeps the price it was sold at)
+    """
+    for doc in docs:
+        if "customer" in expand:
+            doc["customer"] = customers.get(doc.get("customerId"))
+        if "products" in expand:
+            for item in doc.get("items", []):
+                product = catalog.get(item.get("productId"))
+                item["product"] = {k: product.get(k) for k in ("name", "category", "price")} if product else None
+    return docs
+
+def expand_orders(docs: list, expand: set) -> list:
+    """One $in per expansion for the whole page, never one query per order"""
+    if not expand or not docs:
+        return docs
+    customers = catalog = None
+    if "customer" in expand:
+        customers = get_customers_by_ids(d.get("customerId") for d in docs)
+    if "products" in expand:
+        catalog = get_products_by_ids(item["productId"] for d in docs for item in d.get("items", []))
+    return join_orders(docs, expand, customers, catalog)
+
+ORDERS_SORT = [("createdAt", DESCENDING), ("_id", DESCENDING)]
+ORDER_FIELDS = ("_id", "customerId", "items", "totalAmount", "status", "createdAt", "updatedAt")
+ORDER_VIEWS = {
+    "summary": ["_id", "customerId", "totalAmount", "status", "createdAt"],   # covered by createdAt_id_summary
+    "full": None,
+}
+
+def orders_projection(fields: str = None, exclude: str = None, view: str = None):
+    """?fields= / ?exclude= / ?view= -> projection (None = whole documents)"""
+    return build_projection(ORDER_FIELDS, None, ORDER_VIEWS, [f for f, _ in ORDERS_SORT],
+                            fields=fields, exclude=exclude, view=view)
+
+def get_order_by_id(order_id: str, projection=None):
+    order = orders.find_one({"_id": order_id}, projection)
+    if order is None:
+        order = archived.find_one({"_id": order_id}, projection)
+    return order
+
+def list_orders(customer_id: str = None, limit: int = 100, skip: int = 0, projection=None):
+    query = {"customerId": customer_id} if customer_id else {}
+    found = list(orders_listing.find(query, projection).skip(skip).limit(limit))
+    if len(found) < limit:
+        cold_skip = archive_skip(orders_listing, query, skip, len(found))
+        found += archived_listing.find(query, projection).skip(cold_skip).limit(limit - len(found))
+    return found
+
+def iter_orders(customer_id: str = None, batch_size: int = 1000, projection=None):
+    # raw cursors - documents are pulled from Mongo one batch at a time, hot orders first
+    query = {"customerId": customer_id} if customer_id else {}
+    return TieredCursor(orders_listing.find(query, projection, batch_size=batch_size).sort(ORDERS_SORT),
+                        archived_listing.find(query, projection, batch_size=batch_size).sort(ORDERS_SORT))
+
+def list_orders_page(customer_id: str = None, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, projection=None):
+    # keyset pagination on (createdAt, _id): deep pages cost the same as the first one
     query = {"customerId": customer_id} if customer_id else {}
-    return list(orders.find(query).skip(skip).limit(limit))
+    return fetch_tiered_page(orders_listing, archived_listing, query, ORDERS_SORT, clamp_limit(limit), cursor,
+                             projection)
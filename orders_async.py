@@ -0,0 +1,180 @@
+# asyncio versions of orders.py for app_async.py - validation, pricing and the report
+# pipeline are shared with orders.py, only the I/O is async
+from datetime import datetime
+from db import async_coll, TRANSACTIONAL, LISTING, ANALYTICS
+from counters import incr_count_async, bump_version_async
+from pagination import clamp_limit, DEFAULT_PAGE_SIZE
+from rollups import apply_changes_async
+from products_async import get_products_by_ids
+from customers_async import get_customers_by_ids
+from orders import (
+    ORDERS_SORT, BULK_CHUNK_SIZE, ORDER_WRITE_CONCERN, basket_product_ids, resolve_items, build_order_doc,
+    bulk_insert_errors, bulk_product_ids, prepare_bulk_orders, record_chunk_results,
+    sales_report_pipeline, shape_sales_report, attach_names, join_orders
+)
+from pymongo import ReturnDocument, DESCENDING
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from order_writer import AsyncGroupCommitWriter, group_commit_enabled, group_commit_settings
+from archive import ARCHIVE_COLLECTION, fetch_tiered_page_async, AsyncTieredCursor
+
+def _orders(profile: str = TRANSACTIONAL):
+    return async_coll("orders", profile)
+
+def _archived(profile: str = TRANSACTIONAL):
+    return async_coll(ARCHIVE_COLLECTION, profile)
+
+def _orders_for_write():
+    coll = _orders()
+    return coll.with_options(write_concern=ORDER_WRITE_CONCERN) if ORDER_WRITE_CONCERN else coll
+
+async def _resolve_items(items: list) -> list:
+    catalog = await get_products_by_ids(basket_product_ids(items))
+    return resolve_items(items, catalog)
+
+async def create_order(order_id: str, customer_id: str, items: list):
+    doc = build_order_doc(order_id, customer_id, await _resolve_items(items))
+    if order_writer is not None:
+        error = await order_writer.write(doc)
+        if error:
+            raise ValueError(error)
+        return order_id
+    try:
+        await _orders_for_write().insert_one(doc)
+    except DuplicateKeyError:
+        raise ValueError(f"Order with id {order_id} already exists")
+    await incr_count_async("orders")
+    await apply_changes_async([(doc, 1)])
+    return order_id
+
+async def insert_order_docs(docs: list) -> list:
+    if not docs:
+        return []
+    try:
+        await _orders_for_write().insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return bulk_insert_errors(docs, e)
+    return [None] * len(docs)
+
+async def record_written_orders(written: list):
+    await incr_count_async("orders", len(written))
+    await apply_changes_async((doc, 1) for doc in written)
+
+order_writer = AsyncGroupCommitWriter(insert_order_docs, record_written_orders, name="orders-async",
+                                      **group_commit_settings()) if group_commit_enabled() else None
+
+async def create_orders_bulk(orders_data: list, chunk_size: int = BULK_CHUNK_SIZE) -> list:
+    catalog = await get_products_by_ids(bulk_product_ids(orders_data))
+    results, valid = prepare_bulk_orders(orders_data, catalog)
+
+    inserted = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        errors = await insert_order_docs([doc for _, doc in chunk])
+        written = record_chunk_results(results, chunk, errors)
+        inserted += len(written)
+        await apply_changes_async((doc, 1) for doc in written)
+
+    await incr_count_async("orders", inserted)
+    return results
+
+async def update_order(order_id: str, status: str = None, items: list = None):
+    update_fields = {}
+    if status is not None:
+        update_fields["status"] = status
+    if items is not None:
+        items = await _resolve_items(items)
+        update_fields["items"] = items
+        update_fields["totalAmount"] = sum(item["price"] * item.get("quantity", 1) for item in items)
+
+    if not update_fields:
+        return await get_order_by_id(order_id)
+
+    update_fields["updatedAt"] = datetime.utcnow()
+    before = await _orders().find_one_and_update(
+        {"_id": order_id},
+        {"$set": update_fields},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        if await _archived().find_one({"_id": order_id}, {"_id": 1}):
+            raise ValueError(f"Order {order_id} is archived and can't be changed")
+        return None
+    await bump_version_async("orders")
+    after = {**before, **update_fields}
+    if "items" in update_fields:
+        await apply_changes_async([(before, -1), (after, 1)])
+    return after
+
+async def delete_order(order_id: str) -> int:
+    doc = await _orders().find_one_and_delete({"_id": order_id})
+    if doc is None:
+        doc = await _archived().find_one_and_delete({"_id": order_id})
+    if doc is None:
+        return 0
+    await incr_count_async("orders", -1)
+    await apply_changes_async([(doc, -1)])
+    return 1
+
+async def expand_orders(docs: list, expand: set) -> list:
+    if not expand or not docs:
+        return docs
+    customers = catalog = None
+    if "customer" in expand:
+        customers = await get_customers_by_ids(d.get("customerId") for d in docs)
+    if "products" in expand:
+        catalog = await get_products_by_ids(item["productId"] for d in docs for item in d.get("items", []))
+    return join_orders(docs, expand, customers, catalog)
+
+async def get_order_by_id(order_id: str, projection=None):
+    order = await _orders().find_one({"_id": order_id}, projection)
+    if order is None:
+        order = await _archived().find_one({"_id": order_id}, projection)
+    return order
+
+async def list_orders(customer_id: str = None, limit: int = 100, skip: int = 0, projection=None):
+    query = {"customerId": customer_id} if customer_id else {}
+    found = await _orders(LISTING).find(query, projection).skip(skip).limit(limit).to_list(length=limit)
+    if len(found) < limit:
+        cold_skip = 0
+        if skip and not found:   # the offset ran past the hot orders
+            cold_skip = max(0, skip - await _orders(LISTING).count_documents(query))
+        rest = limit - len(found)
+        found += await _archived(LISTING).find(query, projection).skip(cold_skip).limit(rest).to_list(length=rest)
+    return found
+
+def iter_orders(customer_id: str = None, batch_size: int = 1000, projection=None):
+    query = {"customerId": customer_id} if customer_id else {}
+    return AsyncTieredCursor(_orders(LISTING).find(query, projection, batch_size=batch_size).sort(ORDERS_SORT),
+                             _archived(LISTING).find(query, projection, batch_size=batch_size).sort(ORDERS_SORT))
+
+async def list_orders_page(customer_id: str = None, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, projection=None):
+    query = {"customerId": customer_id} if customer_id else {}
+    return await fetch_tiered_page_async(_orders(LISTING), _archived(LISTING), query, ORDERS_SORT,
+                                         clamp_limit(limit), cursor, projection)
+
+# ---------------- Analytics (rollups / $facet report) ----------------
+async def total_revenue():
+    cursor = await async_coll("sales_daily", ANALYTICS).aggregate([{"$group": {"_id": None, "total": {"$sum": "$revenue"}}}])
+    result = await cursor.to_list(length=1)
+    return result[0]["total"] if result else 0
+
+async def top_customers(limit=1):
+    rows = await (async_coll("sales_by_customer", ANALYTICS).find({"ordersCount": {"$gt": 0}})
+                  .sort("ordersCount", DESCENDING).limit(limit).to_list(length=limit))
+    return attach_names(rows, await get_customers_by_ids(r["_id"] for r in rows))
+
+async def top_products():
+    result = await (async_coll("sales_by_product", ANALYTICS).find({"totalSold": {"$gt": 0}})
+                    .sort("totalSold", DESCENDING).limit(1).to_list(length=1))
+    attach_names(result, await get_products_by_ids(r["_id"] for r in result), ("name", "category"))
+    return result[0] if result else None
+
+async def sales_report(start: datetime = None, end: datetime = None, status: str = None,
+                       granularity: str = "day", limit: int = 5) -> dict:
+    cursor = await _orders(ANALYTICS).aggregate(sales_report_pipeline(start, end, status, granularity, limit))
+    result = await cursor.to_list(length=1)
+    report = shape_sales_report(result[0] if result else None)
+    attach_names(report["topCustomers"], await get_customers_by_ids(r["_id"] for r in report["topCustomers"]))
+    attach_names(report["topProducts"], await get_products_by_ids(r["_id"] for r in report["topProducts"]),
+                 ("name", "category"))
+    return report
@@ -1,6 +1,5 @@
 from pprint import pprint
 from orders import ensure_orders_indexes, create_order, get_order_by_id, list_orders, update_order, delete_order ,total_revenue
-from products import get_product_by_id
 
 def menu():
     print("\n=== Orders Management ===")
@@ -28,20 +27,9 @@ def main():
                 if not pid:
                     break
 
-                product = get_product_by_id(pid)   # שולפים את המוצר ממונגו
-                if not product:
-                    print(f" Product with ID {pid} not found")
-                    continue
-
                 qty = int(input("Quantity: "))
-                price = product["price"]  # מחיר נשלף מהמסד, לא מהמשתמש
-
-                items.append({
-                    "productId": pid,
-                    "name": product["name"],   # שם המוצר מתוך המסד
-                    "quantity": qty,
-                    "price": price
-                })
+                # שם ומחיר נשלפים מהמסד בשאילתה אחת לכל הסל (create_order)
+                items.append({"productId": pid, "quantity": qty})
 
             try:
                 create_order(oid, cid, items)
@@ -0,0 +1,57 @@
+import base64
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(doc: dict, sort: list) -> str:
+    # opaque token = the sort key values of the last document on the page
+    values = [doc.get(field) for field, _ in sort]
+    raw = json_util.dumps(values, json_options=CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, sort: list) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json_util.loads(raw.decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError("Invalid cursor")
+    return values
+
+def clamp_limit(limit, default: int = DEFAULT_PAGE_SIZE) -> int:
+    if limit is None:
+        return default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+def keyset_query(query: dict, sort: list, cursor: str = None) -> dict:
+    """Filter for the documents strictly after `cursor` in `sort` order."""
+    if not cursor:
+        return query
+    values = decode_cursor(cursor, sort)
+    branches = []
+    for n, (field, direction) in enumerate(sort):
+        cond = {f: values[i] for i, (f, _) in enumerate(sort[:n])}
+        cond[field] = {"$lt" if direction < 0 else "$gt": values[n]}
+        branches.append(cond)
+    after = {"$or": branches}
+    return {"$and": [query, after]} if query else after
+
+async def fetch_page_async(coll, query: dict, sort: list, limit: int, cursor: str = None, projection=None):
+    """fetch_page() for an AsyncMongoClient collection"""
+    found = coll.find(keyset_query(query, sort, cursor), projection).sort(sort).limit(limit + 1)
+    docs = await found.to_list(length=limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1], sort)
+    return docs, None
+
+def fetch_page(coll, query: dict, sort: list, limit: int, cursor: str = None, projection=None):
+    """Returns (docs, next_cursor); next_cursor is None on the last page."""
+    docs = list(coll.find(keyset_query(query, sort, cursor), projection).sort(sort).limit(limit + 1))
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1], sort)
+    return docs, None
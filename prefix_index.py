@@ -0,0 +1,209 @@
+import bisect, heapq, itertools, re, threading, time
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall((text or "").lower())
+
+class PrefixIndex:
+    """
+    In-memory autocomplete index. Keeps a sorted list of distinct name tokens
+    (searched with bisect) and a posting set of doc ids per token, so a lookup
+    never scans the catalog.
+    Every query token must prefix-match some token of the document's name.
+    Ranking: whole-name prefix first, then a first-token match, then shorter names.
+    Every match is ranked (a heap keeps the top `limit`), so a query costs a pass over
+    the documents it matches. That is most of the catalog for the one- and two-letter
+    queries autocomplete sends first, so the ranked top `bucket_size` of each such
+    prefix is kept (computed on its first query, then updated by upsert/remove).
+    """
+
+    def __init__(self, ttl: float = 300.0, bucket_size: int = 50, short_prefix: int = 2):
+        self.ttl = ttl
+        self.bucket_size, self.short_prefix = bucket_size, short_prefix
+        self._lock = threading.Lock()
+        self._tokens = []     # sorted distinct tokens
+        self._postings = {}   # token -> {doc_id}
+        self._docs = {}       # doc_id -> (name_lower, tokens, doc)
+        self._built_at = None
+        self._ready = threading.Event()      # set once the first build is in
+        self._rebuilding = threading.Lock()  # one rebuild at a time
+        self._generation = 0                 # bumped by invalidate()
+        self._replay = None                  # writes made while a rebuild was loading
+        self._buckets = {}                   # short prefix -> [(rank key, doc_id)], best first
+
+    @property
+    def stale(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > self.ttl
+
+    def build(self, docs, name_field: str = "name", generation: int = None):
+        postings, indexed = {}, {}
+        for doc in docs:
+            name = doc.get(name_field) or ""
+            tokens = tokenize(name)
+            indexed[doc["_id"]] = (name.lower(), tokens, doc)
+            for token in tokens:
+                postings.setdefault(token, set()).add(doc["_id"])
+        with self._lock:
+            self._tokens, self._postings, self._docs = sorted(postings), postings, indexed
+            self._buckets = {}
+            # writes that raced the load may be missing from docs
+            for apply, args in self._replay or ():
+                apply(*args)
+            self._replay = None
+            # invalidated while loading: what was loaded may predate a bulk write - stays stale
+            if generation is None or generation == self._generation:
+                self._built_at = time.monotonic()
+            self._ready.set()
+
+    def refresh(self, load):
+        """
+        Rebuilds a stale index from load() (an iterable of docs). The first build runs in
+        the caller; later ones in a background thread while searches keep using the
+        current index until the new one is swapped in.
+        """
+        if not self.stale:
+            return
+        if not self._ready.is_set():
+            with self._rebuilding:   # nothing to serve yet - wait for the build
+                if not self._ready.is_set():
+                    self._rebuild(load)
+            return
+        if self._rebuilding.acquire(blocking=False):
+            threading.Thread(target=self._rebuild_in_background, args=(load,),
+                             name="prefix-index-rebuild", daemon=True).start()
+
+    def _rebuild(self, load):
+        with self._lock:
+            generation, self._replay = self._generation, []
+        try:
+            self.build(load(), generation=generation)
+        finally:
+            with self._lock:
+                self._replay = None
+
+    def _rebuild_in_background(self, load):
+        try:
+            self._rebuild(load)
+        except Exception as e:   # the current index keeps serving; the next search retries
+            print(f"[search index] rebuild failed: {e}")
+        finally:
+            self._rebuilding.release()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+            self._generation += 1
+
+    def _short_prefixes(self, tokens) -> set:
+        return {t[:n] for t in tokens for n in range(1, self.short_prefix + 1)}
+
+    def _remove_locked(self, doc_id):
+        old = self._docs.pop(doc_id, None)
+        if not old:
+            return
+        for prefix in self._short_prefixes(old[1]):
+            bucket = self._buckets.get(prefix)
+            if bucket is None:
+                continue
+            for i, (_, bucket_id) in enumerate(bucket):
+                if bucket_id == doc_id:
+                    del bucket[i]
+                    if len(bucket) == self.bucket_size - 1:   # was full: the next best one is unknown
+                        del self._buckets[prefix]
+                    break
+        for token in set(old[1]):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[token]
+                i = bisect.bisect_left(self._tokens, token)
+                if i < len(self._tokens) and self._tokens[i] == token:
+                    del self._tokens[i]
+
+    def _upsert_locked(self, doc, name_field: str):
+        name = doc.get(name_field) or ""
+        tokens = tokenize(name)
+        self._remove_locked(doc["_id"])
+        self._docs[doc["_id"]] = (name.lower(), tokens, doc)
+        for token in tokens:
+            if token not in self._postings:
+                self._postings[token] = set()
+                bisect.insort(self._tokens, token)
+            self._postings[token].add(doc["_id"])
+        for prefix in self._short_prefixes(tokens):
+            bucket = self._buckets.get(prefix)
+            if bucket is not None:
+                bisect.insort(bucket, (self._rank(name.lower(), tokens, doc["_id"], [prefix]), doc["_id"]))
+                del bucket[self.bucket_size:]
+
+    def _write_locked(self, apply, *args):
+        if self._replay is not None:
+            self._replay.append((apply, args))
+        if self._ready.is_set():
+            apply(*args)
+
+    def upsert(self, doc, name_field: str = "name"):
+        """Write-through refresh of one document (no-op until the index is built)"""
+        with self._lock:
+            self._write_locked(self._upsert_locked, doc, name_field)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._write_locked(self._remove_locked, doc_id)
+
+    def _token_range(self, prefix: str) -> list:
+        lo = bisect.bisect_left(self._tokens, prefix)
+        hi = bisect.bisect_left(self._tokens, prefix + "￿")
+        return self._tokens[lo:hi]
+
+    @staticmethod
+    def _rank(name: str, tokens: list, doc_id, terms: list) -> tuple:
+        rank = 0 if name.startswith(" ".join(terms)) else 1 if tokens[0].startswith(terms[0]) else 2
+        return rank, len(name), name, doc_id
+
+    def search(self, query: str, limit: int = 10) -> list:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            if len(terms) == 1 and len(terms[0]) <= self.short_prefix and limit <= self.bucket_size:
+                bucket = self._buckets.get(terms[0])
+                if bucket is None:
+                    bucket = self._buckets[terms[0]] = self._ranked_locked(terms, self.bucket_size)
+                ranked = bucket[:limit]
+            else:
+                ranked = self._ranked_locked(terms, limit)
+            return [self._docs[doc_id][2] for _, doc_id in ranked]
+
+    def _ranked_locked(self, terms: list, limit: int) -> list:
+        """The best `limit` matches as [(rank key, doc_id)]"""
+        ranges = [self._token_range(t) for t in terms]
+        if not all(ranges):
+            return []
+        # terms that name a single token are intersected as sets (runs in C);
+        # the rest - usually the word still being typed - are checked per candidate
+        exact = sorted((self._postings[r[0]] for r in ranges if len(r) == 1), key=len)
+        partial = [t for t, r in zip(terms, ranges) if len(r) > 1]
+        if exact:
+            candidates = exact[0].intersection(*exact[1:]) if len(exact) > 1 else exact[0]
+        else:
+            # drive the lookup from the most selective term
+            sizes = [sum(len(self._postings[t]) for t in r) for r in ranges]
+            best = sizes.index(min(sizes))
+            candidates = itertools.chain.from_iterable(self._postings[t] for t in ranges[best])
+            partial.pop(best)
+
+        def ranked():
+            seen = set()
+            for doc_id in candidates:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                name, tokens, _ = self._docs[doc_id]
+                if all(any(t.startswith(term) for t in tokens) for term in partial):
+                    yield self._rank(name, tokens, doc_id, terms), doc_id
+
+        return heapq.nsmallest(limit, ranked())
@@ -1,11 +1,137 @@
-from db import products_coll
+from db import products_coll, TRANSACTIONAL
+from counters import incr_count, bump_version
+from pagination import fetch_page, clamp_limit, DEFAULT_PAGE_SIZE
+from prefix_index import PrefixIndex
+from projection import build_projection
 from datetime import datetime
+from collections import OrderedDict
 from pymongo.errors import DuplicateKeyError
 from pymongo import ASCENDING
 from pymongo import ReturnDocument
+import os, threading, time
 
 
-products = products_coll()
+# list pages are cached under the products version (http_cache.py), so they are read
+# from the primary too - a lagging secondary would get stale rows cached as current
+products = products_coll(TRANSACTIONAL)
+
+# ---------------- Catalog cache ----------------
+class ProductCache:
+    """
+    In-process product cache: LRU bounded by `max_size`, entries expire after `ttl` seconds.
+    In snapshot mode the whole catalog is loaded at once and every read is served from
+    memory until the snapshot expires or a product write invalidates it.
+    Each process has its own cache, so `ttl` bounds staleness from other processes' writes.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0, snapshot: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.snapshot_mode = snapshot
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # product_id -> (expires_at, doc)
+        self._snapshot = None           # (expires_at, {product_id: doc})
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+                       "invalidations": 0, "snapshot_loads": 0}
+
+    def get(self, product_id):
+        """Returns the cached doc, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[product_id]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(product_id)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, product_id, doc):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[product_id] = (time.monotonic() + self.ttl, doc)
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_snapshot(self):
+        """Returns {product_id: doc} for the whole catalog, or None if not loaded/expired"""
+        with self._lock:
+            if self._snapshot is None:
+                return None
+            if self._snapshot[0] < time.monotonic():
+                self._snapshot = None
+                self._stats["expirations"] += 1
+                return None
+            return self._snapshot[1]
+
+    def set_snapshot(self, docs: dict):
+        with self._lock:
+            self._snapshot = (time.monotonic() + self.ttl, docs)
+            self._stats["snapshot_loads"] += 1
+
+    def invalidate(self, product_id=None):
+        """Drops one product (or everything when product_id is None) and the snapshot"""
+        with self._lock:
+            if product_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(product_id, None)
+            self._snapshot = None
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "snapshot_mode": self.snapshot_mode,
+                "snapshot_size": len(self._snapshot[1]) if self._snapshot else 0,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+product_cache = ProductCache(
+    max_size=int(os.getenv("PRODUCT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRODUCT_CACHE_TTL", "300")),
+    snapshot=os.getenv("PRODUCT_CACHE_SNAPSHOT", "0") == "1",
+)
+
+def _catalog_snapshot():
+    """Full catalog from memory, loading it first if needed (snapshot mode only)"""
+    snapshot = product_cache.get_snapshot()
+    if snapshot is None:
+        snapshot = {p["_id"]: p for p in products.find({})}
+        product_cache.set_snapshot(snapshot)
+    return snapshot
+
+def product_cache_stats() -> dict:
+    return product_cache.stats()
+
+# ---------------- Name search ----------------
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# autocomplete index over product names, kept current by this process's writes
+search_index = PrefixIndex(ttl=float(os.getenv("PRODUCT_SEARCH_TTL", "300")))
+
+def search_documents():
+    return products.find({}, PRODUCT_FIELDS)
+
+def search_products(q: str, limit: int = SEARCH_LIMIT) -> list:
+    """Ranked case-insensitive prefix/token search over product names"""
+    search_index.refresh(search_documents)
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    return search_index.search(q, limit)
+
 def ensure_products_indexes():
     products.create_index([("name", ASCENDING)], name="name_asc")
     products.create_index([("category", ASCENDING)], name="category_asc")
@@ -21,9 +147,12 @@ def create_product( product_id: str,name: str, category: str, price: float):
     }
     try:
         products.insert_one(doc)
-        return product_id
     except DuplicateKeyError:
         raise ValueError(f"Product with id {product_id} already exists")
+    product_cache.invalidate(product_id)
+    search_index.upsert({k: doc[k] for k in PRODUCT_FIELDS})
+    incr_count("products")
+    return product_id
     
 def update_product(product_id: str, name: str = None, category: str = None, price: float = None):
     
@@ -40,25 +169,152 @@ def update_product(product_id: str, name: str = None, category: str = None, pric
 
     update_fields["updatedAt"] = datetime.utcnow()
     try:
-        return products.find_one_and_update(
+        updated = products.find_one_and_update(
             {"_id": product_id},               # חיפוש לפי מזהה
             {"$set": update_fields},           # עדכון רק של השדות שנשלחו
             return_document=ReturnDocument.AFTER
             )
     except DuplicateKeyError:
         raise ValueError("Update violates uniqueness constraint (name, category)")
+    product_cache.invalidate(product_id)
+    if updated is not None:
+        bump_version("products")
+        search_index.upsert({k: updated[k] for k in PRODUCT_FIELDS if k in updated})
+    return updated
         
+# ---------------- Set-based updates ----------------
+BULK_FIELDS = {"price": ("set", "multiply", "add"), "name": ("set",), "category": ("set",)}
+BULK_FILTERS = ("category", "ids", "min_price", "max_price")
+
+def bulk_filter(category: str = None, ids=None, min_price: float = None, max_price: float = None) -> dict:
+    query = {}
+    if category is not None:
+        query["category"] = category
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise ValueError("ids must be a list")
+        query["_id"] = {"$in": ids}
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = float(min_price)
+        if max_price is not None:
+            query["price"]["$lte"] = float(max_price)
+    if not query:
+        raise ValueError("A filter is required (category, ids, min_price, max_price)")
+    return query
+
+def bulk_update_pipeline(operations: list) -> list:
+    """
+    operations: [{"field": "price", "op": "multiply", "value": 0.9}, ...]
+    One $set stage; prices are rounded to 2 decimals and never go below 0.
+    updatedAt is stamped by the server ($$NOW).
+    """
+    if not operations:
+        raise ValueError("At least one operation is required")
+    stage = {}
+    for operation in operations:
+        field, op, value = operation.get("field"), operation.get("op"), operation.get("value")
+        if field not in BULK_FIELDS:
+            raise ValueError(f"Unsupported field: {field}")
+        if op not in BULK_FIELDS[field]:
+            raise ValueError(f"Unsupported operation for {field}: {op}")
+        if field in stage:
+            raise ValueError(f"{field} appears more than once")
+        if field == "price":
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError("price value must be a number")
+            if op == "set":
+                expr = {"$literal": value}
+            else:
+                expr = {"$multiply" if op == "multiply" else "$add": ["$price", value]}
+            stage["price"] = {"$max": [0, {"$round": [expr, 2]}]}
+        else:
+            if not isinstance(value, str) or not value:
+                raise ValueError(f"{field} must be a non-empty string")
+            stage[field] = {"$literal": value}
+    stage["updatedAt"] = "$$NOW"
+    return [{"$set": stage}]
+
+def bulk_update_products(filters: dict, operations: list) -> dict:
+    """update_many with a pipeline update; returns counts, not documents"""
+    if not isinstance(filters, dict) or set(filters) - set(BULK_FILTERS):
+        raise ValueError(f"filter may only contain {', '.join(BULK_FILTERS)}")
+    query = bulk_filter(**filters)
+    res = products.update_many(query, bulk_update_pipeline(operations))
+    invalidate_catalog(res.modified_count)
+    return {"matched": res.matched_count, "modified": res.modified_count}
+
+def invalidate_catalog(modified: int):
+    """After a set-based write: drop every cached product and the search index at once"""
+    if modified:
+        product_cache.invalidate()
+        search_index.invalidate()
+        bump_version("products")
+
 def delete_product(product_id: str) -> int:
    
     res = products.delete_one({"_id": product_id})
+    product_cache.invalidate(product_id)
+    search_index.remove(product_id)
+    incr_count("products", -res.deleted_count)
     return res.deleted_count
 
 
         
 def get_product_by_id(product_id: str):
-    
-    return products.find_one({"_id": product_id})
+    if product_cache.snapshot_mode:
+        return _catalog_snapshot().get(product_id)
+
+    product = product_cache.get(product_id)
+    if product is None:
+        product = products.find_one({"_id": product_id})
+        if product is not None:
+            product_cache.put(product_id, product)
+    return product
+
+PRODUCT_FIELDS = {"_id": 1, "name": 1, "category": 1, "price": 1}
+PRODUCTS_SORT = [("_id", ASCENDING)]
+PRODUCT_VIEWS = {"summary": ["_id", "name", "price"], "full": list(PRODUCT_FIELDS)}
+
+def products_projection(fields: str = None, exclude: str = None, view: str = None):
+    """?fields= / ?exclude= / ?view= -> projection, limited to PRODUCT_FIELDS"""
+    return build_projection(PRODUCT_FIELDS, PRODUCT_FIELDS, PRODUCT_VIEWS, [f for f, _ in PRODUCTS_SORT],
+                            fields=fields, exclude=exclude, view=view)
+
+def get_products_by_ids(product_ids) -> dict:
+    """One $in round trip for a whole basket; returns {product_id: product}"""
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
+        return {}
+    if product_cache.snapshot_mode:
+        snapshot = _catalog_snapshot()
+        return {pid: snapshot[pid] for pid in ids if pid in snapshot}
+
+    found = {}
+    missing = []
+    for pid in ids:
+        product = product_cache.get(pid)
+        if product is None:
+            missing.append(pid)
+        else:
+            found[pid] = product
+    if missing:
+        for p in products.find({"_id": {"$in": missing}}):
+            product_cache.put(p["_id"], p)
+            found[p["_id"]] = p
+    return found
 
 def get_all_products():
-    
-    return list(products.find({}, {"_id": 1, "name": 1, "category": 1, "price": 1}))
+    if product_cache.snapshot_mode:
+        return [{k: p[k] for k in PRODUCT_FIELDS if k in p} for p in _catalog_snapshot().values()]
+    return list(products.find({}, PRODUCT_FIELDS))
+
+def iter_products(batch_size: int = 1000, projection=PRODUCT_FIELDS):
+    # raw cursor - documents are pulled from Mongo one batch at a time
+    return products.find({}, projection, batch_size=batch_size)
+
+def get_products_page(limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, projection=PRODUCT_FIELDS):
+    return fetch_page(products, {}, PRODUCTS_SORT, clamp_limit(limit), cursor, projection)
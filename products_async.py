@@ -0,0 +1,118 @@
+# asyncio versions of products.py for app_async.py - shares the in-process product_cache
+import asyncio
+from datetime import datetime
+from db import async_coll, TRANSACTIONAL
+from counters import incr_count_async, bump_version_async
+from pagination import fetch_page_async, clamp_limit, DEFAULT_PAGE_SIZE
+from products import (
+    PRODUCT_FIELDS, PRODUCTS_SORT, SEARCH_LIMIT, MAX_SEARCH_LIMIT, BULK_FILTERS, product_cache, product_cache_stats,
+    search_index, search_documents, bulk_filter, bulk_update_pipeline
+)
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+def _products():
+    return async_coll("products", TRANSACTIONAL)
+
+async def _catalog_snapshot():
+    snapshot = product_cache.get_snapshot()
+    if snapshot is None:
+        snapshot = {p["_id"]: p async for p in _products().find({})}
+        product_cache.set_snapshot(snapshot)
+    return snapshot
+
+async def create_product(product_id: str, name: str, category: str, price: float):
+    now = datetime.utcnow()
+    doc = {"_id": product_id, "name": name, "category": category, "price": price,
+           "createdAt": now, "updatedAt": now}
+    try:
+        await _products().insert_one(doc)
+    except DuplicateKeyError:
+        raise ValueError(f"Product with id {product_id} already exists")
+    product_cache.invalidate(product_id)
+    search_index.upsert({k: doc[k] for k in PRODUCT_FIELDS})
+    await incr_count_async("products")
+    return product_id
+
+async def update_product(product_id: str, name: str = None, category: str = None, price: float = None):
+    update_fields = {k: v for k, v in (("name", name), ("category", category), ("price", price)) if v is not None}
+    if not update_fields:
+        return await get_product_by_id(product_id)
+
+    update_fields["updatedAt"] = datetime.utcnow()
+    try:
+        updated = await _products().find_one_and_update(
+            {"_id": product_id},
+            {"$set": update_fields},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise ValueError("Update violates uniqueness constraint (name, category)")
+    product_cache.invalidate(product_id)
+    if updated is not None:
+        await bump_version_async("products")
+        search_index.upsert({k: updated[k] for k in PRODUCT_FIELDS if k in updated})
+    return updated
+
+async def bulk_update_products(filters: dict, operations: list) -> dict:
+    if not isinstance(filters, dict) or set(filters) - set(BULK_FILTERS):
+        raise ValueError(f"filter may only contain {', '.join(BULK_FILTERS)}")
+    res = await _products().update_many(bulk_filter(**filters), bulk_update_pipeline(operations))
+    if res.modified_count:
+        product_cache.invalidate()
+        search_index.invalidate()
+        await bump_version_async("products")
+    return {"matched": res.matched_count, "modified": res.modified_count}
+
+async def delete_product(product_id: str) -> int:
+    res = await _products().delete_one({"_id": product_id})
+    product_cache.invalidate(product_id)
+    search_index.remove(product_id)
+    await incr_count_async("products", -res.deleted_count)
+    return res.deleted_count
+
+async def get_product_by_id(product_id: str):
+    if product_cache.snapshot_mode:
+        return (await _catalog_snapshot()).get(product_id)
+
+    product = product_cache.get(product_id)
+    if product is None:
+        product = await _products().find_one({"_id": product_id})
+        if product is not None:
+            product_cache.put(product_id, product)
+    return product
+
+async def get_products_by_ids(product_ids) -> dict:
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
+        return {}
+    if product_cache.snapshot_mode:
+        snapshot = await _catalog_snapshot()
+        return {pid: snapshot[pid] for pid in ids if pid in snapshot}
+
+    found = {}
+    missing = []
+    for pid in ids:
+        product = product_cache.get(pid)
+        if product is None:
+            missing.append(pid)
+        else:
+            found[pid] = product
+    if missing:
+        async for p in _products().find({"_id": {"$in": missing}}):
+            product_cache.put(p["_id"], p)
+            found[p["_id"]] = p
+    return found
+
+async def search_products(q: str, limit: int = SEARCH_LIMIT) -> list:
+    if search_index.stale:
+        # building is CPU-bound - off the event loop (only the first build is waited for)
+        await asyncio.to_thread(search_index.refresh, search_documents)
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+    return search_index.search(q, limit)
+
+def iter_products(batch_size: int = 1000, projection=PRODUCT_FIELDS):
+    return _products().find({}, projection, batch_size=batch_size)
+
+async def get_products_page(limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, projection=PRODUCT_FIELDS):
+    return await fetch_page_async(_products(), {}, PRODUCTS_SORT, clamp_limit(limit), cursor, projection)
@@ -57,9 +57,8 @@ def main():
                 else:
                     pid = result["_id"]
                     qty = result["totalSold"]
-                    prod = get_product_by_id(pid)  # כדי להציג גם שם
-                    name = prod["name"] if prod and "name" in prod else "(no name)"
-                    cat = prod.get("category") if prod else None
+                    name = result.get("name") or "(no name)"  # השם מגיע כבר מ-top_products
+                    cat = result.get("category")
                     print(f"Top selling product: {name} [ID: {pid}] — units sold: {qty}" + (f", category: {cat}" if cat else ""))
             except Exception as e:
                 print(" Error:", e)
@@ -0,0 +1,39 @@
+"""
+Sparse fieldsets for read endpoints: ?fields=a,b  ?exclude=a,b  ?view=summary
+become a Mongo projection, so unwanted fields are never read, sent, decoded or encoded.
+"""
+
+def parse_fields(value) -> list:
+    if not value:
+        return []
+    return [f.strip() for f in value.split(",") if f.strip()]
+
+def build_projection(allowed, default=None, views=None, keep=("_id",), fields=None, exclude=None, view=None):
+    """
+    allowed: top-level field names clients may ask for (dotted paths below them are fine)
+    default: the projection used when nothing is asked for (None = whole document)
+    keep:    fields that are always returned - the sort keys that page cursors are built from
+    Raises ValueError for unknown fields/views or when more than one option is given.
+    """
+    fields, exclude = parse_fields(fields), parse_fields(exclude)
+    if sum(map(bool, (fields, exclude, view))) > 1:
+        raise ValueError("Use only one of fields, exclude, view")
+    if view:
+        if view not in (views or {}):
+            raise ValueError(f"Unknown view: {view} (available: {', '.join(views or {})})")
+        fields = views[view]
+        if fields is None:
+            return None
+    for f in fields + exclude:
+        if f.split(".")[0] not in allowed:
+            raise ValueError(f"Unknown field: {f}")
+
+    if fields:
+        projection = {f: 1 for f in fields}
+        projection.update({k: 1 for k in keep})
+        return projection
+    if exclude:
+        if default:   # the default is an inclusion projection - drop fields from it
+            return {k: v for k, v in default.items() if k not in exclude or k in keep}
+        return {f: 0 for f in exclude if f not in keep}
+    return default
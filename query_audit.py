@@ -0,0 +1,224 @@
+"""
+Query-plan audit: runs explain("executionStats") on every query and aggregation
+shape the data modules issue and reports collection scans, in-memory sorts and
+docs examined per doc returned.
+
+    python query_audit.py --db Market_bench [--seed 100k] [--max-ratio 10] [--json]
+
+--seed replaces the data in --db first (seed_data.py - never point it at production;
+the app's own DB_NAME is refused without --force).
+The indexes are (re)created with the ensure_*_indexes functions before the audit, so
+the plans are those of the declared indexes. For a flagged shape an index is suggested
+(equality fields, then the sort, then range fields). Exits 1 when a shape has a
+problem it isn't allowed to have, so CI catches a query that lost its index.
+"""
+import argparse, json, os, sys
+from datetime import datetime, timedelta, timezone
+
+MAX_RATIO = 10      # docs examined per doc returned
+MIN_EXAMINED = 100  # below this a ratio is noise
+LIMIT = 51          # a default list page + the look-ahead document
+
+def shapes(sample: dict) -> list:
+    """
+    Every shape as {name, coll, filter/sort/projection/limit or pipeline, allow}.
+    Built from the modules' own helpers so the audit follows the code.
+    allow: problems accepted for that shape (e.g. COLLSCAN on a collection of a few hundred rows).
+    """
+    from pagination import keyset_query
+    from orders import ORDERS_SORT, ORDER_VIEWS, sales_report_pipeline
+    from customers import CUSTOMER_FIELDS, CUSTOMERS_SORT, prefix_query, text_query
+    from products import PRODUCT_FIELDS, PRODUCTS_SORT, bulk_filter
+
+    customer_orders = {"customerId": sample["customer_id"]}
+    summary = {f: 1 for f in ORDER_VIEWS["summary"]}
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    name_query, name_sort = prefix_query(sample["customer_name"][:3])
+    text_filter, text_projection, text_sort = text_query(sample["customer_name"].split()[0])
+    return [
+        # orders (hot and archive)
+        {"name": "orders.get_order_by_id", "coll": "orders", "filter": {"_id": sample["order_id"]}},
+        {"name": "orders.list_orders_page", "coll": "orders", "filter": {}, "sort": ORDERS_SORT},
+        {"name": "orders.list_orders_page(view=summary)", "coll": "orders", "filter": {}, "sort": ORDERS_SORT,
+         "projection": summary},
+        {"name": "orders.list_orders_page(cursor)", "coll": "orders",
+         "filter": keyset_query({}, ORDERS_SORT, sample["orders_cursor"]), "sort": ORDERS_SORT},
+        {"name": "orders.list_orders_page(customer_id)", "coll": "orders", "filter": customer_orders,
+         "sort": ORDERS_SORT},
+        {"name": "orders.list_orders(customer_id)", "coll": "orders", "filter": customer_orders},
+        {"name": "orders_archive.list_orders_page(customer_id)", "coll": "orders_archive",
+         "filter": customer_orders, "sort": ORDERS_SORT},
+        {"name": "orders.sales_report(7d)", "coll": "orders", "pipeline": sales_report_pipeline(start=week_ago)},
+        {"name": "orders.sales_report(7d, status)", "coll": "orders",
+         "pipeline": sales_report_pipeline(start=week_ago, status="paid")},
+        # rollups (analytics)
+        {"name": "rollups.rollup_top_customers", "coll": "sales_by_customer",
+         "filter": {"ordersCount": {"$gt": 0}}, "sort": [("ordersCount", -1)], "limit": 5},
+        {"name": "rollups.rollup_top_products", "coll": "sales_by_product",
+         "filter": {"totalSold": {"$gt": 0}}, "sort": [("totalSold", -1)], "limit": 1},
+        {"name": "rollups.rollup_revenue_by_day", "coll": "sales_daily",
+         "filter": {"_id": {"$gte": f"{week_ago:%Y-%m-%d}"}}, "sort": [("_id", 1)], "limit": 0},
+        {"name": "rollups.rollup_total_revenue", "coll": "sales_daily",
+         "pipeline": [{"$group": {"_id": None, "total": {"$sum": "$revenue"}}}],
+         "allow": ("COLLSCAN",)},   # one row per day
+        # customers
+        {"name": "customers.get_customer_by_id", "coll": "customers", "filter": {"_id": sample["customer_id"]}},
+        {"name": "customers.get_customers_page", "coll": "customers", "filter": {}, "sort": CUSTOMERS_SORT,
+         "projection": CUSTOMER_FIELDS},
+        {"name": "customers.search_customers(prefix)", "coll": "customers", "filter": name_query,
+         "sort": name_sort, "projection": CUSTOMER_FIELDS, "limit": 10},
+        {"name": "customers.search_customers(text)", "coll": "customers", "filter": text_filter,
+         "sort": text_sort, "projection": text_projection, "limit": 10,
+         "allow": ("SORT",)},   # a textScore sort is always in memory, over the text matches only
+        # products
+        {"name": "products.get_product_by_id", "coll": "products", "filter": {"_id": sample["product_id"]}},
+        {"name": "products.get_products_page", "coll": "products", "filter": {}, "sort": PRODUCTS_SORT,
+         "projection": PRODUCT_FIELDS},
+        {"name": "products.bulk_update_products(category)", "coll": "products",
+         "filter": bulk_filter(category=sample["category"]), "limit": 0},
+        # counters
+        {"name": "counters.get_counts", "coll": "counters",
+         "filter": {"_id": {"$in": ["customers", "products", "orders"]}}, "limit": 0},
+    ]
+
+def take_sample(db) -> dict:
+    from pagination import encode_cursor
+    from orders import ORDERS_SORT
+    order = db.orders.find_one(sort=ORDERS_SORT)
+    if order is None:
+        sys.exit("no orders in the database - seed it first (--seed 10k)")
+    deep = next(db.orders.find({}, {"createdAt": 1}).sort(ORDERS_SORT).skip(1000).limit(1), order)
+    customer = db.customers.find_one({"_id": order["customerId"]}) or db.customers.find_one() or {}
+    product = db.products.find_one() or {}
+    return {"order_id": order["_id"], "orders_cursor": encode_cursor(deep, ORDERS_SORT),
+            "customer_id": order["customerId"], "customer_name": customer.get("name") or "a",
+            "product_id": product.get("_id"), "category": product.get("category") or "-"}
+
+# ---------------- explain ----------------
+def explain_command(shape: dict) -> dict:
+    if "pipeline" in shape:
+        return {"aggregate": shape["coll"], "pipeline": shape["pipeline"], "cursor": {}}
+    command = {"find": shape["coll"], "filter": shape["filter"]}
+    if shape.get("sort"):
+        command["sort"] = dict(shape["sort"])
+    if shape.get("projection"):
+        command["projection"] = shape["projection"]
+    limit = shape.get("limit", LIMIT)
+    if limit:
+        command["limit"] = limit
+    return command
+
+def plan_stages(plan: dict) -> list:
+    """Stage names of a winning plan, root first; IXSCAN carries its index name"""
+    stages = []
+    while plan:
+        name = plan.get("stage", "?")
+        stages.append(f"{name}({plan['indexName']})" if "indexName" in plan else name)
+        children = plan.get("inputStages") or [plan.get("inputStage") or plan.get("queryPlan")]
+        for child in children[1:]:
+            stages.extend(plan_stages(child))
+        plan = children[0] if children else None
+    return stages
+
+def walk(explained, stages: list, stats: list):
+    """Collects the winning plans and executionStats wherever they are nested (find, $cursor, $unionWith)"""
+    if isinstance(explained, dict):
+        for key, value in explained.items():
+            if key == "winningPlan" and isinstance(value, dict):
+                stages.extend(plan_stages(value.get("queryPlan", value)))
+            elif key == "executionStats" and isinstance(value, dict):
+                stats.append(value)
+            else:
+                walk(value, stages, stats)
+    elif isinstance(explained, list):
+        for value in explained:
+            walk(value, stages, stats)
+
+def suggest_index(shape: dict) -> list:
+    """ESR order: equality fields, then the sort, then range fields"""
+    query, sort = shape.get("filter"), shape.get("sort") or []
+    if "pipeline" in shape:
+        stages = shape["pipeline"]
+        query = stages[0].get("$match", {}) if stages else {}
+        if len(stages) > 1 and "$sort" in stages[1]:
+            sort = list(stages[1]["$sort"].items())
+    equality, ranges = [], []
+    for field, cond in (query or {}).items():
+        if field.startswith("$"):
+            continue
+        is_range = isinstance(cond, dict) and any(op in cond for op in ("$gt", "$gte", "$lt", "$lte", "$regex"))
+        (ranges if is_range else equality).append(field)
+    keys = [(f, 1) for f in equality]
+    keys += [(f, d) for f, d in sort if f not in equality and isinstance(d, int)]
+    keys += [(f, 1) for f in ranges if f not in dict(keys)]
+    return keys
+
+def audit_shape(db, shape: dict, max_ratio: float) -> dict:
+    explained = db.command("explain", explain_command(shape), verbosity="executionStats")
+    stages, stats = [], []
+    walk(explained, stages, stats)
+    examined = sum(s.get("totalDocsExamined", 0) for s in stats)
+    keys = sum(s.get("totalKeysExamined", 0) for s in stats)
+    returned = sum(s.get("nReturned", 0) for s in stats)
+    ratio = examined / max(returned, 1)
+
+    problems = []
+    if any(s.startswith("COLLSCAN") for s in stages):
+        problems.append("COLLSCAN")
+    if "SORT" in stages:
+        problems.append("SORT")   # blocking in-memory sort
+    if examined >= MIN_EXAMINED and ratio > max_ratio:
+        problems.append("RATIO")
+    problems = [p for p in problems if p not in shape.get("allow", ())]
+    return {
+        "name": shape["name"], "collection": shape["coll"], "plan": " > ".join(stages),
+        "docs_examined": examined, "keys_examined": keys, "returned": returned, "ratio": round(ratio, 1),
+        "ms": max((s.get("executionTimeMillis", 0) for s in stats), default=0),
+        "problems": problems, "suggested_index": suggest_index(shape) if problems else None,
+    }
+
+def run_audit(db, max_ratio: float = MAX_RATIO) -> list:
+    return [audit_shape(db, shape, max_ratio) for shape in shapes(take_sample(db))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="Market_bench", help="database to audit")
+    parser.add_argument("--seed", metavar="SCALE", help="seed the database first: 10k, 100k, 1m or a number")
+    parser.add_argument("--force", action="store_true", help="allow --seed to replace the app's own database")
+    parser.add_argument("--max-ratio", type=float, default=MAX_RATIO, help="docs examined per doc returned")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    from seed_data import seed, parse_scale, check_target   # before DB_NAME is changed (seed_data.APP_DB_NAME)
+    if args.seed:
+        try:
+            check_target(args.db, args.force)
+        except ValueError as e:
+            sys.exit(str(e))
+    os.environ["DB_NAME"] = args.db   # before db.py is imported
+    from db import get_db
+    if args.seed:
+        seed(parse_scale(args.seed), log=lambda m: print(m, file=sys.stderr), force=args.force)
+    from orders import ensure_orders_indexes
+    from customers import ensure_customers_indexes
+    from products import ensure_products_indexes
+    ensure_orders_indexes()
+    ensure_customers_indexes()
+    ensure_products_indexes()
+
+    report = run_audit(get_db(), args.max_ratio)
+    failed = [r for r in report if r["problems"]]
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        for r in report:
+            status = "FAIL " + ",".join(r["problems"]) if r["problems"] else "ok"
+            print(f"{r['name']:<48} {status:<16} examined={r['docs_examined']:<8} returned={r['returned']:<6} "
+                  f"ratio={r['ratio']:<8} {r['ms']}ms  {r['plan']}")
+            if r["suggested_index"]:
+                print(f"{'':<48} suggested index on {r['collection']}: {r['suggested_index']}")
+        print(f"\n{len(report) - len(failed)}/{len(report)} shapes ok", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+from collections import defaultdict
+from db import orders_coll, orders_archive_coll, sales_daily_coll, sales_by_product_coll, sales_by_customer_coll, async_coll, ANALYTICS
+from pymongo import UpdateOne, DESCENDING
+import sys
+
+# סיכומי מכירות שמתעדכנים עם כל כתיבה של הזמנה ($inc), במקום $group על כל האוסף
+sales_daily = sales_daily_coll()
+sales_by_product = sales_by_product_coll()
+sales_by_customer = sales_by_customer_coll()
+# reads go through the analytics routing profile (db.py)
+sales_daily_reads = sales_daily_coll(ANALYTICS)
+sales_by_product_reads = sales_by_product_coll(ANALYTICS)
+sales_by_customer_reads = sales_by_customer_coll(ANALYTICS)
+
+def ensure_rollups_indexes():
+    sales_by_product.create_index([("totalSold", DESCENDING)], name="totalSold_desc")
+    sales_by_customer.create_index([("ordersCount", DESCENDING)], name="ordersCount_desc")
+
+def day_key(dt) -> str:
+    return dt.strftime("%Y-%m-%d")
+
+def rollup_updates(changes) -> dict:
+    """
+    changes: iterable of (order_doc, sign) with sign +1 (added) or -1 (removed).
+    Deltas are merged per key, so a batch of orders costs one upsert per distinct
+    day/product/customer. Returns {collection_name: [UpdateOne, ...]}.
+    """
+    daily = defaultdict(lambda: [0, 0])        # day -> [revenue, orders]
+    by_product = defaultdict(lambda: [0, 0])   # productId -> [totalSold, revenue]
+    by_customer = defaultdict(lambda: [0, 0])  # customerId -> [ordersCount, revenue]
+
+    for doc, sign in changes:
+        total = doc.get("totalAmount", 0)
+        day = daily[day_key(doc["createdAt"])]
+        day[0] += sign * total
+        day[1] += sign
+        customer = by_customer[doc.get("customerId")]
+        customer[0] += sign
+        customer[1] += sign * total
+        for item in doc.get("items", []):
+            qty = item.get("quantity", 1)
+            product = by_product[item["productId"]]
+            product[0] += sign * qty
+            product[1] += sign * qty * item.get("price", 0)
+
+    def ops(deltas, first, second):
+        return [UpdateOne({"_id": key}, {"$inc": {first: a, second: b}}, upsert=True)
+                for key, (a, b) in deltas.items() if a or b]
+
+    return {
+        "sales_daily": ops(daily, "revenue", "orders"),
+        "sales_by_product": ops(by_product, "totalSold", "revenue"),
+        "sales_by_customer": ops(by_customer, "ordersCount", "revenue"),
+    }
+
+_COLLECTIONS = {
+    "sales_daily": sales_daily,
+    "sales_by_product": sales_by_product,
+    "sales_by_customer": sales_by_customer,
+}
+
+def apply_changes(changes):
+    for name, requests in rollup_updates(changes).items():
+        if requests:
+            _COLLECTIONS[name].bulk_write(requests, ordered=False)
+
+def record_orders(docs, sign: int = 1):
+    apply_changes((doc, sign) for doc in docs)
+
+def record_order_change(before: dict, after: dict):
+    apply_changes([(before, -1), (after, 1)])
+
+async def apply_changes_async(changes):
+    for name, requests in rollup_updates(changes).items():
+        if requests:
+            await async_coll(name).bulk_write(requests, ordered=False)
+
+# ---------------- Reads ----------------
+def rollup_total_revenue():
+    result = list(sales_daily_reads.aggregate([{"$group": {"_id": None, "total": {"$sum": "$revenue"}}}]))
+    return result[0]["total"] if result else 0
+
+def rollup_revenue_by_day(start: str = None, end: str = None):
+    query = {}
+    if start or end:
+        query["_id"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v}
+    return list(sales_daily_reads.find(query).sort("_id", 1))
+
+def rollup_top_customers(limit: int = 1):
+    return list(sales_by_customer_reads.find({"ordersCount": {"$gt": 0}})
+                .sort("ordersCount", DESCENDING).limit(limit))
+
+def rollup_top_products(limit: int = 1):
+    return list(sales_by_product_reads.find({"totalSold": {"$gt": 0}})
+                .sort("totalSold", DESCENDING).limit(limit))
+
+# ---------------- Rebuild ----------------
+def rebuild_rollups():
+    """
+    Recomputes every summary collection from the orders collection and its archive
+    ($out swaps each one in atomically and keeps its indexes). Fixes drift; run off-peak,
+    since order writes made while a rebuild runs may be missed.
+    """
+    orders = orders_coll()
+    # no $unionWith stage while nothing is archived (mongomock, used by the benchmarks, has none)
+    all_orders = [{"$unionWith": "orders_archive"}] if orders_archive_coll().find_one({}, {"_id": 1}) else []
+    orders.aggregate([
+        *all_orders,
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$createdAt"}},
+            "revenue": {"$sum": "$totalAmount"},
+            "orders": {"$sum": 1},
+        }},
+        {"$out": "sales_daily"},
+    ])
+    orders.aggregate([
+        *all_orders,
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": "$items.productId",
+            "totalSold": {"$sum": {"$ifNull": ["$items.quantity", 1]}},
+            "revenue": {"$sum": {"$multiply": [
+                {"$ifNull": ["$items.quantity", 1]}, {"$ifNull": ["$items.price", 0]}]}},
+        }},
+        {"$out": "sales_by_product"},
+    ])
+    orders.aggregate([
+        *all_orders,
+        {"$group": {
+            "_id": "$customerId",
+            "ordersCount": {"$sum": 1},
+            "revenue": {"$sum": "$totalAmount"},
+        }},
+        {"$out": "sales_by_customer"},
+    ])
+    ensure_rollups_indexes()
+
+def rollups_missing() -> bool:
+    """
+    Orders (hot or archived) but no summaries yet: a database from before the rollups.
+    The /api/analytics reads are empty until `python rollups.py rebuild` runs once.
+    """
+    if sales_daily.find_one({}, {"_id": 1}) is not None:
+        return False
+    return orders_coll().find_one({}, {"_id": 1}) is not None or \
+        orders_archive_coll().find_one({}, {"_id": 1}) is not None
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python rollups.py rebuild", file=sys.stderr)
+        sys.exit(2)
+    rebuild_rollups()
+    print("Rollups rebuilt")
@@ -0,0 +1,253 @@
+"""
+High-volume synthetic data for load tests.
+
+    python seed_data.py --scale 10m --workers 8 --db Market_load
+    python seed_data.py --scale 100k --seed 7 --days 90 --db Market_dev
+
+Documents have the shape create_customer/create_product/create_order produce.
+Product popularity and repeat customers are Zipf-skewed, and createdAt is spread
+over --days with a store-hours daily curve. Values are generated with NumPy,
+one vectorized batch at a time. Orders are written with unordered insert_many
+from parallel worker processes. The same --seed and --scale always produce
+the same data.
+
+Seeding replaces the customers, products and orders collections of the target
+database - never run it against production. --db is required, and the database the
+app is configured with (DB_NAME, environment or .env) is refused without --force.
+"""
+import argparse, os, sys, time
+import multiprocessing as mp
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+CATEGORIES = ["Dairy", "Bakery", "Produce", "Meat", "Drinks", "Snacks", "Frozen", "Household", "Pharmacy", "Baby"]
+BRANDS = ["Tnuva", "Osem", "Elite", "Strauss", "Tara", "Angel", "Sano", "Prigat", "Yotvata", "Telma",
+          "Vita", "Shufersal", "Achla", "Sugat", "Tami", "Zoglowek", "Of Tov", "Materna", "Neviot", "Coca-Cola"]
+ITEMS = ["Milk", "Bread", "Cheese", "Yogurt", "Hummus", "Rice", "Pasta", "Coffee", "Tea", "Juice",
+         "Chocolate", "Cookies", "Cereal", "Chicken", "Schnitzel", "Tomatoes", "Cucumbers", "Bamba",
+         "Bissli", "Water", "Detergent", "Shampoo", "Diapers", "Olive Oil", "Tahini", "Pita", "Eggs", "Butter"]
+SIZES = ["100g", "200g", "500g", "1kg", "1L", "1.5L", "2L", "6-pack", "Family", "Mini"]
+FIRST_NAMES = ["Noa", "Yosef", "Maya", "Omer", "Tamar", "Ahmad", "Lior", "Shira", "Daniel", "Rana",
+               "Itai", "Yael", "Mohammad", "Adi", "Eitan", "Lina", "Avi", "Michal", "Karim", "Roni"]
+LAST_NAMES = ["Cohen", "Levi", "Mizrahi", "Peretz", "Biton", "Nofal", "Friedman", "Avraham", "Khoury",
+              "Dahan", "Azoulay", "Katz", "Haddad", "Ohana", "Shapiro", "Amar", "Malka", "Saleh"]
+
+# store hours - share of the day's orders placed in each UTC hour
+HOUR_WEIGHTS = np.array([0, 0, 0, 0, 0, 1, 3, 6, 8, 9, 9, 8, 7, 7, 8, 10, 12, 13, 11, 7, 3, 1, 0, 0], dtype=float)
+STATUSES = np.array(["paid", "shipped", "cancelled"])
+STATUS_WEIGHTS = np.array([0.70, 0.27, 0.03])
+
+def parse_scale(value: str) -> int:
+    return SCALES.get(value.lower()) or int(value)
+
+def scale_sizes(orders: int) -> dict:
+    return {
+        "customers": max(100, orders // 20),
+        "products": max(50, min(orders // 50, 500_000)),
+        "orders": orders,
+    }
+
+def zipf_cdf(n: int, s: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+def make_customers(n: int, seed: int) -> list:
+    rng = np.random.default_rng([seed, 1])
+    first = rng.integers(0, len(FIRST_NAMES), n)
+    last = rng.integers(0, len(LAST_NAMES), n)
+    phones = rng.integers(0, 10 ** 8, n)
+    now = datetime.now(timezone.utc)
+    return [
+        {"_id": f"C{i:07d}", "name": f"{FIRST_NAMES[f]} {LAST_NAMES[l]}",
+         "phone": f"05{p:08d}", "email": f"c{i}@example.com", "createdAt": now, "updatedAt": now}
+        for i, (f, l, p) in enumerate(zip(first.tolist(), last.tolist(), phones.tolist()))
+    ]
+
+def make_catalog(n: int, seed: int):
+    """Returns (product docs, price array, category array)"""
+    rng = np.random.default_rng([seed, 2])
+    brand = rng.integers(0, len(BRANDS), n)
+    item = rng.integers(0, len(ITEMS), n)
+    size = rng.integers(0, len(SIZES), n)
+    category = rng.integers(0, len(CATEGORIES), n)
+    prices = np.round(rng.lognormal(mean=2.5, sigma=0.8, size=n), 2).clip(0.5, 999)
+    now = datetime.now(timezone.utc)
+    docs = [
+        {"_id": f"P{i:06d}", "name": f"{BRANDS[b]} {ITEMS[it]} {SIZES[sz]}", "category": CATEGORIES[c],
+         "price": p, "createdAt": now, "updatedAt": now}
+        for i, (b, it, sz, c, p) in enumerate(zip(brand.tolist(), item.tolist(), size.tolist(),
+                                                  category.tolist(), prices.tolist()))
+    ]
+    return docs, prices, category
+
+def make_orders(start: int, count: int, cfg: dict) -> list:
+    """Order documents [start, start + count); depends only on (seed, start, count)"""
+    seed, sizes = cfg["seed"], cfg["sizes"]
+    rng = np.random.default_rng([seed, 3, start])
+    n_products, n_customers = sizes["products"], sizes["customers"]
+
+    # popularity rank -> id, fixed by the seed so hot products/customers are spread over the id space
+    product_rank = np.random.default_rng([seed, 4]).permutation(n_products)
+    customer_rank = np.random.default_rng([seed, 5]).permutation(n_customers)
+    names, prices, categories = catalog_arrays(cfg)
+
+    customers = customer_rank[np.searchsorted(zipf_cdf(n_customers, 0.8), rng.random(count))]
+    n_items = rng.integers(1, 9, count)
+    offsets = np.concatenate(([0], np.cumsum(n_items)[:-1]))
+    total_items = int(n_items.sum())
+    products = product_rank[np.searchsorted(zipf_cdf(n_products, 1.1), rng.random(total_items))]
+    qty = rng.integers(1, 5, total_items)
+    line_price = prices[products]
+    totals = np.round(np.add.reduceat(qty * line_price, offsets), 2)
+
+    days = rng.integers(0, cfg["days"], count)
+    hours = rng.choice(24, count, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = rng.integers(0, 3600, count)
+    now = np.datetime64(cfg["now"], "s")
+    created = (now - (days * 86400).astype("timedelta64[s]")).astype("datetime64[D]") \
+        + (hours * 3600 + seconds).astype("timedelta64[s]")
+    created = np.minimum(created, now).astype("datetime64[ms]").tolist()
+    status = rng.choice(STATUSES, count, p=STATUS_WEIGHTS).tolist()
+
+    products_l, qty_l, price_l = products.tolist(), qty.tolist(), line_price.tolist()
+    category_l = categories[products].tolist()
+    docs = []
+    for k in range(count):
+        lo = int(offsets[k])
+        hi = lo + int(n_items[k])
+        items = [
+            {"productId": f"P{products_l[j]:06d}", "name": names[products_l[j]], "category": CATEGORIES[category_l[j]],
+             "quantity": qty_l[j], "price": price_l[j]}
+            for j in range(lo, hi)
+        ]
+        docs.append({
+            "_id": f"O{start + k:09d}",
+            "customerId": f"C{int(customers[k]):07d}",
+            "items": items,
+            "totalAmount": float(totals[k]),
+            "status": status[k],
+            "createdAt": created[k],
+            "updatedAt": created[k],
+        })
+    return docs
+
+_catalog_cache = {}
+
+def catalog_arrays(cfg: dict):
+    """(names, prices, categories) of the generated catalog, built once per worker process"""
+    key = (cfg["seed"], cfg["sizes"]["products"])
+    if key not in _catalog_cache:
+        docs, prices, categories = make_catalog(cfg["sizes"]["products"], cfg["seed"])
+        _catalog_cache.clear()
+        _catalog_cache[key] = ([d["name"] for d in docs], prices, categories)
+    return _catalog_cache[key]
+
+def write_chunk(args) -> int:
+    start, count, cfg = args
+    from db import orders_coll
+    orders_coll().insert_many(make_orders(start, count, cfg), ordered=False)
+    return count
+
+def app_db_name() -> str:
+    """The database the app uses: DB_NAME from the environment, then .env, then db.py's default"""
+    from dotenv import dotenv_values
+    env_file = dotenv_values(Path(__file__).resolve().parent / ".env")
+    return os.getenv("DB_NAME") or env_file.get("DB_NAME") or "Market"
+
+# read on import: the CLIs import this module before they point DB_NAME at their target
+APP_DB_NAME = app_db_name()
+
+def check_target(db_name: str, force: bool = False):
+    if db_name == APP_DB_NAME and not force:
+        raise ValueError(f"refusing to replace {db_name}, the database the app is configured with "
+                         f"(--force to do it anyway)")
+
+def _worker_init(db_name: str):
+    os.environ["DB_NAME"] = db_name
+
+def seed(orders: int, seed: int = 42, days: int = 180, workers: int = None, batch: int = 10_000,
+         rebuild: bool = True, log=None, force: bool = False) -> dict:
+    """
+    Replaces customers/products/orders with a generated dataset; returns the sizes.
+    workers=0 writes from this process (needed for in-process stand-ins like mongomock).
+    Refuses the app's own database (check_target) unless force=True.
+    """
+    from db import customers_coll, products_coll, orders_coll, orders_archive_coll, DB_NAME
+
+    check_target(DB_NAME, force)
+    log = log or (lambda msg: None)
+    sizes = scale_sizes(orders)
+    cfg = {"seed": seed, "sizes": sizes, "days": days,
+           "now": datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0).isoformat()}
+
+    for coll in (customers_coll(), products_coll(), orders_coll(), orders_archive_coll()):
+        coll.drop()
+
+    t0 = time.perf_counter()
+    customers = make_customers(sizes["customers"], seed)
+    for i in range(0, len(customers), batch):
+        customers_coll().insert_many(customers[i:i + batch], ordered=False)
+    catalog, _, _ = make_catalog(sizes["products"], seed)
+    for i in range(0, len(catalog), batch):
+        products_coll().insert_many(catalog[i:i + batch], ordered=False)
+    log(f"customers={len(customers)} products={len(catalog)} in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    chunks = [(start, min(batch, orders - start), cfg) for start in range(0, orders, batch)]
+    workers = os.cpu_count() if workers is None else workers
+    done = 0
+    if workers:
+        with mp.get_context("spawn").Pool(workers, initializer=_worker_init, initargs=(DB_NAME,)) as pool:
+            for count in pool.imap_unordered(write_chunk, chunks):
+                done += count
+                log(f"orders {done}/{orders} ({done / (time.perf_counter() - t0):,.0f}/s)")
+    else:
+        for chunk in chunks:
+            done += write_chunk(chunk)
+            log(f"orders {done}/{orders} ({done / (time.perf_counter() - t0):,.0f}/s)")
+
+    if rebuild:
+        from orders import ensure_orders_indexes
+        from customers import ensure_customers_indexes
+        from products import ensure_products_indexes
+        from counters import rebuild_counters
+        from rollups import rebuild_rollups
+        t0 = time.perf_counter()
+        ensure_customers_indexes()
+        ensure_products_indexes()
+        ensure_orders_indexes()
+        rebuild_counters()
+        rebuild_rollups()
+        log(f"indexes, counters and rollups in {time.perf_counter() - t0:.1f}s")
+    return sizes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="100k", help="orders: 10k, 100k, 1m, 10m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=180, help="spread createdAt over this many days")
+    parser.add_argument("--workers", type=int, default=None, help="writer processes (default: CPU count)")
+    parser.add_argument("--batch", type=int, default=10_000, help="orders per insert_many")
+    parser.add_argument("--db", required=True, help="database to replace (not the app's DB_NAME)")
+    parser.add_argument("--force", action="store_true", help="allow seeding the app's own database")
+    parser.add_argument("--no-rebuild", action="store_true", help="skip indexes/counters/rollups")
+    args = parser.parse_args(argv)
+
+    try:
+        check_target(args.db, args.force)
+    except ValueError as e:
+        sys.exit(str(e))
+    os.environ["DB_NAME"] = args.db   # before db.py is imported
+    t0 = time.perf_counter()
+    sizes = seed(parse_scale(args.scale), seed=args.seed, days=args.days, workers=args.workers,
+                 batch=args.batch, rebuild=not args.no_rebuild, log=lambda m: print(m, file=sys.stderr),
+                 force=args.force)
+    print(f"seeded {sizes} in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+"""
+Columnar analytics snapshot of the orders, kept as memory-mapped NumPy columns.
+
+    python snapshot.py refresh            # append orders created since the last refresh
+    python snapshot.py rebuild            # start over (after bulk edits/deletes of old orders)
+    python snapshot.py rfm|basket|hourly  # print a report
+
+Orders are streamed by (createdAt, _id) in cursor batches and appended to one file
+per column: an orders table (time, customer, total, status) and an items table
+(order row, product, quantity, price) with the items flattened. Customer, product
+and status ids are stored as integer codes; the ids themselves are in append-only
+dictionary files. meta.json holds the row counts and the watermark and is replaced
+last, so readers never see a half-written batch.
+
+The first build and a rebuild are written to a separate directory that is swapped in
+when complete, so readers keep the previous snapshot (or get "no snapshot") meanwhile;
+the swap itself is two renames with a moment in between (see _swap).
+Refreshes are serialized across processes (server workers, the CLI) by an OS lock on
+<SNAPSHOT_DIR>.lock, next to the directory since the directory itself gets swapped.
+
+A refresh only reads orders created after the watermark (and at least SNAPSHOT_LAG_S
+seconds ago, so writes still in flight aren't skipped). Later updates and deletes of
+orders already in the snapshot are picked up by a rebuild. The first build also reads
+orders_archive.
+
+The reports (rfm_report, basket_report, hourly_report) are NumPy vector operations
+over the mapped columns and don't touch MongoDB.
+"""
+import argparse, itertools, json, os, shutil, sys, threading, time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", Path(__file__).resolve().parent / "snapshot"))
+SNAPSHOT_LAG_S = int(os.getenv("SNAPSHOT_LAG_S", "5"))
+BATCH_SIZE = 10_000
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+
+ORDER_COLUMNS = {"ts": np.int64, "customer": np.int32, "total": np.float64, "status": np.int8}
+ITEM_COLUMNS = {"order": np.int64, "product": np.int32, "quantity": np.float32, "price": np.float64}
+DICTIONARIES = ("customers", "products", "statuses")
+SNAPSHOT_SORT = [("createdAt", 1), ("_id", 1)]
+SNAPSHOT_FIELDS = {"createdAt": 1, "customerId": 1, "totalAmount": 1, "status": 1,
+                   "items.productId": 1, "items.quantity": 1, "items.price": 1}
+
+# ---------------- Files ----------------
+def _column_path(path: Path, table: str, name: str) -> Path:
+    return path / f"{table}.{name}.bin"
+
+def read_meta(path: Path = SNAPSHOT_DIR) -> dict:
+    try:
+        return json.loads((path / "meta.json").read_text())
+    except FileNotFoundError:
+        return {"orders": 0, "items": 0, "dictionaries": {d: 0 for d in DICTIONARIES}, "watermark": None}
+
+def _write_meta(path: Path, meta: dict):
+    tmp = path / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path / "meta.json")
+
+def _read_dictionary(path: Path, name: str, count: int) -> list:
+    file = path / f"{name}.txt"
+    if not count:
+        return []
+    with open(file, encoding="utf-8") as f:
+        values = [line.rstrip("\n") for line in itertools.islice(f, count)]
+    if len(values) < count:
+        raise ValueError(f"{file} is shorter than meta.json - run: python snapshot.py rebuild")
+    return values
+
+def _truncate(path: Path, meta: dict):
+    """
+    Drops whatever an interrupted refresh wrote after the last meta.json.
+    Readers only look at the rows meta.json counts, so files are touched only when they
+    hold more than that: columns are cut back in place, a dictionary is rewritten to a
+    temp file and replaced (a reader never opens a half-written one).
+    """
+    for table, columns in (("orders", ORDER_COLUMNS), ("items", ITEM_COLUMNS)):
+        for name, dtype in columns.items():
+            file = _column_path(path, table, name)
+            size = meta[table] * np.dtype(dtype).itemsize
+            if file.exists() and file.stat().st_size > size:
+                os.truncate(file, size)
+    for name in DICTIONARIES:
+        file = path / f"{name}.txt"
+        if not file.exists():
+            continue
+        with open(file, encoding="utf-8") as f:
+            lines = sum(1 for _ in f)
+        count = meta["dictionaries"][name]
+        if lines > count:
+            tmp = file.with_name(file.name + ".tmp")
+            tmp.write_text("".join(v + "\n" for v in _read_dictionary(path, name, count)), encoding="utf-8")
+            os.replace(tmp, file)
+
+# ---------------- Refresh ----------------
+class _Encoder:
+    """id -> integer code, appending new ids to the dictionary file"""
+
+    def __init__(self, path: Path, name: str, count: int):
+        self.values = _read_dictionary(path, name, count)
+        self.codes = {v: i for i, v in enumerate(self.values)}
+        self._file = path / f"{name}.txt"
+        self._new = []
+
+    def code(self, value) -> int:
+        value = str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            self._new.append(value)
+        return code
+
+    def flush(self):
+        if self._new:
+            with open(self._file, "a", encoding="utf-8") as f:
+                f.write("".join(v + "\n" for v in self._new))
+            self._new = []
+
+def _append_batch(path: Path, docs: list, meta: dict, encoders: dict):
+    n_orders = len(docs)
+    ts = np.empty(n_orders, np.int64)
+    customer = np.empty(n_orders, np.int32)
+    total = np.empty(n_orders, np.float64)
+    status = np.empty(n_orders, np.int8)
+    item_order, item_product, item_qty, item_price = [], [], [], []
+    first_row = meta["orders"]
+    for i, doc in enumerate(docs):
+        created = doc["createdAt"]
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        ts[i] = int(created.timestamp() * 1000)
+        customer[i] = encoders["customers"].code(doc.get("customerId"))
+        total[i] = doc.get("totalAmount", 0)
+        status[i] = encoders["statuses"].code(doc.get("status"))
+        for item in doc.get("items", []):
+            item_order.append(first_row + i)
+            item_product.append(encoders["products"].code(item["productId"]))
+            item_qty.append(item.get("quantity", 1))
+            item_price.append(item.get("price", 0))
+
+    columns = {
+        "orders": {"ts": ts, "customer": customer, "total": total, "status": status},
+        "items": {"order": item_order, "product": item_product, "quantity": item_qty, "price": item_price},
+    }
+    for table, values in columns.items():
+        dtypes = ORDER_COLUMNS if table == "orders" else ITEM_COLUMNS
+        for name, column in values.items():
+            with open(_column_path(path, table, name), "ab") as f:
+                f.write(np.asarray(column, dtype=dtypes[name]).tobytes())
+    for encoder in encoders.values():
+        encoder.flush()
+    meta["orders"] += n_orders
+    meta["items"] += len(item_order)
+    meta["dictionaries"] = {name: len(e.values) for name, e in encoders.items()}
+
+_refresh_lock = threading.Lock()
+
+@contextmanager
+def _snapshot_lock(path: Path):
+    """Held by whoever refreshes the snapshot at `path`, in this process or another one"""
+    with _refresh_lock, open(path.with_name(path.name + ".lock"), "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _swap(built: Path, path: Path):
+    """
+    Moves the snapshot at `path` aside and `built` in its place. That is two renames, so
+    for an instant `path` doesn't exist: a reader that has loaded a snapshot keeps
+    answering from it (Snapshot.data), one that hasn't gets "no snapshot" for that request.
+    """
+    old = path.with_name(path.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        os.replace(path, old)
+    os.replace(built, path)
+    shutil.rmtree(old, ignore_errors=True)   # open memmaps keep their (unlinked) files
+
+def refresh(path: Path = SNAPSHOT_DIR, rebuild: bool = False, batch_size: int = BATCH_SIZE, log=None,
+            build: bool = True) -> dict:
+    """
+    Appends the orders created since the last refresh; returns the new meta.
+    A missing snapshot (or rebuild=True) is built aside and swapped in - unless build=False,
+    then that is a ValueError (the API refreshes, only the CLI builds).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _snapshot_lock(path):
+        if not rebuild and (path / "meta.json").exists():
+            return _append_new_orders(path, batch_size, log)
+        if not build:
+            raise ValueError("No analytics snapshot yet - run: python snapshot.py refresh")
+        building = path.with_name(path.name + ".building")
+        shutil.rmtree(building, ignore_errors=True)   # left by an interrupted build
+        meta = _append_new_orders(building, batch_size, log)
+        _swap(building, path)
+        return meta
+
+def _append_new_orders(path: Path, batch_size: int, log) -> dict:
+    from pagination import encode_cursor, keyset_query
+    from db import orders_coll, orders_archive_coll, ANALYTICS
+
+    path.mkdir(parents=True, exist_ok=True)
+    meta = read_meta(path)
+    _truncate(path, meta)
+    encoders = {name: _Encoder(path, name, meta["dictionaries"][name]) for name in DICTIONARIES}
+
+    # the archive only holds orders older than the hot ones - read it once, on the first build
+    sources = [orders_coll(ANALYTICS)] if meta["watermark"] else [orders_archive_coll(ANALYTICS),
+                                                                   orders_coll(ANALYTICS)]
+    until = datetime.now(timezone.utc) - timedelta(seconds=SNAPSHOT_LAG_S)
+    for coll in sources:
+        query = keyset_query({"createdAt": {"$lt": until}}, SNAPSHOT_SORT, meta["watermark"])
+        cursor = coll.find(query, SNAPSHOT_FIELDS, batch_size=batch_size).sort(SNAPSHOT_SORT)
+        try:
+            batch = []
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    _append_batch(path, batch, meta, encoders)
+                    meta["watermark"] = encode_cursor(batch[-1], SNAPSHOT_SORT)
+                    _write_meta(path, meta)
+                    batch = []
+                    if log:
+                        log(f"snapshot: {meta['orders']} orders, {meta['items']} items")
+            if batch:
+                _append_batch(path, batch, meta, encoders)
+                meta["watermark"] = encode_cursor(batch[-1], SNAPSHOT_SORT)
+        finally:
+            cursor.close()
+    meta["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+    meta["complete_until"] = until.isoformat()
+    _write_meta(path, meta)
+    return meta
+
+# ---------------- Reading ----------------
+class SnapshotData:
+    """Read-only view of one meta.json generation: column arrays (memory-mapped) and dictionaries"""
+
+    def __init__(self, path: Path, meta: dict):
+        self.meta = meta
+        self.orders = {name: self._map(path, "orders", name, dtype, meta["orders"])
+                       for name, dtype in ORDER_COLUMNS.items()}
+        self.items = {name: self._map(path, "items", name, dtype, meta["items"])
+                      for name, dtype in ITEM_COLUMNS.items()}
+        self.dictionaries = {name: _read_dictionary(path, name, meta["dictionaries"][name])
+                             for name in DICTIONARIES}
+
+    @staticmethod
+    def _map(path: Path, table: str, name: str, dtype, count: int):
+        if not count:
+            return np.empty(0, dtype)
+        return np.memmap(_column_path(path, table, name), dtype=dtype, mode="r", shape=(count,))
+
+class Snapshot:
+    """The snapshot the API answers from; reloads itself when a refresh has replaced meta.json"""
+
+    def __init__(self, path: Path = SNAPSHOT_DIR):
+        self.path = Path(path)
+        self._data = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def data(self) -> SnapshotData:
+        try:
+            stat = (self.path / "meta.json").stat()
+        except FileNotFoundError:
+            if self._data is not None:   # between the two renames of a rebuild's _swap
+                return self._data
+            raise ValueError("No analytics snapshot yet - run: python snapshot.py refresh")
+        version = (stat.st_ino, stat.st_mtime_ns)   # a swapped-in rebuild is a new file
+        with self._lock:
+            if version != self._version:
+                self._data = SnapshotData(self.path, read_meta(self.path))
+                self._version = version
+            return self._data
+
+    def refresh(self) -> dict:
+        """Appends new orders to an existing snapshot (builds and rebuilds are left to the CLI)"""
+        return refresh(self.path, build=False)
+
+snapshot = Snapshot()
+
+def snapshot_info(data: SnapshotData) -> dict:
+    meta = data.meta
+    return {"orders": meta["orders"], "items": meta["items"], "customers": meta["dictionaries"]["customers"],
+            "products": meta["dictionaries"]["products"], "refreshed_at": meta.get("refreshed_at"),
+            "complete_until": meta.get("complete_until")}
+
+# ---------------- Reports ----------------
+def window_mask(data: SnapshotData, days: int = None) -> np.ndarray:
+    """Orders of the last `days` days (up to the snapshot's end), or all of them"""
+    ts = data.orders["ts"]
+    if not days:
+        return np.ones(len(ts), bool)
+    if days < 0:
+        raise ValueError("days must be positive")
+    end = ts.max() if len(ts) else 0
+    return ts > end - days * DAY_MS
+
+def quintile(values: np.ndarray) -> np.ndarray:
+    """1..5 by percentile rank; equal values get the same score"""
+    if not len(values):
+        return np.empty(0, np.int8)
+    ranks = np.searchsorted(np.sort(values), values, side="right") / len(values)
+    return np.clip(np.ceil(ranks * 5), 1, 5).astype(np.int8)
+
+# (name, condition on the R and F scores) - the first match wins
+RFM_SEGMENTS = (
+    ("champions", lambda r, f: (r >= 4) & (f >= 4)),
+    ("loyal", lambda r, f: (r >= 3) & (f >= 3)),
+    ("new", lambda r, f: (r >= 4) & (f <= 1)),
+    ("promising", lambda r, f: r >= 4),
+    ("at_risk", lambda r, f: (r <= 2) & (f >= 3)),
+    ("hibernating", lambda r, f: (r <= 2) & (f <= 2)),
+    ("needs_attention", lambda r, f: np.ones(len(r), bool)),
+)
+
+def rfm_report(data: SnapshotData, days: int = None, customer_id: str = None) -> dict:
+    """
+    Recency (days since the last order), frequency (orders) and monetary (spend) per
+    customer, scored 1-5 by quintile and grouped into segments by R and F.
+    """
+    mask = window_mask(data, days)
+    customer = data.orders["customer"][mask]
+    ts = data.orders["ts"][mask]
+    total = data.orders["total"][mask]
+    n_customers = len(data.dictionaries["customers"])
+    as_of = int(ts.max()) if len(ts) else 0
+
+    frequency = np.bincount(customer, minlength=n_customers)
+    monetary = np.bincount(customer, weights=total, minlength=n_customers)
+    last = np.full(n_customers, np.iinfo(np.int64).min)
+    np.maximum.at(last, customer, ts)
+    active = np.flatnonzero(frequency)
+    recency = (as_of - last[active]) / DAY_MS
+    r, f, m = quintile(-recency), quintile(frequency[active]), quintile(monetary[active])
+
+    names = [name for name, _ in RFM_SEGMENTS]
+    segment = np.select([cond(r, f) for _, cond in RFM_SEGMENTS], np.arange(len(names)))
+    counts = np.bincount(segment, minlength=len(names))
+    revenue = np.bincount(segment, weights=monetary[active], minlength=len(names))
+    recency_sum = np.bincount(segment, weights=recency, minlength=len(names))
+    orders_sum = np.bincount(segment, weights=frequency[active], minlength=len(names))
+    segments = [{
+        "segment": name, "customers": int(counts[i]), "revenue": round(float(revenue[i]), 2),
+        "avg_recency_days": round(float(recency_sum[i] / counts[i]), 1) if counts[i] else None,
+        "avg_orders": round(float(orders_sum[i] / counts[i]), 2) if counts[i] else None,
+        "avg_spend": round(float(revenue[i] / counts[i]), 2) if counts[i] else None,
+    } for i, name in enumerate(names)]
+
+    report = {"as_of": datetime.fromtimestamp(as_of / 1000, timezone.utc).isoformat(),
+              "customers": int(len(active)), "segments": segments}
+    if customer_id is not None:
+        code = {v: i for i, v in enumerate(data.dictionaries["customers"])}.get(str(customer_id))
+        row = np.searchsorted(active, code) if code is not None else len(active)
+        if row >= len(active) or active[row] != code:
+            raise ValueError(f"No orders for customer {customer_id} in the snapshot")
+        report["customer"] = {"customerId": str(customer_id), "segment": names[segment[row]],
+                              "recency_days": round(float(recency[row]), 1), "orders": int(frequency[active[row]]),
+                              "spend": round(float(monetary[active[row]]), 2),
+                              "r": int(r[row]), "f": int(f[row]), "m": int(m[row])}
+    return report
+
+def _baskets(data: SnapshotData, mask: np.ndarray):
+    """(order row, product code) of every item in the window, one row per distinct product per order"""
+    order = data.items["order"]
+    keep = mask[order]
+    n_products = max(len(data.dictionaries["products"]), 1)
+    # one int64 key per item sorts by order, then product; repeats of a product in an order are dropped
+    keys = np.sort(order[keep] * n_products + data.items["product"][keep])
+    if not keys.size:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return keys // n_products, keys % n_products
+
+def basket_report(data: SnapshotData, days: int = None, limit: int = 20, top_products: int = 200,
+                  product_id: str = None) -> dict:
+    """
+    Products bought together: pairs among the `top_products` best sellers, ranked by the
+    number of orders holding both (with support, confidence and lift), or - with
+    product_id - the products most often in the same order as that product.
+    """
+    mask = window_mask(data, days)
+    n_orders = int(mask.sum())
+    order, product = _baskets(data, mask)
+    products = data.dictionaries["products"]
+    in_orders = np.bincount(product, minlength=len(products))   # orders holding each product
+
+    if product_id is not None:
+        code = {v: i for i, v in enumerate(products)}.get(str(product_id))
+        if code is None or not in_orders[code]:
+            raise ValueError(f"Product {product_id} is not in the snapshot")
+        with_product = np.zeros(mask.size, bool)
+        with_product[order[product == code]] = True
+        together = np.bincount(product[with_product[order]], minlength=len(products))
+        together[code] = 0
+        best = np.argsort(-together, kind="stable")[:limit]
+        return {"orders": n_orders, "productId": str(product_id), "with": [
+            {"productId": products[p], "orders": int(together[p]),
+             "confidence": round(float(together[p] / in_orders[code]), 4),
+             "lift": round(float(together[p] * n_orders / (in_orders[code] * in_orders[p])), 3)}
+            for p in best if together[p]]}
+
+    # recode the best sellers 0..k-1; other products drop out
+    top = np.argsort(-in_orders, kind="stable")[:top_products]
+    top = top[in_orders[top] > 0]
+    k = len(top)
+    recode = np.full(len(products), -1)
+    recode[top] = np.arange(k)
+    keep = recode[product] >= 0
+    order, code = order[keep], recode[product[keep]]
+
+    # every (a, b) pair inside an order: each item is repeated once per item of its order
+    starts = np.flatnonzero(np.r_[True, order[1:] != order[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+    group_start = np.repeat(starts, sizes)
+    group_size = np.repeat(sizes, sizes)
+    left = np.repeat(np.arange(len(order)), group_size)
+    right = np.repeat(group_start, group_size) + (np.arange(len(left)) - np.repeat(np.cumsum(group_size) - group_size,
+                                                                                   group_size))
+    a, b = code[left], code[right]
+    keep = a < b
+    counts = np.bincount(a[keep] * k + b[keep], minlength=k * k)
+
+    best = np.argsort(-counts, kind="stable")[:limit]
+    pairs = []
+    for pair in best:
+        if not counts[pair]:
+            break
+        pa, pb = top[pair // k], top[pair % k]
+        both = int(counts[pair])
+        pairs.append({"products": [products[pa], products[pb]], "orders": both,
+                      "support": round(both / n_orders, 5),
+                      "confidence": round(both / int(in_orders[pa]), 4),
+                      "lift": round(both * n_orders / (int(in_orders[pa]) * int(in_orders[pb])), 3)})
+    return {"orders": n_orders, "pairs": pairs}
+
+def hourly_report(data: SnapshotData, days: int = None, tz_offset_hours: float = 0, by_weekday: bool = False) -> dict:
+    """Orders and revenue per hour of the day (0-23, shifted by tz_offset_hours), totals and per-day averages"""
+    mask = window_mask(data, days)
+    local = data.orders["ts"][mask] + int(tz_offset_hours * HOUR_MS)
+    total = data.orders["total"][mask]
+    hour = (local // HOUR_MS) % 24
+    n_days = len(np.unique(local // DAY_MS)) or 1
+
+    orders = np.bincount(hour, minlength=24)
+    revenue = np.bincount(hour, weights=total, minlength=24)
+    report = {"days": n_days, "hours": [
+        {"hour": h, "orders": int(orders[h]), "revenue": round(float(revenue[h]), 2),
+         "avg_orders_per_day": round(float(orders[h] / n_days), 2),
+         "avg_revenue_per_day": round(float(revenue[h] / n_days), 2)} for h in range(24)]}
+    if by_weekday:
+        weekday = (local // DAY_MS + 3) % 7   # 1970-01-01 was a Thursday; 0 = Monday
+        cells = weekday * 24 + hour
+        report["by_weekday"] = {
+            "orders": np.bincount(cells, minlength=168).reshape(7, 24).tolist(),
+            "revenue": np.round(np.bincount(cells, weights=total, minlength=168), 2).reshape(7, 24).tolist(),
+        }
+    return report
+
+REPORTS = {"rfm": rfm_report, "basket": basket_report, "hourly": hourly_report}
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+# query string arguments of each report (the API passes them through report_kwargs)
+REPORT_ARGS = {
+    "rfm": {"days": int, "customer_id": str},
+    "basket": {"days": int, "limit": int, "top_products": int, "product_id": str},
+    "hourly": {"days": int, "tz_offset_hours": float, "by_weekday": _flag},
+}
+
+def report_kwargs(name: str, args) -> dict:
+    kwargs = {}
+    for arg, parse in REPORT_ARGS[name].items():
+        value = args.get(arg)
+        if value in (None, ""):
+            continue
+        try:
+            kwargs[arg] = parse(value)
+        except ValueError:
+            raise ValueError(f"Invalid {arg}: {value}")
+    return kwargs
+
+def report_product_ids(report: dict) -> set:
+    ids = {p for row in report.get("pairs", []) for p in row["products"]}
+    ids.update(row["productId"] for row in report.get("with", []))
+    return ids
+
+def name_products(report: dict, catalog: dict) -> dict:
+    """Adds product names (from get_products_by_ids) to a basket report"""
+    for row in report.get("pairs", []):
+        row["names"] = [catalog.get(p, {}).get("name") for p in row["products"]]
+    for row in report.get("with", []):
+        row["name"] = catalog.get(row["productId"], {}).get("name")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("refresh", "rebuild", *REPORTS))
+    parser.add_argument("--dir", default=str(SNAPSHOT_DIR), help="snapshot directory")
+    parser.add_argument("--days", type=int, help="reports: only the last N days")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.command in ("refresh", "rebuild"):
+        meta = refresh(Path(args.dir), rebuild=args.command == "rebuild", log=lambda m: print(m, file=sys.stderr))
+        print(f"{meta['orders']} orders, {meta['items']} items in {time.perf_counter() - t0:.1f}s")
+        return
+    data = Snapshot(Path(args.dir)).data()
+    report = REPORTS[args.command](data, days=args.days)
+    print(json.dumps(report, indent=2))
+    print(f"{args.command} over {data.meta['orders']} orders in {(time.perf_counter() - t0) * 1000:.0f}ms",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
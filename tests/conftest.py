@@ -0,0 +1,29 @@
+import os, sys
+from pathlib import Path
+
+import pytest
+
+# the modules are flat files in the repo root; db.py reads DB_NAME on import
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DB_NAME"] = "market_test"
+os.environ["SNAPSHOT_LAG_S"] = "0"
+
+@pytest.fixture(autouse=True)
+def mongo():
+    """A fresh in-process database (mongomock) and empty in-process caches for every test"""
+    mongomock = pytest.importorskip("mongomock")
+    import db
+    from products import product_cache, search_index
+    db.use_client(mongomock.MongoClient())
+    product_cache.invalidate()
+    search_index.invalidate()
+    yield db.get_db()
+    db.use_client(None)
+
+@pytest.fixture
+def catalog():
+    from products import create_product
+    create_product("p1", "Milk", "dairy", 5.0)
+    create_product("p2", "Bread", "bakery", 8.0)
+    create_product("p3", "Cheese", "dairy", 20.0)
+    return {"p1": 5.0, "p2": 8.0, "p3": 20.0}
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import archive
+from counters import get_count
+from db import orders_coll, orders_archive_coll
+from orders import (build_order_doc, insert_order_docs, record_written_orders, get_order_by_id, list_orders_page,
+                    iter_orders, update_order, delete_order)
+from rollups import rollup_total_revenue
+
+@pytest.fixture
+def tiered(monkeypatch):
+    """
+    12 orders a day apart, o00 the oldest (11.5 days), 7 of them older than 5 days.
+    archive_orders takes the standalone mongod path (mongomock has no transactions).
+    """
+    monkeypatch.setattr(archive, "supports_transactions", lambda db: False)
+    now = datetime.now(timezone.utc)
+    docs = [build_order_doc(f"o{i:02d}", "c1", [{"productId": "p1", "quantity": 1, "price": 10}],
+                            now - timedelta(days=12 - i, hours=-12)) for i in range(12)]
+    insert_order_docs(docs)
+    record_written_orders(docs)
+    return docs
+
+def test_old_orders_move_and_stay_counted(tiered, tmp_path):
+    result = archive.archive_orders(days=5, batch_size=3, export_dir=tmp_path, log=lambda msg: None)
+    assert (result["archived"], result["skipped"]) == (7, 0)
+    assert orders_coll().count_documents({}) == 5
+    assert orders_archive_coll().count_documents({}) == 7
+    assert get_count("orders") == 12
+    assert rollup_total_revenue() == 120
+    assert list(tmp_path.glob("orders-*.jsonl.gz"))
+    assert archive.archive_orders(days=5, log=lambda msg: None)["archived"] == 0
+
+def test_reads_continue_in_the_archive(tiered):
+    archive.archive_orders(days=5, log=lambda msg: None)
+    assert get_order_by_id("o00")["_id"] == "o00"
+    ids, cursor = [], None
+    while True:
+        docs, cursor = list_orders_page(limit=4, cursor=cursor)
+        ids += [d["_id"] for d in docs]
+        if cursor is None:
+            break
+    expected = [f"o{i:02d}" for i in reversed(range(12))]
+    assert ids == expected
+    assert [d["_id"] for d in iter_orders()] == expected
+
+def test_archived_orders_are_read_only_but_deletable(tiered):
+    archive.archive_orders(days=5, log=lambda msg: None)
+    with pytest.raises(ValueError):
+        update_order("o00", status="refunded")
+    assert delete_order("o00") == 1
+    assert get_count("orders") == 11
+    assert rollup_total_revenue() == 110
+
+def test_an_order_updated_mid_move_stays_hot(tiered):
+    hot, cold = orders_coll(), orders_archive_coll()
+    docs = list(hot.find({"_id": {"$in": ["o00", "o01"]}}))
+    hot.update_one({"_id": "o01"}, {"$set": {"status": "shipped", "updatedAt": datetime.now(timezone.utc)}})
+    moved = archive.move_batch_unsafe(hot, cold, docs)
+    assert [d["_id"] for d in moved] == ["o00"]
+    assert hot.find_one({"_id": "o01"})["status"] == "shipped"
+    assert cold.find_one({"_id": "o01"}) is None
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from benchmarks import run
+
+def test_mongod_run_refuses_the_app_database():
+    with pytest.raises(SystemExit, match="refusing"):
+        run.main(["--backend", "mongod", "--db", "market_test"])
+
+def test_data_cases_run_on_mongomock(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_NAME", "market_test")   # run.main points it at --db
+    out = tmp_path / "results.json"
+    run.main(["--backend", "mongomock", "--scale", "300", "--iterations", "3", "--only", "data", "--out", str(out)])
+    results = json.loads(out.read_text())["results"]
+    assert results
+    for name, result in results.items():
+        if "skipped" in result:
+            assert result["iterations"] == 0
+            continue
+        assert result["errors"] == 0, (name, result.get("last_error"))
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+import catalog_io
+from catalog_io import import_stream, iter_export
+from counters import get_count, get_version
+from products import create_product, get_product_by_id, search_products
+
+CSV = """product_id,name,category,price
+p1,Milk,dairy,5
+p2,Bread,bakery,-1
+,Nameless,misc,1
+p3,Cheese,dairy,20
+p4,,,
+"""
+
+def test_csv_import_reports_row_errors_by_line():
+    report = import_stream("products", io.StringIO(CSV), "csv", chunk_size=1)
+    assert (report["rows"], report["inserted"], report["error_count"]) == (5, 2, 3)
+    assert report["errors"] == [{"line": 3, "error": "Invalid price: '-1'"},
+                                {"line": 4, "error": "Missing product_id"},
+                                {"line": 6, "error": "No fields to write"}]
+    assert get_count("products") == 2
+    assert get_product_by_id("p3")["price"] == 20.0
+
+def test_jsonl_upsert_updates_only_the_given_fields():
+    create_product("p1", "Milk", "dairy", 5.0)
+    version = get_version("products")
+    report = import_stream("products", io.StringIO('{"product_id": "p1", "price": 6}\n[1]\n'), "jsonl")
+    assert (report["matched"], report["modified"], report["error_count"]) == (1, 1, 1)
+    product = get_product_by_id("p1")
+    assert (product["name"], product["price"]) == ("Milk", 6.0)
+    assert get_version("products") > version
+    assert [p["_id"] for p in search_products("mi")] == ["p1"]
+
+def test_replace_keeps_created_at_and_stores_values_literally():
+    create_product("p1", "Milk", "dairy", 5.0)
+    created = get_product_by_id("p1")["createdAt"]
+    rows = '{"product_id": "p1", "name": "$name", "category": "dairy", "price": 7}\n' \
+           '{"product_id": "p2", "name": "Bread", "category": "bakery", "price": 8}\n' \
+           '{"product_id": "p3", "name": "Cheese"}\n'
+    report = import_stream("products", io.StringIO(rows), "jsonl", mode="replace")
+    assert (report["inserted"], report["modified"], report["error_count"]) == (1, 1, 1)
+    product = get_product_by_id("p1")
+    assert (product["name"], product["price"], product["createdAt"]) == ("$name", 7.0, created)
+    assert get_count("products") == 2
+
+def test_a_failed_chunk_still_counts_the_chunks_that_were_written(monkeypatch):
+    write_chunk = catalog_io._write_chunk
+
+    def fail_second(coll, ops, lines, report):
+        if lines[0] > 3:
+            raise ConnectionError("lost the connection")
+        write_chunk(coll, ops, lines, report)
+
+    monkeypatch.setattr(catalog_io, "_write_chunk", fail_second)
+    rows = "".join(f"p{i},Product {i},misc,1\n" for i in range(4))
+    with pytest.raises(ConnectionError):
+        import_stream("products", io.StringIO("product_id,name,category,price\n" + rows), chunk_size=2, workers=1)
+    assert get_count("products") == 2
+    assert catalog_io.products_coll().count_documents({}) == 2
+
+def test_export_round_trips_through_import(mongo):
+    import_stream("products", io.StringIO(CSV), "csv")
+    exported = "".join(iter_export("products", "jsonl"))
+    mongo.drop_collection("products")
+    mongo.drop_collection("counters")
+    report = import_stream("products", io.StringIO(exported), "jsonl")
+    assert (report["inserted"], report["error_count"]) == (2, 0)
@@ -0,0 +1,18 @@
+from counters import get_count, get_version, rebuild_counters
+from orders import create_order, update_order, delete_order
+
+def test_counter_follows_creates_and_deletes(catalog):
+    create_order("o1", "c1", [{"productId": "p1", "quantity": 2}])
+    create_order("o2", "c2", [{"productId": "p2"}])
+    assert get_count("orders") == 2
+    assert delete_order("o1") == 1
+    assert delete_order("o1") == 0
+    assert get_count("orders") == 1
+    assert rebuild_counters()["orders"] == 1
+
+def test_update_bumps_version_without_changing_count(catalog):
+    create_order("o1", "c1", [{"productId": "p1"}])
+    version = get_version("orders")
+    update_order("o1", status="shipped")
+    assert get_version("orders") == version + 1
+    assert get_count("orders") == 1
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from counters import get_count
+from order_writer import GroupCommitWriter, AsyncGroupCommitWriter
+from orders import build_order_doc, insert_order_docs, record_written_orders
+from rollups import rollup_total_revenue
+
+def order(order_id: str, price: float = 10.0) -> dict:
+    return build_order_doc(order_id, "c1", [{"productId": "p1", "quantity": 1, "price": price}])
+
+def test_one_batch_in_submit_order_with_per_doc_results():
+    batches = []
+    writer = GroupCommitWriter(lambda docs: batches.append(docs) or [None if d != "bad" else "no" for d in docs],
+                               max_docs=10, max_wait=0.05)
+    futures = [writer.submit(d) for d in ("a", "b", "bad", "c")]
+    assert [f.result(5) for f in futures] == [None, None, "no", None]
+    assert batches == [["a", "b", "bad", "c"]]
+    writer.close()
+
+def test_batches_are_capped_at_max_docs():
+    batches = []
+    writer = GroupCommitWriter(lambda docs: batches.append(docs) or [None] * len(docs), max_docs=2, max_wait=0.05)
+    for future in [writer.submit(i) for i in range(5)]:
+        future.result(5)
+    assert sum(batches, []) == list(range(5))
+    assert max(map(len, batches)) == 2
+    writer.close()
+
+def test_a_failed_flush_fails_every_caller_of_the_batch():
+    def flush(docs):
+        raise ConnectionError("down")
+    writer = GroupCommitWriter(flush, max_wait=0.05)
+    futures = [writer.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(5)
+    writer.close()
+
+def test_bookkeeping_failure_still_returns_the_write_results():
+    def after_flush(written):
+        raise RuntimeError("rollups down")
+    writer = GroupCommitWriter(lambda docs: [None] * len(docs), after_flush, max_wait=0.01)
+    assert writer.write("a", timeout=5) is None
+    writer.close()
+
+def test_counters_and_rollups_are_current_when_the_caller_returns():
+    writer = GroupCommitWriter(insert_order_docs, record_written_orders, max_wait=0.05)
+    futures = [writer.submit(order(f"o{i}")) for i in range(3)] + [writer.submit(order("o0", 99))]
+    results = [f.result(5) for f in futures]
+    assert results == [None, None, None, "Order with id o0 already exists"]
+    assert get_count("orders") == 3
+    assert rollup_total_revenue() == 30
+    writer.close()
+
+def test_async_writer_batches_concurrent_writes():
+    batches = []
+
+    async def flush(docs):
+        batches.append(docs)
+        return [None if d % 2 else f"odd one out {d}" for d in docs]
+
+    async def main():
+        writer = AsyncGroupCommitWriter(flush, max_docs=3, max_wait=0.05)
+        return await asyncio.gather(*(writer.write(i) for i in range(1, 6)))
+
+    assert asyncio.run(main()) == [None, "odd one out 2", None, "odd one out 4", None]
+    assert batches == [[1, 2, 3], [4, 5]]
@@ -0,0 +1,40 @@
+from counters import get_count
+from orders import create_order, create_orders_bulk
+from rollups import rebuild_rollups, rollup_top_products
+from test_rollups import rollup_state
+
+def test_bad_rows_get_their_own_error_and_the_rest_are_written(catalog):
+    create_order("o1", "c1", [{"productId": "p1"}])
+    results = create_orders_bulk([
+        {"order_id": "o2", "customer_id": "c1", "items": [{"productId": "p1", "quantity": 2}]},
+        {"order_id": "o1", "customer_id": "c1", "items": [{"productId": "p2"}]},    # already exists
+        {"customer_id": "c1", "items": [{"productId": "p2"}]},                      # no order_id
+        {"order_id": 5, "customer_id": "c1", "items": [{"productId": "p2"}]},
+        {"order_id": "o3", "customer_id": "c1", "items": [{"productId": "nope"}]},
+        {"order_id": "o4", "customer_id": "c1", "items": [{"productId": "p2", "quantity": -1}]},
+        {"order_id": "o2", "customer_id": "c2", "items": [{"productId": "p2"}]},    # repeated in the batch
+        {"order_id": "o5", "customer_id": "c2", "items": [{"productId": "p3"}]},
+        "not an order",
+    ], chunk_size=3)
+
+    assert [r["success"] for r in results] == [True, False, False, False, False, False, False, True, False]
+    assert [r["_id"] for r in results[:2]] == ["o2", "o1"]
+    assert results[1]["error"] == "Order with id o1 already exists"
+    assert results[2]["error"] == "Missing field 'order_id'"
+    assert results[3]["error"] == "order_id must be a string"
+    assert results[4]["error"] == "Products not found: nope"
+    assert results[5]["error"] == "Quantity must be a non-negative number"
+    assert results[6]["error"] == "Order with id o2 already exists"
+    assert get_count("orders") == 3
+
+def test_bulk_rollups_only_count_written_orders(catalog):
+    create_order("o1", "c1", [{"productId": "p1"}])
+    results = create_orders_bulk([
+        {"order_id": "o1", "customer_id": "c1", "items": [{"productId": "p2"}]},   # duplicate
+        {"order_id": "o2", "customer_id": "c2", "items": [{"productId": "p2", "quantity": 2}]},
+    ])
+    assert [r["success"] for r in results] == [False, True]
+    assert [p["_id"] for p in rollup_top_products(1)] == ["p2"]
+    incremental = rollup_state()
+    rebuild_rollups()
+    assert rollup_state() == incremental
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import orders_coll
+from pagination import encode_cursor, decode_cursor, clamp_limit, MAX_PAGE_SIZE
+from orders import list_orders_page, ORDERS_SORT
+from products import create_product, get_products_page
+
+def all_pages(fetch, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        docs, cursor = fetch(limit=limit, cursor=cursor)
+        pages.append([d["_id"] for d in docs])
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    doc = {"createdAt": datetime(2024, 5, 1, 12, 30), "_id": "o7"}
+    token = encode_cursor(doc, ORDERS_SORT)
+    assert decode_cursor(token, ORDERS_SORT) == [datetime(2024, 5, 1, 12, 30), "o7"]
+
+@pytest.mark.parametrize("token", ["not-a-cursor", encode_cursor({"_id": "x"}, [("_id", 1)])])
+def test_bad_cursor_is_a_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, ORDERS_SORT)
+
+def test_clamp_limit():
+    assert clamp_limit(None) == 100
+    assert clamp_limit(0) == 1
+    assert clamp_limit(10 ** 6) == MAX_PAGE_SIZE
+
+def test_order_pages_cover_every_order_once_newest_first():
+    start = datetime(2024, 1, 1)
+    # pairs of orders share a createdAt, so the _id tie-break decides page boundaries
+    docs = [{"_id": f"o{i:02d}", "customerId": "c1", "createdAt": start + timedelta(minutes=i // 2)}
+            for i in range(11)]
+    orders_coll().insert_many(docs)
+    pages = all_pages(list_orders_page, 3)
+    assert [len(p) for p in pages] == [3, 3, 3, 2]
+    expected = [d["_id"] for d in sorted(docs, key=lambda d: (d["createdAt"], d["_id"]), reverse=True)]
+    assert sum(pages, []) == expected
+
+def test_no_empty_page_after_a_full_last_page():
+    for i in range(4):
+        create_product(f"p{i}", f"Product {i}", "misc", 1.0)
+    assert all_pages(get_products_page, 2) == [["p0", "p1"], ["p2", "p3"]]
@@ -0,0 +1,48 @@
+import random
+
+from prefix_index import PrefixIndex
+from products import create_product, update_product, delete_product, search_products
+
+WORDS = ("milk", "milky", "mint", "mango", "bread", "butter", "cheese", "m")
+
+def ranked_ids(index: PrefixIndex, query: str, limit: int) -> list:
+    return [d["_id"] for d in index.search(query, limit)]
+
+def full_ranking(index: PrefixIndex, query: str, limit: int) -> list:
+    """The same query ranked over every match (no per-prefix top-K)"""
+    short_prefix, index.short_prefix = index.short_prefix, 0
+    try:
+        return ranked_ids(index, query, limit)
+    finally:
+        index.short_prefix = short_prefix
+
+def test_ranking_whole_name_then_first_word_then_shorter():
+    index = PrefixIndex()
+    index.build([{"_id": "a", "name": "Chocolate Milk"}, {"_id": "b", "name": "Milk"},
+                 {"_id": "c", "name": "Milkshake Mango"}, {"_id": "d", "name": "Mango Milk Shake"}])
+    assert ranked_ids(index, "milk", 10) == ["b", "c", "a", "d"]
+    assert ranked_ids(index, "mango mi", 10) == ["d", "c"]
+    assert ranked_ids(index, "x", 10) == []
+
+def test_short_prefix_buckets_stay_exact_through_writes():
+    rnd = random.Random(7)
+    name = lambda: " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3)))
+    index = PrefixIndex(bucket_size=5)
+    index.build([{"_id": f"p{i:03d}", "name": name()} for i in range(300)])
+    for step in range(300):
+        doc_id = f"p{rnd.randrange(320):03d}"
+        if rnd.random() < 0.6:
+            index.upsert({"_id": doc_id, "name": name()})
+        else:
+            index.remove(doc_id)
+        for query in ("m", "mi", "b"):
+            assert ranked_ids(index, query, 5) == full_ranking(index, query, 5), (step, query)
+    assert ranked_ids(index, "m", 20) == full_ranking(index, "m", 20)   # more than a bucket holds
+
+def test_product_search_follows_product_writes(catalog):
+    assert [p["_id"] for p in search_products("m")] == ["p1"]
+    update_product("p2", name="Mild Bread")
+    create_product("p4", "M", "misc", 1.0)
+    assert [p["_id"] for p in search_products("m")] == ["p4", "p1", "p2"]
+    delete_product("p1")
+    assert [p["_id"] for p in search_products("mi")] == ["p2"]
@@ -0,0 +1,31 @@
+import pytest
+
+from orders import create_order, update_order, delete_order, total_revenue
+from rollups import sales_daily, sales_by_product, sales_by_customer, rebuild_rollups, rollups_missing
+
+def rollup_state() -> dict:
+    """Every summary row that isn't all zeros (a removed order leaves zeros behind)"""
+    return {coll.name: {d["_id"]: {k: round(v, 6) for k, v in d.items() if k != "_id"}
+                        for d in coll.find({}) if any(v for k, v in d.items() if k != "_id")}
+            for coll in (sales_daily, sales_by_product, sales_by_customer)}
+
+def test_rollups_match_a_rebuild_after_creates_updates_and_deletes(catalog):
+    create_order("o1", "c1", [{"productId": "p1", "quantity": 2}, {"productId": "p3"}])
+    create_order("o2", "c1", [{"productId": "p2", "quantity": 3}])
+    create_order("o3", "c2", [{"productId": "p1"}])
+    update_order("o2", items=[{"productId": "p3", "quantity": 2}])
+    update_order("o3", status="shipped")
+    delete_order("o1")
+
+    assert total_revenue() == pytest.approx(40 + 5)
+    incremental = rollup_state()
+    rebuild_rollups()
+    assert rollup_state() == incremental
+
+def test_rollups_missing_until_rebuilt(catalog, mongo):
+    assert not rollups_missing()
+    create_order("o1", "c1", [{"productId": "p1"}])
+    mongo.drop_collection("sales_daily")
+    assert rollups_missing()
+    rebuild_rollups()
+    assert not rollups_missing()
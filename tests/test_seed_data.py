@@ -0,0 +1,22 @@
+import pytest
+
+import seed_data
+from counters import get_counts
+from db import orders_coll
+from rollups import rollup_total_revenue
+
+def test_seed_refuses_the_app_database(catalog):
+    with pytest.raises(ValueError, match="refusing to replace market_test"):
+        seed_data.seed(100, workers=0)
+    assert get_counts(["products"]) == {"products": 3}
+
+def test_cli_refuses_the_app_database():
+    with pytest.raises(SystemExit, match="refusing"):
+        seed_data.main(["--db", "market_test", "--scale", "100"])
+
+def test_seed_writes_counters_and_rollups():
+    sizes = seed_data.seed(300, workers=0, batch=100, force=True)
+    assert sizes == {"customers": 100, "products": 50, "orders": 300}
+    assert get_counts() == sizes
+    revenue = sum(d["totalAmount"] for d in orders_coll().find({}, {"totalAmount": 1}))
+    assert rollup_total_revenue() == pytest.approx(revenue)
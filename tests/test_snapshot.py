@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from snapshot import Snapshot, refresh, rfm_report, basket_report, hourly_report
+from orders import build_order_doc, insert_order_docs
+
+START = datetime(2024, 3, 4, 9, 0, tzinfo=timezone.utc)   # a Monday
+
+def add_order(order_id: str, customer_id: str, products: list, hours: float = 0, price: float = 10):
+    items = [{"productId": p, "quantity": 1, "price": price} for p in products]
+    insert_order_docs([build_order_doc(order_id, customer_id, items, START + timedelta(hours=hours))])
+
+@pytest.fixture
+def snap(tmp_path):
+    return tmp_path / "snapshot"
+
+def test_reports_on_an_empty_snapshot(snap):
+    meta = refresh(snap)
+    assert (meta["orders"], meta["items"]) == (0, 0)
+    data = Snapshot(snap).data()
+    assert rfm_report(data)["customers"] == 0
+    assert basket_report(data) == {"orders": 0, "pairs": []}
+    assert sum(h["orders"] for h in hourly_report(data)["hours"]) == 0
+
+def test_reports_on_one_order(snap):
+    add_order("o1", "c1", ["p1", "p2"])
+    refresh(snap)
+    data = Snapshot(snap).data()
+    rfm = rfm_report(data, customer_id="c1")
+    assert rfm["customers"] == 1
+    assert (rfm["customer"]["orders"], rfm["customer"]["spend"]) == (1, 20)
+    assert basket_report(data)["pairs"] == [{"products": ["p1", "p2"], "orders": 1, "support": 1.0,
+                                            "confidence": 1.0, "lift": 1.0}]
+    hourly = hourly_report(data, by_weekday=True)
+    assert hourly["hours"][9]["orders"] == 1
+    assert hourly["by_weekday"]["orders"][0][9] == 1
+    with pytest.raises(ValueError):
+        rfm_report(data, customer_id="nobody")
+
+def test_refresh_appends_and_readers_reload(snap):
+    add_order("o1", "c1", ["p1", "p2"])
+    refresh(snap)
+    reader = Snapshot(snap)
+    assert reader.data().meta["orders"] == 1
+    add_order("o2", "c2", ["p1", "p3"], hours=1)
+    add_order("o3", "c1", ["p1"], hours=26)
+    assert reader.refresh()["orders"] == 3
+    data = reader.data()
+    assert (data.meta["orders"], data.meta["items"]) == (3, 5)
+    assert data.dictionaries["customers"] == ["c1", "c2"]
+    together = basket_report(data, product_id="p1")["with"]
+    assert {row["productId"]: row["orders"] for row in together} == {"p2": 1, "p3": 1}
+    assert rfm_report(data, days=1)["customers"] == 1
+
+def test_refresh_drops_what_an_interrupted_refresh_left(snap):
+    add_order("o1", "c1", ["p1"])
+    refresh(snap)
+    with open(snap / "customers.txt", "a", encoding="utf-8") as f:
+        f.write("half-written\n")
+    with open(snap / "orders.ts.bin", "ab") as f:
+        f.write(b"\0" * 3)
+    products = (snap / "products.txt").stat().st_ino
+    add_order("o2", "c2", ["p1"], hours=1)
+    refresh(snap)
+    data = Snapshot(snap).data()
+    assert data.dictionaries["customers"] == ["c1", "c2"]
+    assert list(data.orders["ts"]) == [int(START.timestamp() * 1000), int(START.timestamp() * 1000) + 3_600_000]
+    assert (snap / "products.txt").stat().st_ino == products   # untouched: nothing to drop
+
+def test_rebuild_is_swapped_in_and_loaded_data_survives_the_swap_gap(snap):
+    add_order("o1", "c1", ["p1"])
+    refresh(snap)
+    reader = Snapshot(snap)
+    loaded = reader.data()
+    snap.rename(snap.with_name("moved"))   # what a reader sees between _swap's two renames
+    assert reader.data() is loaded
+    with pytest.raises(ValueError):
+        Snapshot(snap).data()
+    add_order("o2", "c1", ["p2"], hours=1)
+    assert refresh(snap, rebuild=True)["orders"] == 2
+    assert reader.data().meta["orders"] == 2
+    assert not snap.with_name("snapshot.old").exists()
+
+def test_the_api_refresh_does_not_build(snap):
+    with pytest.raises(ValueError):
+        Snapshot(snap).refresh()
+    assert not snap.exists()